@@ -0,0 +1,90 @@
+# bench_fp8_dequant.py
+# Benchmark + exact-equality check: torch dequant path vs the NumPy lookup-table engine in dequantize_fp8v2.py
+# python Utils/bench_fp8_dequant.py --layers 16 --rows 4096 --cols 4096 --dtype bf16
+import os
+import sys
+import time
+import argparse
+import tempfile
+import torch
+from safetensors import safe_open
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from safetensors_stream import save_file
+from dequantize_fp8v2 import stream_convert, numpy_convert, DTYPE_MAP, OUT_NAMES
+
+SCALES = ("scalar", "inverted", "channel", "block")
+
+def make_source(path, args):
+    """FP8 layers over every bit pattern, cycling through the supported scale layouts, plus plain tensors."""
+    torch.manual_seed(0)
+    sd = {}
+    for i in range(args.layers):
+        fp8 = torch.float8_e4m3fn if i % 2 == 0 else torch.float8_e5m2
+        sd[f"layer{i}.weight"] = torch.randint(0, 256, (args.rows, args.cols), dtype=torch.uint8).view(fp8)
+        kind = SCALES[i % len(SCALES)]
+        if kind == "scalar": sd[f"layer{i}.weight_scale"] = torch.rand(()) / 100
+        elif kind == "inverted": sd[f"layer{i}.scale"] = torch.rand(()) * 100
+        elif kind == "channel": sd[f"layer{i}.weight_scale"] = torch.rand(args.rows, 1)
+        else: sd[f"layer{i}.weight_scale"] = torch.rand(-(-args.rows // 128), -(-args.cols // 128))
+        sd[f"layer{i}.bias"] = torch.randn(args.rows, dtype=torch.float16)
+        sd[f"layer{i}.norm"] = torch.randn(args.rows)
+    sd["all_halves.weight"] = torch.arange(65536, dtype=torch.int32).to(torch.int16).view(torch.float16).reshape(256, 256).clone()
+    save_file(sd, path)
+    return sum(t.numel() * t.element_size() for t in sd.values())
+
+def load(path):
+    with safe_open(path, framework="pt", device="cpu") as f:
+        return {k: f.get_tensor(k).clone() for k in f.keys()}
+
+def same_bits(a, b):
+    """Bitwise equality; NaNs only need to be NaN in the same places (torch's own NaN payloads vary by kernel)."""
+    if a.dtype != b.dtype or a.shape != b.shape: return False
+    if not a.is_floating_point(): return torch.equal(a, b)
+    na, nb = torch.isnan(a.float()), torch.isnan(b.float())
+    ints = {1: torch.uint8, 2: torch.int16, 4: torch.int32, 8: torch.int64}[a.element_size()]
+    return torch.equal(na, nb) and torch.equal(a.view(ints)[~na], b.view(ints)[~nb])
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark FP8 dequantization engines")
+    ap.add_argument("--layers", type=int, default=16)
+    ap.add_argument("--rows", type=int, default=4096)
+    ap.add_argument("--cols", type=int, default=4096)
+    ap.add_argument("--dtype", choices=OUT_NAMES.keys(), default="bf16")
+    ap.add_argument("--strip-fp8", action="store_true")
+    ap.add_argument("--repeat", type=int, default=2)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src.safetensors")
+        size_mb = make_source(src, args) / 1024**2
+        print(f"Source: {args.layers} FP8 layers of {args.rows}x{args.cols} ({size_mb:.0f} MB) -> {args.dtype}")
+
+        engines = {
+            "torch": lambda dst: stream_convert(src, dst, out_dtype=DTYPE_MAP[args.dtype], strip_fp8=args.strip_fp8),
+            "numpy": lambda dst: numpy_convert(src, dst, out_name=OUT_NAMES[args.dtype], strip_fp8=args.strip_fp8),
+        }
+        timings = {}
+        for name, run in engines.items():
+            dst = os.path.join(tmp, f"{name}.safetensors")
+            best = None
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                with open(os.devnull, "w") as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull
+                    try: run(dst)
+                    finally: sys.stdout = stdout
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+            timings[name] = best
+
+        ref, new = load(os.path.join(tmp, "torch.safetensors")), load(os.path.join(tmp, "numpy.safetensors"))
+        bad = sorted(set(ref) ^ set(new)) + [k for k in ref if k in new and not same_bits(ref[k], new[k])]
+        print(f"Exact match: {'yes' if not bad else 'NO ' + str(bad[:5])}")
+        for name, dt in timings.items():
+            print(f"  {name:5}: {dt * 1000:8.1f} ms | {size_mb / dt:8.1f} MB/s")
+
+    if bad: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_fp8_quantize.py
+# Micro-benchmark: original (unfused) FP8 quantize_weights vs the block-wise one and the NumPy engine in quantize_fp8.py
+# python Utils/bench_fp8_quantize.py --rows 8192 --cols 8192 --dtype bf16
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantize_fp8 import FP8Quantizer
+from safetensors_stream import dtype_name, tensor_bytes
+
+DTYPES = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}
+
+def legacy_quantize(weight, quant_dtype):
+    """The original implementation, kept verbatim as the reference."""
+    dev = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+    w = weight.to(dev); mx = torch.max(torch.abs(w))
+    if mx == 0: return torch.zeros_like(w, dtype=getattr(torch, quant_dtype))
+    scale = torch.max(mx / 127.0, torch.tensor(1e-12, device=dev, dtype=w.dtype))
+    q = torch.round(w / scale * 127.0) / 127.0 * scale
+    return q.to(dtype=getattr(torch, quant_dtype))
+
+def make_weight(args):
+    torch.manual_seed(0)
+    # Filled in place so creating the input does not raise the RSS high-water mark
+    return torch.empty(args.rows, args.cols, dtype=DTYPES[args.dtype]).normal_()
+
+def get_impl(name, quant_dtype):
+    if name == "legacy": return lambda w: legacy_quantize(w, quant_dtype)
+    if name == "numpy":
+        # Same raw bytes the engine gets from the memory-mapped file; returned as a torch FP8 view for comparison
+        qzer = FP8Quantizer(quant_dtype, engine="numpy")
+        def run(w):
+            raw = np.asarray(tensor_bytes(w))
+            out = qzer.quantize_array(raw, dtype_name(w.dtype))
+            return torch.from_numpy(out).view(getattr(torch, quant_dtype)).reshape(w.shape)
+        return run
+    return FP8Quantizer(quant_dtype).quantize_weights
+
+def peak_rss_mb():
+    """Process high-water mark in MB (None where it cannot be read, e.g. Windows)."""
+    # VmHWM belongs to this process image only; ru_maxrss would include the parent's peak at fork time
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1]) / 1024
+    except OSError: pass
+    try: import resource
+    except ImportError: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure_peak(name, args, result_queue):
+    # Runs in a fresh process so the high-water mark only reflects this implementation
+    weight = make_weight(args)
+    base = peak_rss_mb()
+    get_impl(name, args.quant)(weight)
+    peak = peak_rss_mb()
+    result_queue.put(None if base is None else peak - base)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark FP8 quantize_weights implementations")
+    ap.add_argument("--rows", type=int, default=8192)
+    ap.add_argument("--cols", type=int, default=8192)
+    ap.add_argument("--dtype", choices=DTYPES.keys(), default="bf16")
+    ap.add_argument("--quant", choices=["float8_e5m2", "float8_e4m3fn"], default="float8_e5m2")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    weight = make_weight(args)
+    size_mb = weight.numel() * weight.element_size() / 1024**2
+    print(f"Weight: {args.rows}x{args.cols} {args.dtype} ({size_mb:.0f} MB) -> {args.quant}")
+
+    ref = legacy_quantize(weight, args.quant).cpu()
+    identical = True
+    for name in ("fused", "numpy"):
+        new = get_impl(name, args.quant)(weight).cpu()
+        same = torch.equal(ref.view(torch.uint8), new.view(torch.uint8))
+        print(f"Bit-identical output ({name}): {'yes' if same else 'NO'}")
+        identical &= same
+    del ref, new
+
+    ctx = mp.get_context("spawn")
+    for name in ("legacy", "fused", "numpy"):
+        fn = get_impl(name, args.quant)
+        fn(weight)  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(args.repeat): fn(weight)
+        dt = (time.perf_counter() - t0) / args.repeat
+
+        q = ctx.Queue()
+        p = ctx.Process(target=measure_peak, args=(name, args, q))
+        p.start(); extra = q.get(); p.join()
+        peak = "n/a" if extra is None else f"{extra:,.0f} MB"
+        print(f"  {name:7}: {dt * 1000:8.1f} ms | {size_mb / dt:8.1f} MB/s | peak extra RSS {peak}")
+
+    if not identical: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
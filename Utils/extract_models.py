@@ -7,7 +7,7 @@ required_packages = ['torch', 'safetensors', 'prompt-toolkit', 'tqdm']
 
 try:
     import torch
-    from safetensors.torch import load_file, save_file
+    from safetensors import safe_open
     from prompt_toolkit import prompt
     from prompt_toolkit.completion import PathCompleter
     from tqdm import tqdm
@@ -24,6 +24,10 @@ except ImportError:
         print(f"\nAn error occurred: {e}\nPlease install manually: pip install {' '.join(required_packages)}")
         sys.exit(1)
 
+# The streaming writer lives next to the GUI, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from safetensors_stream import StreamingWriter, entries_from
+
 # --- Core Functions ---
 
 def get_paths():
@@ -80,42 +84,44 @@ def get_component_choices(is_sdxl):
              print("No choice entered. Please try again.")
 
 def extract_and_save_models(checkpoint_path, output_folder, components_to_save):
-    """Loads a checkpoint, detects model type, separates tensors, and saves selected components."""
+    """Reads a checkpoint header, detects model type, and streams the selected components to disk."""
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
         print(f"Created output folder: {output_folder}")
 
     try:
-        print(f"\nLoading checkpoint: {checkpoint_path} (this may take a while)...")
-        state_dict = load_file(checkpoint_path, device="cpu")
-        print("Checkpoint loaded successfully.")
+        print(f"\nOpening checkpoint: {checkpoint_path} ...")
+        # Only the header is read here; tensors are loaded one at a time while saving
+        checkpoint = safe_open(checkpoint_path, framework="pt", device="cpu")
+        all_keys = list(checkpoint.keys())
+        print("Checkpoint opened successfully.")
     except Exception as e:
         print(f"Error loading checkpoint: {e}")
         return
 
     # --- Model Type Detection ---
-    is_sdxl = any(key.startswith("conditioner.embedders.1.") for key in state_dict.keys())
+    is_sdxl = any(key.startswith("conditioner.embedders.1.") for key in all_keys)
     
     # Get user choices *after* detecting model type
     user_choices = get_component_choices(is_sdxl)
 
-    # --- Tensor Separation ---
-    model_state_dicts = {comp: {} for comp in ['CLIP', 'CLIP_L', 'CLIP_G', 'UNET', 'VAE']}
+    # --- Tensor Separation (keys only) ---
+    model_keys = {comp: [] for comp in ['CLIP', 'CLIP_L', 'CLIP_G', 'UNET', 'VAE']}
     
     print("Separating model components...")
-    for key, tensor in tqdm(state_dict.items(), desc="Processing Tensors"):
+    for key in all_keys:
         if key.startswith("model.diffusion_model."):
-            model_state_dicts['UNET'][key] = tensor
+            model_keys['UNET'].append(key)
         elif key.startswith("first_stage_model."):
-            model_state_dicts['VAE'][key] = tensor
+            model_keys['VAE'].append(key)
         # SD 1.5 CLIP
         elif key.startswith("cond_stage_model."):
-            model_state_dicts['CLIP'][key] = tensor
+            model_keys['CLIP'].append(key)
         # SDXL CLIPs
         elif key.startswith("conditioner.embedders.0."):
-            model_state_dicts['CLIP_L'][key] = tensor
+            model_keys['CLIP_L'].append(key)
         elif key.startswith("conditioner.embedders.1."):
-            model_state_dicts['CLIP_G'][key] = tensor
+            model_keys['CLIP_G'].append(key)
             
     # --- Saving Logic ---
     base_filename = os.path.splitext(os.path.basename(checkpoint_path))[0]
@@ -123,21 +129,23 @@ def extract_and_save_models(checkpoint_path, output_folder, components_to_save):
     print("\nSaving selected components...")
 
     component_save_map = {
-        'CLIP': ('_clip', model_state_dicts['CLIP']),
-        'CLIP_L': ('_clip_l', model_state_dicts['CLIP_L']),
-        'CLIP_G': ('_clip_g', model_state_dicts['CLIP_G']),
-        'UNET': ('_unet', model_state_dicts['UNET']),
-        'VAE': ('_vae', model_state_dicts['VAE']),
+        'CLIP': ('_clip', model_keys['CLIP']),
+        'CLIP_L': ('_clip_l', model_keys['CLIP_L']),
+        'CLIP_G': ('_clip_g', model_keys['CLIP_G']),
+        'UNET': ('_unet', model_keys['UNET']),
+        'VAE': ('_vae', model_keys['VAE']),
     }
 
     for component_name in user_choices:
-        suffix, state_dict_to_save = component_save_map[component_name]
+        suffix, keys_to_save = component_save_map[component_name]
         
-        if state_dict_to_save:
+        if keys_to_save:
             output_path = os.path.join(output_folder, f"{base_filename}{suffix}.safetensors")
-            print(f"  -> Saving {component_name} to: {output_path} ...", end="", flush=True)
-            save_file(state_dict_to_save, output_path)
-            print(" Done.")
+            print(f"  -> Saving {component_name} to: {output_path} ...")
+            with StreamingWriter(output_path, entries_from(checkpoint, keys_to_save)) as writer:
+                for key in tqdm(keys_to_save, desc=f"Writing {component_name}"):
+                    writer.write(key, checkpoint.get_tensor(key))
+            print("     Done.")
             saved_count += 1
         else:
             print(f"  -> Warning: No '{component_name}' tensors were found to save.")
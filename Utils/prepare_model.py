@@ -1,9 +1,14 @@
-import torch
+import os
+import sys
+import math
 import argparse
-import numpy as np
-from safetensors.torch import load_file, save_file
+from safetensors import safe_open
 from tqdm import tqdm
 
+# The streaming writer lives next to the GUI, one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from safetensors_stream import StreamingWriter
+
 def get_args():
     parser = argparse.ArgumentParser(description="Isolate UNet, merge 5D fix, and flatten tensors for GGUF conversion.")
     parser.add_argument("--model", required=True, help="Path to the UNET-ONLY safetensors file from ComfyUI.")
@@ -14,44 +19,51 @@ def get_args():
 if __name__ == "__main__":
     args = get_args()
 
-    print("Loading UNET-only model...")
-    state_dict = load_file(args.model, device="cpu")
+    # Both files are only opened here; tensors are read one at a time while writing
+    print("Opening UNET-only model...")
+    model = safe_open(args.model, framework="pt", device="cpu")
     
-    print("Loading 5D tensor fix file...")
-    fix_dict = load_file(args.fix, device="cpu")
+    print("Opening 5D tensor fix file...")
+    fix = safe_open(args.fix, framework="pt", device="cpu")
+
+    # Maps every output key to the (file, key) it is read from
+    sources = {key: (model, key) for key in model.keys()}
 
     # --- START OF FINAL CRITICAL FIX ---
     # The UNET has the prefix 'model.diffusion_model.' but the fix file does not.
     # We must add the prefix to the fix keys before merging.
-    prefixed_fix_dict = {}
     prefix = "model.diffusion_model."
     print(f"Adding prefix '{prefix}' to 5D fix tensor keys for correct merging...")
-    for key, tensor in fix_dict.items():
+    for key in fix.keys():
         if not key.startswith(prefix):
             prefixed_key = prefix + key
-            prefixed_fix_dict[prefixed_key] = tensor
+            sources[prefixed_key] = (fix, key)
             print(f"  '{key}' -> '{prefixed_key}'")
         else:
-            prefixed_fix_dict[key] = tensor # Already has prefix, copy as-is
+            sources[key] = (fix, key) # Already has prefix, copy as-is
     # --- END OF FINAL CRITICAL FIX ---
     
-    state_dict.update(prefixed_fix_dict)
     print("Models merged correctly.")
 
     metadata = {}
+    entries = []
     
-    for key in list(state_dict.keys()):
-        tensor = state_dict[key]
-        if tensor.ndim > 4:
-            print(f"Processing tensor '{key}' with shape {tensor.shape} (ndim={tensor.ndim})")
+    for key, (handle, src_key) in sources.items():
+        tensor_slice = handle.get_slice(src_key)
+        shape = tensor_slice.get_shape()
+        if len(shape) > 4:
+            print(f"Processing tensor '{key}' with shape {tuple(shape)} (ndim={len(shape)})")
             
-            orig_shape = tensor.shape
-            metadata[key] = {"orig_shape": [int(d) for d in orig_shape]}
+            metadata[key] = {"orig_shape": [int(d) for d in shape]}
             
-            state_dict[key] = tensor.flatten()
-            print(f"Flattened '{key}' to shape {state_dict[key].shape}")
+            shape = [math.prod(shape)]
+            print(f"Flattened '{key}' to shape {tuple(shape)}")
+        entries.append((key, tensor_slice.get_dtype(), shape))
 
     print(f"\nSaving prepared model to: {args.output}")
-    save_file(state_dict, args.output, metadata={"gguf_metadata": str(metadata)})
+    with StreamingWriter(args.output, entries, metadata={"gguf_metadata": str(metadata)}) as writer:
+        for key, (handle, src_key) in tqdm(sources.items(), desc="Writing tensors"):
+            tensor = handle.get_tensor(src_key)
+            writer.write(key, tensor.flatten() if key in metadata else tensor)
     
     print("\nPreparation complete.")
\ No newline at end of file
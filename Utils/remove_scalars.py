@@ -1,13 +1,15 @@
-# A brute-force, backward-compatible script to remove scalar tensors from a GGUF file.
-# This version copies ONLY the architecture and the valid tensors, skipping all other metadata
-# to avoid bugs in older gguf libraries.
+# Removes scalar (0-dim) tensors from a GGUF file, which make llama-quantize crash.
+# Streams the file through gguf_surgery.rewrite_gguf: every metadata field is kept byte for byte,
+# tensor data is copied in large chunks and memory use stays constant whatever the model size.
 import os
-import gguf
+import sys
 import argparse
-from tqdm import tqdm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gguf_surgery import rewrite_gguf, read_layout, is_scalar
 
 def get_args():
-    parser = argparse.ArgumentParser(description="Fix a GGUF file by removing scalar tensors (brute-force method).")
+    parser = argparse.ArgumentParser(description="Fix a GGUF file by removing scalar tensors (all metadata is kept).")
     parser.add_argument("--src", required=True, help="The source GGUF file that is causing the crash.")
     parser.add_argument("--dst", required=True, help="The path to save the fixed GGUF file.")
     parser.add_argument("--overwrite", action="store_true")
@@ -24,35 +26,12 @@ if __name__ == "__main__":
     args = get_args()
 
     print(f"Loading source GGUF file: {args.src}")
-    reader = gguf.GGUFReader(args.src)
-
-    # Prepare the new GGUF writer, copying ONLY the architecture.
-    arch = str(reader.fields['general.architecture'].parts[-1], encoding='utf-8')
-    writer = gguf.GGUFWriter(path=None, arch=arch)
-
-    print("Filtering and copying tensors (metadata will be minimal)...")
-    tensors_skipped = 0
-    # Iterate through all tensors in the source file
-    for tensor in tqdm(reader.tensors, desc="Processing tensors"):
-        # The critical check: if a tensor has 0 dimensions, it's a scalar.
-        if tensor.data.ndim == 0:
-            print(f"Found and skipped scalar tensor: '{tensor.name}'")
-            tensors_skipped += 1
-            continue # Skip this tensor
+    scalars = [t.name for t in read_layout(args.src)[3] if is_scalar(t)]
+    for name in scalars:
+        print(f"Found and skipped scalar tensor: '{name}'")
+    if not scalars:
+        print("\nWarning: No scalar tensors were found. The output file will be an identical copy.")
 
-        # If it's not a scalar, copy it to the new file
-        writer.add_tensor(tensor.name, tensor.data, raw_dtype=tensor.tensor_type)
-
-    if tensors_skipped == 0:
-        print("\nWarning: No scalar tensors were found. The output file will be stripped of most metadata.")
-    else:
-        print(f"\nSuccessfully skipped {tensors_skipped} scalar tensor(s).")
-
-    # Write the new, fixed GGUF file to disk
     print(f"Saving fixed GGUF file to: {args.dst}")
-    writer.write_header_to_file(path=args.dst)
-    writer.write_kv_data_to_file()
-    writer.write_tensors_to_file(progress=True)
-    writer.close()
-
-    print("\nFix complete. You can now use the new file for quantization.")
\ No newline at end of file
+    kept, dropped = rewrite_gguf(args.src, args.dst, keep=lambda t: not is_scalar(t))
+    print(f"\nFix complete: {kept} tensors kept, {dropped} scalar tensor(s) removed. You can now use the new file for quantization.")
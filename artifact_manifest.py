@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""artifact_manifest.py — Skip-if-up-to-date records for generated artifacts
+* Every output gets a manifest entry: source fingerprint, quant type, tool/binary digest and options
+* Entries live in a per-folder sidecar (.artifacts.json) keyed by output file name
+* An output is up to date when its entry matches what would be built now and the file itself is unchanged
+* All checks are stat() calls plus hashing of the (small) tool scripts and binaries
+"""
+
+import os
+import sys
+import threading
+
+from safetensors_scan import fingerprint
+from sha256_cache import load_json, save_json
+
+# --------- helpers & constants ---------
+MANIFEST_NAME = ".artifacts.json"
+
+_lock = threading.Lock()
+
+
+def _fingerprint(path: str) -> list | None:
+    try: return list(fingerprint(path))  # stored as JSON, which has no tuples
+    except OSError: return None
+
+
+def describe(src: str, quant: str, tools: str, options: dict) -> dict:
+    """What an artifact is built from; `tools` is a prep_cache.tools_digest()."""
+    return {"source": _fingerprint(src), "quant": quant, "tools": tools, "options": options}
+
+
+def _manifest_path(output: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(output)), MANIFEST_NAME)
+
+
+def is_current(output: str, spec: dict) -> bool:
+    """True if `output` was built from exactly `spec` and has not changed since."""
+    now = _fingerprint(output)
+    if not now or not spec.get("source"): return False
+    with _lock:
+        entry = load_json(_manifest_path(output)).get(os.path.basename(output))
+    return bool(entry) and entry.get("spec") == spec and entry.get("output") == now
+
+
+def record(output: str, spec: dict) -> None:
+    """Stores the manifest entry of a freshly built `output`."""
+    now, manifest = _fingerprint(output), _manifest_path(output)
+    if not now: return
+    with _lock:
+        data = load_json(manifest)
+        data[os.path.basename(output)] = {"spec": spec, "output": now}
+        try: save_json(manifest, data)
+        except OSError: pass  # read-only folder: the artifact is fine, it just gets rebuilt next time
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python artifact_manifest.py <output folder>")
+        sys.exit(1)
+    for name, entry in load_json(os.path.join(sys.argv[1], MANIFEST_NAME)).items():
+        spec, stale = entry["spec"], _fingerprint(os.path.join(sys.argv[1], name)) != entry["output"]
+        print(f"{name}: {spec['quant']} from {os.path.basename((spec['source'] or ['?'])[0])} {spec['options']}{' (stale)' if stale else ''}")
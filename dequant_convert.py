@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""dequant_convert.py — FP8 .safetensors -> F16/BF16 GGUF in one pass
+* Dequantizes tensor by tensor (same code as dequantize_fp8v2.py --stream) straight into convert.py
+* No intermediate -dequant.safetensors is written or read back
+* convert.py keeps the whole state dict in RAM, like it does for the dequant file; nothing extra is held here
+* Relies on two convert.py hooks (CONVERT_HOOKS); when they are missing, falls back to dequant file + convert.py
+* --keep-dequant PATH still writes it as a side output, for debugging
+"""
+
+import argparse
+import inspect
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from safetensors import safe_open
+from safetensors_stream import StreamingWriter
+from dequantize_fp8v2 import stream_tensors, DTYPE_MAP
+import convert
+
+# --------- helpers & constants ---------
+# convert.py internals this script depends on: its .safetensors loader and the non-interactive entry point
+CONVERT_HOOKS = {"load_file": (), "convert_file": ("interact", "overwrite")}
+
+
+def load_dequantized(path: str, *, out_dtype, strip_fp8: bool, keep_dequant: str | None = None) -> dict:
+    """
+    Stand-in for the `load_file` convert.py uses: returns the state dict the dequant file would hold,
+    built from the memory-mapped source without touching the disk.
+    """
+    state = {}
+    with safe_open(path, framework="pt", device="cpu") as f:
+        entries, tensors = stream_tensors(f, out_dtype=out_dtype, strip_fp8=strip_fp8)
+        if keep_dequant:
+            with StreamingWriter(keep_dequant, entries) as writer:
+                for name, tensor in tensors:
+                    writer.write(name, tensor)
+                    state[name] = tensor
+        else:
+            state.update(tensors)
+    return state
+
+
+def missing_hooks() -> list[str]:
+    """convert.py hooks (CONVERT_HOOKS) absent from the installed convert.py."""
+    missing = []
+    for name, params in CONVERT_HOOKS.items():
+        fn = getattr(convert, name, None)
+        try: ok = callable(fn) and all(p in inspect.signature(fn).parameters for p in params)
+        except (TypeError, ValueError): ok = callable(fn)
+        if not ok: missing.append(f"{name}({', '.join(params)})")
+    return missing
+
+
+@contextmanager
+def loading_dequantized(src: str, **kwargs):
+    """While active, convert.py loads `src` through load_dequantized; every other path keeps its own loader."""
+    original = convert.load_file
+    def load_file(path, *a, **kw):
+        if os.path.abspath(path) != os.path.abspath(src): return original(path, *a, **kw)
+        return load_dequantized(path, **kwargs)
+    convert.load_file = load_file
+    try: yield
+    finally: convert.load_file = original
+
+
+def two_step(args) -> int:
+    """Fallback for a convert.py without the hooks: dequant file first, then a plain convert.py run on it."""
+    from dequantize_fp8v2 import stream_convert
+    dq = args.keep_dequant or f"{args.dst}.dequant.safetensors"
+    try:
+        stream_convert(args.src, dq, out_dtype=DTYPE_MAP[args.dtype], strip_fp8=args.strip_fp8)
+        return subprocess.call([sys.executable, "-u", os.path.abspath(convert.__file__), "--src", dq, "--dst", args.dst])
+    finally:
+        if not args.keep_dequant and os.path.exists(dq): os.remove(dq)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Dequantize FP8 and convert to an F16/BF16 GGUF without an intermediate file")
+    ap.add_argument("--src", required=True, help="Input (FP8) .safetensors file")
+    ap.add_argument("--dst", required=True, help="Output .gguf file")
+    ap.add_argument("--dtype", choices=DTYPE_MAP.keys(), default="fp16")
+    ap.add_argument("--strip-fp8", action="store_true")
+    ap.add_argument("--keep-dequant", metavar="PATH", default=None, help="Also write the dequantized .safetensors here")
+    args = ap.parse_args()
+
+    if not args.src.lower().endswith(".safetensors"):
+        sys.exit("❌ --src must be a .safetensors file")
+
+    missing = missing_hooks()
+    if missing:
+        print(f"⚠️ convert.py has no {', '.join(missing)}: falling back to a dequant file + convert.py")
+        sys.exit(two_step(args))
+
+    # convert.py reads .safetensors inputs through its module-level load_file; hand it the dequantized tensors instead
+    print(f"Converting {args.src} -> {args.dst} (fused dequant) ...")
+    try:
+        with loading_dequantized(args.src, out_dtype=DTYPE_MAP[args.dtype], strip_fp8=args.strip_fp8, keep_dequant=args.keep_dequant):
+            convert.convert_file(args.src, args.dst, interact=False, overwrite=True)
+    except Exception as err:
+        print("❌ Failed to convert:", err, file=sys.stderr)
+        sys.exit(1)
+    print("Done ✅")
+
+
+if __name__ == "__main__":
+    main()
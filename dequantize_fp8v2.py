@@ -2,57 +2,135 @@
 """dequantize_fp8v2.py — Universal (ComfyUI & Standard) Dequantizer
 * Auto-detects ComfyUI .weight_scale format
 * Auto-detects Standard .scale format
+* Scalar, per-output-channel and block-wise scales (one broadcasted multiply)
 * Aggressive memory cleanup for low-RAM environments
+* --stream: memory-mapped, tensor-at-a-time mode (peak RAM ~ largest tensor)
+* --engine numpy: torch-free, lookup-table decode straight from the memory-mapped bytes
 """
 
+from __future__ import annotations
+
 import argparse
 import re
 import sys
-import torch
 import gc
-from safetensors.torch import load_file, save_file
+from functools import lru_cache
+import numpy as np
+from safetensors_stream import StreamingWriter, save_file, entries_from, read_header
+
+# torch is only needed by the default engine; --engine numpy runs without it
+try:
+    import torch
+    from safetensors import safe_open
+    from safetensors.torch import load_file
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
 
 # --------- helpers & constants ---------
 _WEIGHT_RE       = re.compile(r"\.weight$")
-_FP8_DTYPES      = {torch.float8_e4m3fn, torch.float8_e5m2}
-DTYPE_MAP        = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}
+if TORCH_AVAILABLE:
+    _FP8_DTYPES  = {torch.float8_e4m3fn, torch.float8_e5m2}
+    DTYPE_MAP    = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16}
+    _inference_mode = torch.inference_mode
+else:
+    _FP8_DTYPES, DTYPE_MAP = set(), {}
+    _inference_mode = lambda: (lambda fn: fn)
+OUT_NAMES        = {"fp32": "F32", "fp16": "F16", "bf16": "BF16"}
+_FP8_NAMES       = {"F8_E4M3", "F8_E5M2"}
+_STRIP_SUFFIXES  = ("weight_scale", "scale_weight", "scale_input", "scale", "scale_inv")
+# Detection priority: (suffix, True if the stored value is a divisor and must be inverted)
+_SCALE_SUFFIXES  = (("weight_scale", False), ("scale", True), ("scale_weight", True),
+                    ("scale_reciprocal", True), ("scale_inv", False))
 
-def find_reciprocal_scale(state: dict[str, torch.Tensor], base: str) -> float:
+def build_scale_index(keys) -> dict[str, tuple[str, bool]]:
+    """
+    One pass over the key list: module base name -> (scale key, invert?).
+    When a module has several scale keys, the highest-priority convention wins.
+    """
+    rank = {suf: (i, inv) for i, (suf, inv) in enumerate(_SCALE_SUFFIXES)}
+    best = {}
+    for k in keys:
+        base, _, suf = k.rpartition(".")
+        if suf in rank and (base not in best or rank[suf][0] < best[base][0]):
+            best[base] = (rank[suf][0], k, rank[suf][1])
+    return {base: (k, inv) for base, (_, k, inv) in best.items()}
+
+def find_reciprocal_scale(state: dict[str, torch.Tensor], base: str, index: dict | None = None):
     """
     Smart detection of scale factors.
-    Returns the float value to MULTIPLY the weight by.
+    Returns the value to MULTIPLY the weight by: a float for scalar scales,
+    a float32 tensor for per-channel / block-wise scales, or None.
     """
-    
-    # --- STRATEGY 1: ComfyUI Native Format ---
-    # Key is ".weight_scale" and it is a multiplier.
-    if f"{base}.weight_scale" in state:
-        return state[f"{base}.weight_scale"].float().item()
-
-    # --- STRATEGY 2: Standard/Diffusers Format ---
-    # Keys like ".scale", ".scale_weight". 
-    # In many FP8 implementations, 'scale' implies we divide by it, 
-    # so we return 1.0 / scale for multiplication.
-    for suffix in ("scale", "scale_weight", "scale_reciprocal"):
-        key = f"{base}.{suffix}"
-        if key in state:
-            scale_val = state[key].float().item()
-            # Avoid division by zero
-            if scale_val == 0: return 1.0
-            return 1.0 / scale_val
-
-    # --- STRATEGY 3: Explicit Inverse Scale ---
-    if f"{base}.scale_inv" in state:
-        return state[f"{base}.scale_inv"].float().item()
-
-    # Failure
-    return None
+    if index is None:
+        # No prebuilt index: probe just this module's candidate keys
+        index = build_scale_index(k for k in (f"{base}.{suf}" for suf, _ in _SCALE_SUFFIXES) if k in state)
+    if base not in index: return None
+    key, invert = index[base]
+    scale = state[key]
+
+    # --- Scalar scale (ComfyUI .weight_scale / Standard .scale / .scale_inv) ---
+    if scale.numel() == 1:
+        scale_val = scale.float().item()
+        if not invert: return scale_val
+        # Avoid division by zero
+        return 1.0 if scale_val == 0 else 1.0 / scale_val
+
+    # --- Per-channel or block-wise scale ---
+    if not invert: return scale.float()
+    scale = scale.double()
+    return torch.where(scale == 0, torch.ones_like(scale), 1.0 / scale).float()
+
+def apply_scale_(weight: torch.Tensor, recip) -> torch.Tensor:
+    """Multiplies a float32 weight in place by a scalar, per-output-channel or block-wise multiplier."""
+    if isinstance(recip, float) or recip.numel() == 1:
+        return weight.mul_(recip if isinstance(recip, float) else recip.item())
+
+    out = weight.shape[0]
+    # Per-output-channel: (out,), (out, 1), (out, 1, 1, ...)
+    if recip.numel() == out and recip.shape[0] == out:
+        return weight.mul_(recip.reshape(out, *([1] * (weight.ndim - 1))))
+
+    # Block-wise (e.g. 128x128 tiles): scale is (ceil(out / bo), ceil(in / bi))
+    if weight.ndim == 2 and recip.ndim == 2:
+        (rows, cols), (sr, sc) = weight.shape, recip.shape
+        bo, bi = _block_size(rows, sr), _block_size(cols, sc)
+        if rows == sr * bo and cols == sc * bi:
+            # Exact tiling: broadcast through a view, no expanded copy of the scale
+            weight.view(sr, bo, sc, bi).mul_(recip[:, None, :, None])
+        else:
+            weight.mul_(recip.repeat_interleave(bo, 0)[:rows].repeat_interleave(bi, 1)[:, :cols])
+        return weight
+
+    # Anything else must already broadcast against the weight
+    return weight.mul_(recip)
+
+def _block_size(size: int, blocks: int) -> int:
+    """Block edge for `blocks` tiles over `size` elements; prefers the power of two FP8 checkpoints use (e.g. 128)."""
+    edge = -(-size // blocks)
+    pow2 = 1 << (edge - 1).bit_length()
+    return pow2 if -(-size // pow2) == blocks else edge
 
-@torch.inference_mode()
+def keys_to_drop(keys, fp8_weight_keys, strip_fp8: bool) -> set[str]:
+    """Every key removed from the output, computed once from the key list."""
+    # Always remove known metadata garbage even if the layer wasn't FP8
+    drop = {k for k in keys if k.endswith(".comfy_quant") or k.endswith(".weight_scale") or k.endswith("scale_inv")}
+    if strip_fp8:
+        # Standard + ComfyUI artifacts of each FP8 layer
+        keyset = keys if isinstance(keys, (set, dict)) else set(keys)
+        for key in fp8_weight_keys:
+            base = key[:-7]
+            drop.update(k for k in (f"{base}.{suf}" for suf in _STRIP_SUFFIXES + ("comfy_quant",)) if k in keyset)
+    return drop - set(fp8_weight_keys)
+
+@_inference_mode()
 def in_place_convert(state: dict[str, torch.Tensor], *, out_dtype: torch.dtype, strip_fp8: bool):
     """Cast **all** tensors to *out_dtype* in‑place, with aggressive memory cleanup."""
     
-    # 1. Identify FP8 keys
+    # 1. Identify FP8 keys, their scales and everything to drop (one pass over the key list each)
     fp8_weight_keys = [k for k, t in state.items() if _WEIGHT_RE.search(k) and t.dtype in _FP8_DTYPES]
+    scale_index = build_scale_index(state.keys())
+    drop = keys_to_drop(state, fp8_weight_keys, strip_fp8)
 
     restored = 0
     print(f"Processing {len(fp8_weight_keys)} FP8 tensors...")
@@ -63,7 +141,7 @@ def in_place_convert(state: dict[str, torch.Tensor], *, out_dtype: torch.dtype,
         base   = key[:-7] # removes ".weight"
         
         # DETECT SCALE
-        recip  = find_reciprocal_scale(state, base)
+        recip  = find_reciprocal_scale(state, base, scale_index)
 
         if recip is None:
             # Only warn periodically to avoid log spam on massive failures
@@ -75,8 +153,8 @@ def in_place_convert(state: dict[str, torch.Tensor], *, out_dtype: torch.dtype,
         # 1. Cast to F32
         temp = tensor.to(torch.float32)
         
-        # 2. Apply Scale
-        temp.mul_(recip)
+        # 2. Apply Scale (scalar, per-channel or block-wise; one broadcasted multiply)
+        apply_scale_(temp, recip)
         
         # 3. Cast to final dtype & Replace
         state[key] = temp.to(out_dtype)
@@ -84,37 +162,19 @@ def in_place_convert(state: dict[str, torch.Tensor], *, out_dtype: torch.dtype,
         # 4. Immediate Cleanup
         del temp
         del tensor
-        
-        # 5. Metadata Cleanup (Strip FP8 artifacts)
-        if strip_fp8:
-            # Standard artifacts
-            for suf in ("weight_scale", "scale_weight", "scale_input", "scale", "scale_inv"):
-                k_scale = f"{base}.{suf}"
-                if k_scale in state:
-                    del state[k_scale]
-            
-            # ComfyUI artifacts
-            k_junk = f"{base}.comfy_quant"
-            if k_junk in state:
-                del state[k_junk]
 
         restored += 1
         
-        # 6. Garbage Collection (Crucial for 90GB+ RAM usage prevention)
+        # 5. Garbage Collection (Crucial for 90GB+ RAM usage prevention)
         if i % 100 == 0:
             gc.collect()
 
-    # ---- 3) Cleanup remaining junk (Global Sweep) ----
+    # ---- 3) Cleanup remaining junk (precomputed) and cast the rest ----
     print("Cleaning up non-FP8 tensors...")
-    keys_to_check = list(state.keys())
-    for k in keys_to_check:
-        if k not in state: continue
-        
-        # Always remove known metadata garbage even if the layer wasn't FP8
-        if k.endswith(".comfy_quant") or k.endswith(".weight_scale") or k.endswith("scale_inv"):
-            del state[k]
-            continue
+    for k in drop:
+        state.pop(k, None)
 
+    for k in list(state.keys()):
         t = state[k]
         
         # Cast other tensors (biases, norms) to target dtype
@@ -133,16 +193,268 @@ def in_place_convert(state: dict[str, torch.Tensor], *, out_dtype: torch.dtype,
     print("――――――――――――――――――――――――――――――――")
 
 
+class _LazyState:
+    """Read-only, dict-like view of a safe_open handle: membership from the header, tensors on demand."""
+    def __init__(self, handle, keys):
+        self._handle, self._keys = handle, set(keys)
+    def __contains__(self, key):
+        return key in self._keys
+    def __getitem__(self, key):
+        return self._handle.get_tensor(key)
+
+def stream_tensors(f, *, out_dtype: torch.dtype, strip_fp8: bool):
+    """
+    Dequantizes an open safe_open handle one tensor at a time.
+    Returns (entries, tensors): the output layout decided from the header alone, and a generator
+    of (name, tensor) in that order. Each tensor is ready to be written or handed on as soon as it is yielded.
+    """
+    out_name = {torch.float32: "F32", torch.float16: "F16", torch.bfloat16: "BF16"}[out_dtype]
+    header = entries_from(f)
+    dtypes = {name: dtype for name, dtype, _ in header}
+    state = _LazyState(f, dtypes)
+
+    # 1. Identify FP8 keys, their scales and everything that will be dropped (header only)
+    fp8_weight_keys = {k for k, dt in dtypes.items() if _WEIGHT_RE.search(k) and dt in _FP8_NAMES}
+    scale_index = build_scale_index(dtypes)
+    dropped = keys_to_drop(dtypes, fp8_weight_keys, strip_fp8)
+
+    entries = []
+    for name, dtype, shape in header:
+        if name in dropped: continue
+        if dtype in _FP8_NAMES or (dtype in ("F64", "F32", "F16", "BF16") and dtype != out_name): dtype = out_name
+        entries.append((name, dtype, shape))
+
+    @_inference_mode()
+    def tensors():
+        print(f"Processing {len(fp8_weight_keys)} FP8 tensors (streaming)...")
+        restored = 0
+        for name, _, _ in entries:
+            tensor = f.get_tensor(name)
+            if name in fp8_weight_keys:
+                base = name[:-7] # removes ".weight"
+                recip = find_reciprocal_scale(state, base, scale_index)
+                if recip is None:
+                    if restored < 5 or restored % 100 == 0:
+                        print(f"⚠️ Warning: No scale found for '{base}'. Defaulting to 1.0")
+                    recip = 1.0
+                temp = tensor.to(torch.float32)
+                apply_scale_(temp, recip)
+                tensor = temp.to(out_dtype)
+                del temp
+                restored += 1
+            elif tensor.is_floating_point() and tensor.dtype != out_dtype:
+                tensor = tensor.to(out_dtype)
+            yield name, tensor
+            del tensor
+
+        print("\n―――――――― CONVERSION SUMMARY ―――――――")
+        print(f"FP8 weights restored : {restored}")
+        print(f"Total tensors         : {len(entries)}")
+        print("――――――――――――――――――――――――――――――――")
+
+    return entries, tensors()
+
+def stream_convert(src: str, dst: str, *, out_dtype: torch.dtype, strip_fp8: bool):
+    """
+    Same result as in_place_convert + save, but tensor by tensor: the source stays memory-mapped,
+    the output layout is decided from the header alone, and each tensor is written as soon as it is ready.
+    """
+    with safe_open(src, framework="pt", device="cpu") as f:
+        entries, tensors = stream_tensors(f, out_dtype=out_dtype, strip_fp8=strip_fp8)
+        with StreamingWriter(dst, entries) as writer:
+            for name, tensor in tensors:
+                writer.write(name, tensor)
+
+
+# --------- NumPy engine: lookup tables over the memory-mapped bytes ---------
+@lru_cache(maxsize=None)
+def _fp8_to_f32_table(dtype: str) -> np.ndarray:
+    """float32 value of each of the 256 FP8 bit patterns (exact, NaN codes included)."""
+    code = np.arange(256, dtype=np.uint32)
+    if dtype == "F8_E5M2":
+        # E5M2 is the upper byte of an IEEE half
+        return (code.astype(np.uint16) << 8).view(np.float16).astype(np.float32)
+    # E4M3FN: bias 7, no infinities, S.1111.111 is NaN
+    exp, man = (code >> 3) & 0xF, code & 0x7
+    mag = np.where(exp == 0, man * 2.0**-9, (8 + man) * 2.0 ** (exp.astype(np.int32) - 10))
+    table = np.where(code >> 7, -mag, mag).astype(np.float32)
+    nan = (code & 0x7F) == 0x7F
+    table.view(np.uint32)[nan] = (code[nan] >> 7 << 31) | 0x7FF00000
+    return table
+
+def _to_f32(raw: np.ndarray, dtype: str) -> np.ndarray:
+    """Widens the raw bytes of a float tensor to float32 (F64 is narrowed, as torch's .float() does)."""
+    if dtype in _FP8_NAMES: return _fp8_to_f32_table(dtype)[raw]
+    if dtype == "BF16": return (raw.view(np.uint16).astype(np.uint32) << 16).view(np.float32)
+    return raw.view({"F64": np.float64, "F32": np.float32, "F16": np.float16}[dtype]).astype(np.float32, copy=False)
+
+def _f32_to(x: np.ndarray, out_name: str) -> np.ndarray:
+    """Rounds float32 to the output dtype (round-to-nearest-even, like torch). BF16 comes back as raw uint16."""
+    if out_name == "F32": return x
+    if out_name == "F16": return x.astype(np.float16)
+    bits = x.view(np.uint32)
+    r = bits >> 16; r &= 1; r += 0x7FFF; r += bits; r >>= 16  # in place: one temporary instead of four
+    out = r.astype(np.uint16)
+    nan = np.isnan(x)
+    if nan.any(): out[nan] = (bits[nan] >> 16).astype(np.uint16) | 0x40  # keep NaNs quiet
+    return out
+
+@lru_cache(maxsize=4096)
+def _lut(dtype: str, out_name: str, recip: float = 1.0) -> np.ndarray:
+    """
+    Output value of every bit pattern of `dtype` (256 for FP8, 65536 for 16-bit floats),
+    with a scalar multiplier fused in. Each entry goes through the same float32 multiply and
+    final rounding as the torch path, so indexing the table gives bit-identical results.
+    """
+    codes = np.arange(256 if dtype in _FP8_NAMES else 65536, dtype=np.uint8 if dtype in _FP8_NAMES else np.uint16)
+    x = _to_f32(codes.view(np.uint8), dtype)
+    return _f32_to(x * np.float32(recip), out_name)
+
+def _np_reciprocal(mm: np.ndarray, data_start: int, entry, invert: bool):
+    """NumPy twin of find_reciprocal_scale for an already-resolved scale entry."""
+    _, dtype, shape, (b, e) = entry
+    scale = _to_f32(mm[data_start + b:data_start + e], dtype).reshape(shape)
+    if scale.size == 1:
+        val = float(scale.reshape(-1)[0])
+        if not invert: return val
+        return 1.0 if val == 0 else 1.0 / val
+    if not invert: return scale
+    scale = scale.astype(np.float64)
+    return (1.0 / np.where(scale == 0, 1.0, scale)).astype(np.float32)
+
+def _np_apply_scale(weight: np.ndarray, recip: np.ndarray) -> np.ndarray:
+    """NumPy twin of apply_scale_ for per-output-channel and block-wise multipliers."""
+    out = weight.shape[0]
+    if recip.size == out and recip.shape[0] == out:
+        weight *= recip.reshape(out, *([1] * (weight.ndim - 1)))
+    elif weight.ndim == 2 and recip.ndim == 2:
+        (rows, cols), (sr, sc) = weight.shape, recip.shape
+        bo, bi = _block_size(rows, sr), _block_size(cols, sc)
+        if rows == sr * bo and cols == sc * bi:
+            weight.reshape(sr, bo, sc, bi)[...] *= recip[:, None, :, None]
+        else:
+            weight *= np.repeat(np.repeat(recip, bo, 0)[:rows], bi, 1)[:, :cols]
+    else:
+        weight *= recip
+    return weight
+
+def _scale_blocks(shape, recip: np.ndarray):
+    """(multiplier grid, block rows, block cols) of a per-channel or block-wise scale over the weight seen as 2D, else None."""
+    out = shape[0]
+    if recip.size == out and recip.shape[0] == out:
+        return recip.reshape(out, 1), 1, int(np.prod(shape[1:], dtype=np.int64))
+    if len(shape) == 2 and recip.ndim == 2:
+        return recip, _block_size(shape[0], recip.shape[0]), _block_size(shape[1], recip.shape[1])
+    return None
+
+def _decode_scaled(raw: np.ndarray, dtype: str, shape, recip: np.ndarray, out_name: str) -> np.ndarray:
+    """FP8 weight times a tensor multiplier: one 256-entry table per scale block, or widen-multiply-narrow for tiny blocks."""
+    blocks = _scale_blocks(shape, recip)
+    if blocks is None or raw.size < 256 * recip.size:
+        return _f32_to(_np_apply_scale(_to_f32(raw, dtype).reshape(shape), recip), out_name)
+    grid, bo, bi = blocks
+    tables = _f32_to(_fp8_to_f32_table(dtype)[None, :] * grid.reshape(-1, 1), out_name)
+    src = raw.reshape(shape[0], -1)
+    out = np.empty(src.shape, dtype=tables.dtype)
+    for i in range(grid.shape[0]):
+        for j in range(grid.shape[1]):
+            blk = (slice(i * bo, (i + 1) * bo), slice(j * bi, (j + 1) * bi))
+            out[blk] = tables[i * grid.shape[1] + j][src[blk]]
+    return out.reshape(shape)
+
+def numpy_convert(src: str, dst: str, *, out_name: str, strip_fp8: bool):
+    """
+    Torch-free equivalent of stream_convert, down to the byte: the output keeps its tensor order (by name).
+    The source is memory-mapped as raw bytes; an FP8 weight with a scalar scale is decoded by one table lookup
+    per element, straight into the output dtype.
+    """
+    header, data_start = read_header(src)
+    mm = np.memmap(src, dtype=np.uint8, mode="r")
+    by_name = {e[0]: e for e in header}
+    dtypes = {name: dtype for name, dtype, _, _ in header}
+
+    fp8_weight_keys = {k for k, dt in dtypes.items() if _WEIGHT_RE.search(k) and dt in _FP8_NAMES}
+    scale_index = build_scale_index(dtypes)
+    dropped = keys_to_drop(dtypes, fp8_weight_keys, strip_fp8)
+
+    entries, plan = [], []
+    for name, dtype, shape, span in sorted(header):
+        if name in dropped: continue
+        out_dtype = out_name if dtype in _FP8_NAMES or dtype in ("F64", "F32", "F16", "BF16") else dtype
+        entries.append((name, out_dtype, shape))
+        plan.append((name, dtype, shape, span, out_dtype))
+
+    print(f"Processing {len(fp8_weight_keys)} FP8 tensors (numpy engine)...")
+    restored = 0
+    # inf * 0 and out-of-range narrowing behave exactly like torch; NumPy would only warn about them
+    with StreamingWriter(dst, entries) as writer, np.errstate(all="ignore"):
+        for name, dtype, shape, (b, e), out_dtype in plan:
+            raw = mm[data_start + b:data_start + e]
+            if name in fp8_weight_keys:
+                base = name[:-7] # removes ".weight"
+                if base in scale_index:
+                    key, invert = scale_index[base]
+                    recip = _np_reciprocal(mm, data_start, by_name[key], invert)
+                else:
+                    if restored < 5 or restored % 100 == 0:
+                        print(f"⚠️ Warning: No scale found for '{base}'. Defaulting to 1.0")
+                    recip = 1.0
+                if isinstance(recip, float):
+                    out = _lut(dtype, out_name, recip)[raw]
+                else:
+                    out = _decode_scaled(raw, dtype, shape, recip, out_name)
+                restored += 1
+            elif dtype == out_dtype:
+                out = raw
+            elif dtype in ("F16", "BF16"):
+                out = _lut(dtype, out_name)[raw.view(np.uint16)]
+            else:
+                out = _f32_to(_to_f32(raw, dtype), out_name)
+            writer.write(name, out)
+            del raw, out
+    del mm
+
+    print("\n―――――――― CONVERSION SUMMARY ―――――――")
+    print(f"FP8 weights restored : {restored}")
+    print(f"Total tensors         : {len(entries)}")
+    print("――――――――――――――――――――――――――――――――")
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Universal (Comfy/Standard) Dequantizer")
     ap.add_argument("--src", required=True, help="Input FP8 .safetensors file")
     ap.add_argument("--dst", required=True, help="Output .safetensors file")
-    ap.add_argument("--dtype", choices=DTYPE_MAP.keys(), default="bf16")
+    ap.add_argument("--dtype", choices=OUT_NAMES.keys(), default="bf16")
     ap.add_argument("--strip-fp8", action="store_true")
+    ap.add_argument("--stream", action="store_true", help="Memory-mapped, tensor-at-a-time conversion (low RAM)")
+    ap.add_argument("--engine", choices=["torch", "numpy"], default="torch" if TORCH_AVAILABLE else "numpy",
+                    help="numpy: torch-free lookup-table decode (always streams)")
     args = ap.parse_args()
 
+    if args.engine == "numpy":
+        print(f"Streaming {args.src} -> {args.dst} (numpy engine) ...")
+        try:
+            numpy_convert(args.src, args.dst, out_name=OUT_NAMES[args.dtype], strip_fp8=args.strip_fp8)
+        except Exception as err:
+            print("❌ Failed to convert .safetensors:", err, file=sys.stderr)
+            sys.exit(1)
+        print("Done ✅")
+        return
+    if not TORCH_AVAILABLE:
+        sys.exit("❌ torch is not installed: use --engine numpy")
+
     out_dtype = DTYPE_MAP[args.dtype]
 
+    if args.stream:
+        print(f"Streaming {args.src} -> {args.dst} ...")
+        try:
+            stream_convert(args.src, args.dst, out_dtype=out_dtype, strip_fp8=args.strip_fp8)
+        except Exception as err:
+            print("❌ Failed to convert .safetensors:", err, file=sys.stderr)
+            sys.exit(1)
+        print("Done ✅")
+        return
+
     print(f"Loading {args.src} ...")
     sd = load_file(args.src, device="cpu")
 
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""gguf_surgery.py — Replace tensors of a GGUF file without rewriting the whole model
+* The header is parsed with gguf.GGUFReader; magic, counts and KV data are kept byte for byte
+* Only the tensor-info section is re-serialized (new shape, type and offset of the replaced tensors)
+* Replacement data goes into the tensor's old slot when it fits, otherwise it is appended at the end of the file
+* When the new tensor info still ends in the alignment unit before the data section, the file is patched in place;
+  otherwise (it grew past it or shrank below it) the data section is shifted by whole alignment units into a new copy
+* Used for the 5D fix: tensors convert.py had to flatten to 4D are restored from fix_5d_tensors_*.safetensors
+* rewrite_gguf() streams a copy without some tensors (e.g. scalars), keeping every KV field, in constant memory
+"""
+
+import os
+import shutil
+import struct
+import sys
+from dataclasses import dataclass
+
+import gguf
+
+from safetensors_stream import read_header
+
+# --------- helpers & constants ---------
+COPY_CHUNK = 64 << 20
+GGML_TYPES = {"F64": gguf.GGMLQuantizationType.F64, "F32": gguf.GGMLQuantizationType.F32,
+              "F16": gguf.GGMLQuantizationType.F16, "BF16": gguf.GGMLQuantizationType.BF16,
+              "I64": gguf.GGMLQuantizationType.I64, "I32": gguf.GGMLQuantizationType.I32,
+              "I16": gguf.GGMLQuantizationType.I16, "I8": gguf.GGMLQuantizationType.I8}
+
+
+@dataclass
+class TensorInfo:
+    name: str
+    dims: list          # GGML order (innermost first), i.e. the reverse of the NumPy shape
+    ggml_type: int
+    offset: int         # relative to the start of the data section
+
+
+@dataclass
+class Replacement:
+    """New contents of one tensor: `nbytes` raw bytes at `begin` in file `path`."""
+    ggml_type: int
+    dims: list
+    path: str
+    begin: int
+    nbytes: int
+
+
+def _align(n: int, alignment: int) -> int:
+    return (n + alignment - 1) // alignment * alignment
+
+
+def _numel(dims) -> int:
+    n = 1
+    for d in dims: n *= int(d)
+    return n
+
+
+def tensor_nbytes(t: TensorInfo) -> int:
+    block_size, type_size = gguf.GGML_QUANT_SIZES[gguf.GGMLQuantizationType(t.ggml_type)]
+    return _numel(t.dims) // block_size * type_size
+
+
+def is_scalar(t: TensorInfo) -> bool:
+    """0-dim tensor: llama-quantize (and older gguf readers) cannot handle these."""
+    return not t.dims
+
+
+def read_layout(path: str) -> tuple[int, int, int, list[TensorInfo]]:
+    """(alignment, offset of the tensor-info section, offset of the data section, tensor infos in file order)."""
+    reader = gguf.GGUFReader(path)
+    if reader.byte_order == "S": raise ValueError("big-endian GGUF files are not supported")
+    if not reader.tensors: raise ValueError("GGUF file has no tensors")
+    infos = [TensorInfo(t.name, [int(d) for d in t.field.parts[3]], int(t.tensor_type), int(t.field.parts[5][0])) for t in reader.tensors]
+    layout = (int(reader.alignment), int(reader.tensors[0].field.offset), int(reader.data_offset), infos)
+    del reader  # releases the memory map before the file is written to
+    return layout
+
+
+def tensor_info_bytes(infos) -> bytes:
+    out = bytearray()
+    for t in infos:
+        name = t.name.encode("utf-8")
+        out += struct.pack("<Q", len(name)) + name
+        out += struct.pack(f"<I{len(t.dims)}Q", len(t.dims), *t.dims)
+        out += struct.pack("<IQ", t.ggml_type, t.offset)
+    return bytes(out)
+
+
+def load_fix(path: str) -> dict[str, Replacement]:
+    """Replacements for every tensor stored in a .safetensors file (header read only; data is copied later)."""
+    entries, data_start = read_header(path)
+    out = {}
+    for name, dtype, shape, (begin, end) in entries:
+        if dtype not in GGML_TYPES: raise ValueError(f"{name}: dtype {dtype} has no GGML equivalent")
+        out[name] = Replacement(int(GGML_TYPES[dtype]), list(reversed(shape)) or [1], path, data_start + begin, end - begin)
+    return out
+
+
+def _copy_bytes(fs, begin: int, nbytes: int, dst) -> None:
+    fs.seek(begin)
+    while nbytes > 0:
+        chunk = fs.read(min(COPY_CHUNK, nbytes))
+        if not chunk: raise EOFError(f"{fs.name} ends early")
+        dst.write(chunk)
+        nbytes -= len(chunk)
+
+
+def _copy_range(src_path: str, begin: int, nbytes: int, dst) -> None:
+    with open(src_path, "rb") as fs: _copy_bytes(fs, begin, nbytes, dst)
+
+
+def patch_tensors(path: str, replacements: dict[str, Replacement], dst: str | None = None) -> str:
+    """Replaces tensors of the GGUF at `path` (or of a copy at `dst`). Tensors absent from the file are ignored.
+    Everything is validated before the first byte is written. Returns "in place", "rewritten" or "unchanged"."""
+    if dst and os.path.abspath(dst) != os.path.abspath(path):
+        from materialize import materialize
+        materialize(path, dst, link=False)  # the copy is patched in place: it must not share an inode with `path`
+        path = dst
+
+    alignment, ti_start, data_offset, infos = read_layout(path)
+    by_name = {t.name: t for t in infos}
+    todo = {name: rep for name, rep in replacements.items() if name in by_name}
+    if not todo: return "unchanged"
+
+    data_size = os.path.getsize(path) - data_offset
+    starts = sorted({t.offset for t in infos} | {data_size})
+    append_at = _align(data_size, alignment)
+    writes = []
+    for name, rep in todo.items():
+        t = by_name[name]
+        if _numel(rep.dims) != _numel(t.dims):
+            raise ValueError(f"{name}: {_numel(rep.dims)} elements in the fix, {_numel(t.dims)} in the model")
+        slot = starts[starts.index(t.offset) + 1] - t.offset
+        if rep.nbytes > slot:
+            t.offset, append_at = append_at, _align(append_at + rep.nbytes, alignment)
+        t.dims, t.ggml_type = rep.dims, rep.ggml_type
+        writes.append((t.offset, rep))
+
+    info = tensor_info_bytes(infos)
+    header_end = ti_start + len(info)
+    new_offset = _align(header_end, alignment)
+    if new_offset == data_offset:  # readers locate the data at align(end of tensor info): it must not move
+        with open(path, "r+b") as f:
+            for offset, rep in writes:
+                f.seek(data_offset + offset)
+                _copy_range(rep.path, rep.begin, rep.nbytes, f)
+            f.seek(ti_start)
+            f.write(info + b"\0" * (data_offset - header_end))
+        return "in place"
+
+    # The data section starts at another alignment unit now: shift it by whole units into a new file
+    tmp = f"{path}.part"
+    try:
+        with open(path, "rb") as fs, open(tmp, "wb") as fd:
+            fd.write(fs.read(ti_start))
+            fd.write(info + b"\0" * (new_offset - header_end))
+            fs.seek(data_offset)
+            shutil.copyfileobj(fs, fd, COPY_CHUNK)
+            for offset, rep in writes:
+                fd.seek(new_offset + offset)
+                _copy_range(rep.path, rep.begin, rep.nbytes, fd)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return "rewritten"
+
+
+def rewrite_gguf(src: str, dst: str, keep=lambda t: True) -> tuple[int, int]:
+    """Streams `src` into `dst` with every KV field intact and only the tensors `keep(TensorInfo)` accepts.
+    Tensor data is copied in large chunks, one tensor at a time, so memory use does not grow with the model.
+    `dst` may be `src`. Returns (tensors kept, tensors dropped)."""
+    alignment, ti_start, data_offset, infos = read_layout(src)
+    sources = {t.name: (data_offset + t.offset, tensor_nbytes(t)) for t in infos}
+    kept, offset = [], 0
+    for t in infos:
+        if not keep(t): continue
+        kept.append(TensorInfo(t.name, t.dims, t.ggml_type, offset))
+        offset = _align(offset + sources[t.name][1], alignment)
+
+    info = tensor_info_bytes(kept)
+    new_offset, tmp = _align(ti_start + len(info), alignment), f"{dst}.part"
+    try:
+        with open(src, "rb") as fs, open(tmp, "wb") as fd:
+            head = bytearray(fs.read(ti_start))
+            struct.pack_into("<Q", head, 8, len(kept))  # tensor count; magic, version, KV count and KV data are unchanged
+            fd.write(head)
+            fd.write(info)
+            for t in kept:
+                fd.write(b"\0" * (new_offset + t.offset - fd.tell()))
+                _copy_bytes(fs, *sources[t.name], fd)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return len(kept), len(infos) - len(kept)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Restore 5D tensors of a quantized GGUF from a fix file, in place when possible")
+    parser.add_argument("--src", required=True, help="GGUF file to patch")
+    parser.add_argument("--fix", required=True, help="fix_5d_tensors_*.safetensors written by convert.py")
+    parser.add_argument("--dst", help="write the patched model here instead of patching --src")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    how = patch_tensors(args.src, load_fix(args.fix), args.dst)
+    print(f"{args.dst or args.src}: {how} ({time.perf_counter() - t0:.2f}s)")
+    sys.exit(0)
@@ -56,7 +56,7 @@ def ensure_dependencies():
         "gguf": "gguf",
         "prompt_toolkit": "prompt_toolkit",
         "requests": "requests",
-        "torch": "torch"
+        "torch": "torch"  # convert.py (every GGUF target) imports it; FP8 alone can run on the NumPy engine
     }
     missing_or_wrong = []
     for pkg_pip, mod_name in dependencies.items():
@@ -84,10 +84,23 @@ class DependencyManager:
     """Checks for, downloads, and compiles required tools."""
     SOURCES = {
         "dequantize_fp8v2.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/dequantize_fp8v2.py",
+        "dequant_convert.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/dequant_convert.py",
         "convert.py": "https://raw.githubusercontent.com/city96/ComfyUI-GGUF/refs/heads/auto_convert/tools/convert.py",
         "lcpp.patch": "https://raw.githubusercontent.com/city96/ComfyUI-GGUF/refs/heads/auto_convert/tools/lcpp.patch",
         "fix_5d_tensors.py": "https://raw.githubusercontent.com/city96/ComfyUI-GGUF/refs/heads/auto_convert/tools/fix_5d_tensors.py",
-        "upload_to_hf.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/upload_to_hf.py"
+        "upload_to_hf.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/upload_to_hf.py",
+        "safetensors_stream.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/safetensors_stream.py",
+        "safetensors_scan.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/safetensors_scan.py",
+        "job_scheduler.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/job_scheduler.py",
+        "upload_queue.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/upload_queue.py",
+        "sha256_cache.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/sha256_cache.py",
+        "prep_cache.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/prep_cache.py",
+        "job_journal.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/job_journal.py",
+        "artifact_manifest.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/artifact_manifest.py",
+        "materialize.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/materialize.py",
+        "tool_worker.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/tool_worker.py",
+        "gguf_surgery.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/gguf_surgery.py",
+        "quantize_fp8.py": "https://raw.githubusercontent.com/Santodan/GGUF-Converter-GUI/refs/heads/main/PyTorch/quantize_fp8.py"
     }
 
     @staticmethod
@@ -240,63 +253,19 @@ def try_load_uploader():
     return False
 try_load_uploader()
 
-try:
-    import torch; from safetensors.torch import save_file, load_file
-    TORCH_AVAILABLE = True
-except ImportError: TORCH_AVAILABLE = False
+# torch is only an optional accelerator for FP8: look it up without paying for the import
+TORCH_AVAILABLE = importlib.util.find_spec("torch") is not None
 
 # --- CONFIG ---
+PIPELINE_DEPTH = 1  # models a pipeline stage may run ahead of the next one (bounds intermediates on disk)
+NO_SCALARS_SUFFIX = "-CONVERT-NoScalars.gguf"  # llama-quantize input when CONVERT.gguf has 0-dim tensors; always cleaned up
+POOLED_TOOLS = ("convert.py", "fix_5d_tensors.py")  # Python tools run on long-lived workers instead of a new interpreter each
 QUANT_GROUPS = [
     ["F16", "BF16"], ["Q2_K"], ["Q3_K_S", "Q3_K_M", "Q3_K_L"],
     ["Q4_0", "Q4_K_S", "Q4_K_M"], ["Q5_0", "Q5_K_S", "Q5_K_M"],
     ["Q6_K", "Q8_0"], ["FP8_E5M2", "FP8_E5M2 (All)"]
 ]
 
-if TORCH_AVAILABLE:
-    class FP8Quantizer:
-        def __init__(self, quant_dtype: str = "float8_e5m2"): self.quant_dtype = quant_dtype
-        def quantize_weights(self, weight: torch.Tensor) -> torch.Tensor:
-            if not weight.is_floating_point(): return weight
-            dev = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
-            w = weight.to(dev); mx = torch.max(torch.abs(w))
-            if mx == 0: return torch.zeros_like(w, dtype=getattr(torch, self.quant_dtype))
-            scale = torch.max(mx / 127.0, torch.tensor(1e-12, device=dev, dtype=w.dtype))
-            q = torch.round(w / scale * 127.0) / 127.0 * scale
-            return q.to(dtype=getattr(torch, self.quant_dtype))
-        def apply_quantization_to_file(self, src_path, dst_path, unet_only=True, check_stop_func=None):
-            if src_path.endswith(".safetensors"): state_dict = load_file(src_path)
-            else: state_dict = torch.load(src_path, map_location="cpu")
-            
-            quantized_dict = {}
-            total = len(state_dict)
-            
-            for i, (name, param) in enumerate(state_dict.items()):
-                if check_stop_func and check_stop_func(): return False
-                
-                # Progress update (Every 5 tensors)
-                if i % 5 == 0 or i == total - 1:
-                    percent = (i + 1) / total * 100
-                    # Use \r to overwrite the line
-                    sys.stdout.write(f"\r[FP8 Progress] {percent:3.1f}% | Tensor {i+1}/{total}")
-                    sys.stdout.flush()
-
-                if unet_only and "model.diffusion_model" not in name:
-                    quantized_dict[name] = param
-                    continue 
-                
-                if isinstance(param, torch.Tensor) and param.is_floating_point():
-                    quantized_dict[name] = self.quantize_weights(param)
-                else:
-                    quantized_dict[name] = param
-            
-            print("") # Move to next line after progress is done
-            if not quantized_dict: return False
-            save_file(quantized_dict, dst_path)
-            return True
-else:
-    class FP8Quantizer:
-        pass
-
 # --- GUI UTILS ---
 class DualOutput:
     def __init__(self, original_stream, msg_queue, log_file_handle):
@@ -368,6 +337,13 @@ class ProgressPopup(tk.Toplevel):
         elif status == "ERROR": lbl.config(bg="#ff9999", text="Error")
         elif status == "SKIP": lbl.config(bg="#eeeeee", text="-")
         elif status == "CANCEL": lbl.config(bg="#ffcc00", text="Cancel")
+        # Per-file upload state, shown in the artifact's own column once it is built
+        elif status == "QUEUED": lbl.config(bg="#cce5ff", text="Queued ↑")
+        elif status == "UPLOADING": lbl.config(bg="#99ccff", text="Uploading")
+        elif status == "RETRY": lbl.config(bg="#ffd9b3", text="Retrying")
+        elif status == "UPLOADED": lbl.config(bg="#66cc66", text="Uploaded")
+        elif status == "UP_TO_DATE": lbl.config(bg="#b3e6b3", text="On Hub")
+        elif status == "UPLOAD_ERROR": lbl.config(bg="#ff9999", text="Upload Err")
         else: lbl.config(bg="#cccccc", text="...")
 
 # --- MAIN APP ---
@@ -389,6 +365,12 @@ class ConverterApp:
         self.quant_vars_up = {}
         self.quant_vars_keep = {}
         self.current_process = None
+        self.child_processes = set()
+        self.upload_queue = None
+        self.hf_api = None
+        self.journal = None
+        self.tool_digests = {}
+        self.tool_pool = None
         self.stop_requested = False
         self.progress_window = None
         
@@ -499,7 +481,7 @@ class ConverterApp:
         # 4. Quants
         f_quant = tk.LabelFrame(self.content_frame, text="4. Quantization", padx=5, pady=5)
         f_quant.pack(fill="x", padx=5, pady=5)
-        if not TORCH_AVAILABLE: tk.Label(f_quant, text="⚠️ Torch missing. FP8 disabled.", fg="red").grid(row=0, column=0, columnspan=10)
+        if not TORCH_AVAILABLE: tk.Label(f_quant, text="⚠️ Torch missing: GGUF targets disabled (FP8 uses the NumPy engine).", fg="red").grid(row=0, column=0, columnspan=10)
         for col_idx, group in enumerate(QUANT_GROUPS):
             base_col = col_idx * 5  
             tk.Label(f_quant, text="Type", font="Arial 8 bold").grid(row=1, column=base_col, sticky="w")
@@ -515,7 +497,6 @@ class ConverterApp:
                 self.quant_vars_up[q] = vu
                 self.quant_vars_keep[q] = vk
                 state = "normal"
-                if "FP8" in q and not TORCH_AVAILABLE: state = "disabled"
                 def sync(g=vg, u=vu, k=vk): 
                     if g.get(): 
                         u.set(True)
@@ -555,6 +536,9 @@ class ConverterApp:
         tk.Label(self.global_upload_frame, text="FP8 Folder:").grid(row=1, column=2, sticky="e")
         self.hf_dest_fp8 = tk.StringVar()
         tk.Entry(self.global_upload_frame, textvariable=self.hf_dest_fp8).grid(row=1, column=3, sticky="ew", padx=5)
+        tk.Label(self.global_upload_frame, text="Model Card (.md):").grid(row=2, column=0, sticky="e")
+        self.hf_card = tk.StringVar()
+        tk.Entry(self.global_upload_frame, textvariable=self.hf_card).grid(row=2, column=1, columnspan=3, sticky="ew", padx=5)
         self.global_upload_frame.columnconfigure(1, weight=1)
         self.global_upload_frame.columnconfigure(3, weight=1)
         self.custom_upload_frame = tk.Frame(f_sets)
@@ -571,20 +555,65 @@ class ConverterApp:
         
         self.keep_dequant_var = tk.BooleanVar(value=False)
         self.keep_convert_var = tk.BooleanVar(value=False)
-        tk.Checkbutton(f_c, text="Keep Dequant Source", variable=self.keep_dequant_var, fg="orange").pack(side="left", padx=10)
+        tk.Checkbutton(f_c, text="Keep Dequant Source (debug)", variable=self.keep_dequant_var, fg="orange").pack(side="left", padx=10)
         tk.Checkbutton(f_c, text="Keep GGUF Source (CONVERT)", variable=self.keep_convert_var, fg="orange").pack(side="left")
         f_sets.columnconfigure(2, weight=1)
 
-        # 6. Actions
+        # 6. Performance
+        f_perf = tk.LabelFrame(self.content_frame, text="6. Performance", padx=5, pady=5)
+        f_perf.pack(fill="x", padx=5, pady=5)
+        tk.Label(f_perf, text="FP8 Workers:").grid(row=0, column=0, sticky="e")
+        self.fp8_workers_var = tk.StringVar(value=str(os.cpu_count() or 1))
+        tk.Entry(f_perf, textvariable=self.fp8_workers_var, width=6).grid(row=0, column=1, sticky="w", padx=5)
+        tk.Label(f_perf, text="FP8 RAM Budget (GB):").grid(row=0, column=2, sticky="e")
+        self.fp8_budget_var = tk.StringVar(value="4")
+        tk.Entry(f_perf, textvariable=self.fp8_budget_var, width=6).grid(row=0, column=3, sticky="w", padx=5)
+        tk.Label(f_perf, text="FP8 Engine:").grid(row=0, column=4, sticky="e")
+        self.fp8_engine_var = tk.StringVar(value="auto")
+        tk.OptionMenu(f_perf, self.fp8_engine_var, "auto", "torch", "numpy").grid(row=0, column=5, sticky="w", padx=5)
+        tk.Label(f_perf, text="Parallel Quants:").grid(row=1, column=0, sticky="e")
+        self.quant_jobs_var = tk.StringVar(value="auto")
+        tk.Entry(f_perf, textvariable=self.quant_jobs_var, width=6).grid(row=1, column=1, sticky="w", padx=5)
+        tk.Label(f_perf, text="Quant RAM Budget (GB):").grid(row=1, column=2, sticky="e")
+        self.quant_ram_var = tk.StringVar(value="auto")
+        tk.Entry(f_perf, textvariable=self.quant_ram_var, width=6).grid(row=1, column=3, sticky="w", padx=5)
+        tk.Label(f_perf, text="Parallel Uploads:").grid(row=1, column=4, sticky="e")
+        self.upload_jobs_var = tk.StringVar(value="2")
+        tk.Entry(f_perf, textvariable=self.upload_jobs_var, width=6).grid(row=1, column=5, sticky="w", padx=5)
+        tk.Label(f_perf, text="Prep Cache (GB):").grid(row=2, column=0, sticky="e")
+        self.prep_cache_var = tk.StringVar(value="100")
+        tk.Entry(f_perf, textvariable=self.prep_cache_var, width=6).grid(row=2, column=1, sticky="w", padx=5)
+        tk.Label(f_perf, text="Cache Dir:").grid(row=2, column=2, sticky="e")
+        self.prep_cache_dir_var = tk.StringVar()
+        tk.Entry(f_perf, textvariable=self.prep_cache_dir_var, width=24).grid(row=2, column=3, sticky="w", padx=5)
+        tk.Label(f_perf, text="Upload Retries:").grid(row=2, column=4, sticky="e")
+        self.upload_retries_var = tk.StringVar(value="4")
+        tk.Entry(f_perf, textvariable=self.upload_retries_var, width=6).grid(row=2, column=5, sticky="w", padx=5)
+        tk.Label(f_perf, text="Tool Workers (0 = off):").grid(row=3, column=0, sticky="e")
+        self.tool_workers_var = tk.StringVar(value="2")
+        tk.Entry(f_perf, textvariable=self.tool_workers_var, width=6).grid(row=3, column=1, sticky="w", padx=5)
+
+        # 7. Actions
         f_act = tk.Frame(self.content_frame)
         f_act.pack(fill="x", padx=5, pady=10)
         self.shutdown_var = tk.BooleanVar()
         tk.Checkbutton(f_act, text="Shutdown when done", variable=self.shutdown_var, fg="red").pack(side="left")
+        self.force_var = tk.BooleanVar()
+        tk.Checkbutton(f_act, text="Force rebuild", variable=self.force_var).pack(side="left", padx=10)
         tk.Button(f_act, text="SHOW STATUS", command=self.show_progress_popup).pack(side="left", padx=20)
+        tk.Button(f_act, text="RESUME", bg="#ddeeff", command=self.resume_thread).pack(side="left")
         tk.Button(f_act, text="CANCEL", bg="#ffcccc", command=self.cancel_processing).pack(side="right")
         self.btn_run = tk.Button(f_act, text="START PROCESSING", bg="#ddffdd", height=2, command=self.start_thread)
         self.btn_run.pack(side="right", fill="x", expand=True, padx=5)
 
+    def _get_number(self, var, default, cast=int):
+        """Reads a numeric setting from an Entry, falling back to `default` on empty/invalid input."""
+        try:
+            value = cast(var.get())
+            return value if value > 0 else default
+        except (ValueError, tk.TclError):
+            return default
+
     def clear_logs(self):
         self.log_display.configure(state='normal')
         self.log_display.delete("1.0", tk.END)
@@ -724,8 +753,10 @@ class ConverterApp:
         if messagebox.askyesno("Cancel", "Stop processing?"):
             self.stop_requested = True
             logging.warning("STOP REQUESTED")
-            if self.current_process:
-                try: self.current_process.kill()
+            if self.upload_queue: self.upload_queue.cancel()
+            for proc in list(self.child_processes) + [self.current_process]:
+                if not proc: continue
+                try: proc.kill()
                 except: pass
 
     def process_queue(self):
@@ -783,7 +814,28 @@ class ConverterApp:
             
         self.root.after(10, self.process_queue)
 
-    def start_thread(self):
+    def _journal_path(self):
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_journal.json")
+
+    def resume_thread(self):
+        """Restores the files and quant selection of the last batch from its journal and runs only what is left of it."""
+        if self.is_running: return
+        try:
+            from job_journal import JobJournal
+            spec = JobJournal(self._journal_path()).spec
+        except Exception as e:
+            return messagebox.showerror("Error", f"Cannot read the job journal: {e}")
+        if not spec: return messagebox.showinfo("Resume", "No interrupted batch to resume.")
+        missing = [f for f in spec["sources"] if not os.path.exists(f)]
+        if missing: logging.warning(f"Resume: {len(missing)} source files no longer exist: {', '.join(map(os.path.basename, missing))}")
+        self.source_files = [f for f in spec["sources"] if os.path.exists(f)]
+        for q, v in self.quant_vars_gen.items(): v.set(q in spec["gen"])
+        for q, v in self.quant_vars_up.items(): v.set(q in spec["up"])
+        self.refresh_file_list_ui()
+        if self.upload_mode_var.get() == "custom": self.refresh_upload_ui()
+        self.start_thread(resume=True)
+
+    def start_thread(self, resume=False):
         if self.is_running: return
         if not self.source_files: return messagebox.showerror("Error", "No files")
         
@@ -802,6 +854,8 @@ class ConverterApp:
 
         fp8_variants = ["FP8_E5M2", "FP8_E5M2 (All)", "FP8_E4M3FN", "FP8_E4M3FN (All)"]
         gguf_gen_needed = [q for q in gen if q not in fp8_variants]
+        if gguf_gen_needed and not TORCH_AVAILABLE and any(not f.lower().endswith(".gguf") for f in self.source_files):
+            return messagebox.showerror("Error", f"torch is not installed: convert.py cannot build {', '.join(gguf_gen_needed)}.\nInstall torch or select FP8 targets only.")
         if gguf_gen_needed: steps.append("GGUF Prep")
         
         for q in active_quants: steps.append(q)
@@ -812,6 +866,16 @@ class ConverterApp:
         model_names = [os.path.basename(f) for f in self.source_files]
         self.progress_window.setup_grid(model_names, steps)
 
+        # Every finished (model, step) cell is journaled; a fresh start forgets the previous batch
+        try:
+            from job_journal import JobJournal
+            self.journal = JobJournal(self._journal_path())
+            if not resume: self.journal.start({"sources": list(self.source_files), "gen": gen, "up": up_only})
+            else: logging.info(f"Resuming the batch started {time.ctime(self.journal.spec.get('started', 0))}")
+        except Exception as e:
+            logging.warning(f"Job journal unavailable, this batch cannot be resumed: {e}")
+            self.journal = None
+
         self.is_running = True
         self.btn_run.config(state="disabled")
         threading.Thread(target=self.run_main_logic, args=(gen, up_only)).start()
@@ -836,140 +900,76 @@ class ConverterApp:
             keep_convert = self.keep_convert_var.get()
             out_mode = self.out_mode_var.get()
             up_mode = self.upload_mode_var.get()
+            self.tool_digests = {}  # tools may have been updated since the last batch
             
             if self.do_upload.get() and UPLOADER_AVAILABLE:
                 from huggingface_hub import login
                 login(token=self.hf_token.get(), add_to_git_credential=False)
+                # Each artifact's LFS payload is sent as soon as it is renamed into place, while the next one is computed;
+                # the model's files are then committed together once it is finished
+                from upload_queue import UploadQueue
+                self.hf_api = uploader.HfApi(token=self.hf_token.get() or None)
+                # Transient failures are retried per file with backoff; the worker keeps its slot, so concurrency stays capped
+                retry = lambda fn, job, on_retry: uploader.call_with_retries(
+                    fn, attempts=self._upload_attempts(), label=os.path.basename(job.path), on_retry=on_retry, cancelled=lambda: self.stop_requested)
+                self.upload_queue = UploadQueue(self._preupload_artifact, self._get_number(self.upload_jobs_var, 2), self._on_upload_state, retry)
+
+            # convert.py / fix_5d_tensors.py run on workers that import torch & co. once per batch, not once per call
+            try: tool_workers = int(self.tool_workers_var.get())
+            except (ValueError, tk.TclError): tool_workers = 2
+            if tool_workers > 0:
+                try:
+                    from tool_worker import ToolPool
+                    self.tool_pool = ToolPool(sys.executable, tool_workers, self._tool_env())
+                    self.tool_pool.warm(1)
+                except Exception as e:
+                    logging.warning(f"Tool workers unavailable ({e}), starting a new process per call")
 
+            # Three stages overlap across models: GGUF prep of N+1 | FP8 + quantize of N | upload & cleanup of N-1.
+            # Prep runs at most PIPELINE_DEPTH models ahead and finished models wait in a bounded queue,
+            # so only a few models' intermediates are on disk at any time.
             batch_results = []
-            for f in self.source_files:
-                if self.stop_requested: break
-                
-                fix_file = "fix_5d_tensors_wan.safetensors"
-                if os.path.exists(fix_file):
-                    try: os.remove(fix_file)
-                    except: pass
-
-                model_base = os.path.basename(f)
-                name = re.sub(r'-(f16|F16|BF16|CONVERT|UnFixed|FIXED)$', '', os.path.splitext(model_base)[0], flags=re.IGNORECASE)
-                
-                if out_mode == "custom":
-                    dat = self.custom_file_data.get(f, {})
-                    out_dir = dat["out"].get() if "out" in dat else os.path.dirname(f)
-                else:
-                    base = self.out_dir_var.get() if self.out_dir_var.get() else os.path.dirname(f)
-                    out_dir = os.path.join(base, name) if out_mode == "folder" else base
-                
-                os.makedirs(out_dir, exist_ok=True)
-                
-                # Clean both possible locations where fix files might linger
-                locations_to_clean = [
-                    os.path.dirname(os.path.abspath(__file__)),  # GUI script folder
-                    out_dir                                     # current model's output folder
-                ]
-                
-                for loc in locations_to_clean:
-                    for stale in glob.glob(os.path.join(loc, "fix_5d_tensors_*.safetensors")):
-                        try:
-                            os.remove(stale)
-                            logging.info(f"Cleaned stale fix file from {loc}: {stale}")
-                        except Exception as e:
-                            logging.debug(f"Could not remove {stale}: {e}")
-                
-                generated_files = []
+            prep_slots = threading.Semaphore(PIPELINE_DEPTH)
+            prepped, finished = queue.Queue(), queue.Queue(maxsize=PIPELINE_DEPTH)
 
-                # --- FP8 Logic ---
-                fp8_targets = ["FP8_E5M2", "FP8_E5M2 (All)", "FP8_E4M3FN", "FP8_E4M3FN (All)"]
-                for q in fp8_targets:
-                    if q in gen_list or q in up_list:
-                        if self.stop_requested: break
-                        self.msg_queue.put(("UPDATE_GRID", model_base, q, "RUNNING"))
-                        suffix = "_All" if "All" in q else ""
-                        base_q_name = q.split(" ")[0]
-                        expected_path = os.path.join(out_dir, f"{name}-{base_q_name}{suffix}.safetensors")
-                        if q in gen_list:
-                            try:
-                                if TORCH_AVAILABLE:
-                                    dtype_str = "float8_e5m2" if "E5M2" in q else "float8_e4m3fn"
-                                    qzer = FP8Quantizer(dtype_str)
-                                    ok = qzer.apply_quantization_to_file(f, expected_path, unet_only=("All" not in q), check_stop_func=lambda: self.stop_requested)
-                                    if ok: 
-                                        generated_files.append(expected_path)
-                                        self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
-                                    else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "CANCEL"))
-                                else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "ERROR"))
-                            except Exception as e:
-                                self.msg_queue.put(("UPDATE_GRID", model_base, q, "ERROR"))
-                        elif q in up_list:
-                            if os.path.exists(expected_path):
-                                generated_files.append(expected_path)
-                                self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
-                            else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
-
-                # --- GGUF Logic ---
-                raw_combined = gen_list + up_list
-                unique_tasks = list(set(raw_combined))
-                all_gguf_active = [q for q in unique_tasks if "FP8" not in q]
-                if all_gguf_active:
-                    gguf_gen_needed = [q for q in gen_list if "FP8" not in q]
-                    gguf_src = None
-                    if gguf_gen_needed:
-                        if self.stop_requested: break
-                        self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "RUNNING"))
-                        if f.lower().endswith(".safetensors"):
-                            curr = f
-                            dq = os.path.join(out_dir, f"{name}-dequant.safetensors")
-                            if os.path.exists("dequantize_fp8v2.py"):
-                                self.run_cmd([sys.executable, "-u", "dequantize_fp8v2.py", "--src", f, "--dst", dq, "--strip-fp8", "--dtype", "fp16"])
-                                if os.path.exists(dq): curr = dq; generated_files.append(dq)
-                            conv = os.path.join(out_dir, f"{name}-CONVERT.gguf")
-                            self.run_cmd([sys.executable, "-u", "convert.py", "--src", curr, "--dst", conv])
-                            if os.path.exists(conv): gguf_src = conv; generated_files.append(conv)
-                        elif f.lower().endswith(".gguf"): gguf_src = f
-                        if gguf_src: self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "DONE"))
-                        else: self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "ERROR"))
-                    
-                    for q in all_gguf_active:
+            def prep_stage():
+                try:
+                    for f in self.source_files:
+                        if self._journal_done(os.path.basename(f), "Cleanup"):
+                            # Finished (uploaded and cleaned up) before the interruption: nothing left to do
+                            for step in self.journal.steps(os.path.basename(f)): self.msg_queue.put(("UPDATE_GRID", os.path.basename(f), step, "DONE"))
+                            logging.info(f"[RESUME] {os.path.basename(f)} already finished, skipping")
+                            continue
+                        while not prep_slots.acquire(timeout=0.5):
+                            if self.stop_requested: break
                         if self.stop_requested: break
-                        self.msg_queue.put(("UPDATE_GRID", model_base, q, "RUNNING"))
-                        expected_path = os.path.join(out_dir, f"{name}-{q}.gguf")
-                        if q in gen_list:
-                            if not gguf_src: 
-                                self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
-                                continue
-                            if q in ["F16", "BF16"]:
-                                try:
-                                    shutil.copy(gguf_src, expected_path)
-                                    generated_files.append(expected_path)
-                                    self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
-                                except: self.msg_queue.put(("UPDATE_GRID", model_base, q, "ERROR"))
-                                continue
-                            unfixed = os.path.join(out_dir, f"{name}-{q}-UnFixed.gguf")
-                            if self.run_cmd([self.quant_cmd, gguf_src, unfixed, q]):
-                                final = unfixed
-                                fixes = glob.glob(os.path.join(out_dir, "fix_5d_tensors_*.safetensors"))
-                                if fixes:
-                                    fixed = os.path.join(out_dir, f"{name}-{q}-FIXED.gguf")
-                                    self.run_cmd([sys.executable, "-u", "fix_5d_tensors.py", "--src", unfixed, "--dst", fixed, "--fix", fixes[0], "--overwrite"])
-                                    if os.path.exists(fixed): final = fixed
-                                try: os.rename(final, expected_path); generated_files.append(expected_path)
-                                except: generated_files.append(final)
-                                if os.path.exists(unfixed) and os.path.abspath(unfixed) != os.path.abspath(expected_path):
-                                    try: os.remove(unfixed)
-                                    except: pass
-                                self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
-                            else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "ERROR"))
-                        elif q in up_list:
-                            if os.path.exists(expected_path):
-                                generated_files.append(expected_path)
-                                self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
-                            else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
-
-                generated_files = list(set(generated_files))
-                res_obj = { "name": name, "files": generated_files, "model_display": model_base, "src_path": f }
-                batch_results.append(res_obj)
-                if strategy == "per_model" and not self.stop_requested:
-                    self.handle_upload_cleanup(res_obj, keep_list, up_list, up_mode, out_mode, keep_dequant, keep_convert)
+                        try: prepped.put(self.prepare_model(f, gen_list, up_list, out_mode, keep_dequant))
+                        except Exception:
+                            logging.exception(f"GGUF prep failed for {os.path.basename(f)}")
+                            self.msg_queue.put(("UPDATE_GRID", os.path.basename(f), "GGUF Prep", "ERROR"))
+                            prep_slots.release()
+                finally:
+                    prepped.put(None)
+
+            def publish_stage():
+                while (item := finished.get()) is not None:
+                    batch_results.append(item)
+                    if strategy == "per_model" and not self.stop_requested:
+                        try: self.handle_upload_cleanup(item, keep_list, up_list, up_mode, out_mode, keep_dequant, keep_convert)
+                        except Exception: logging.exception(f"Upload/cleanup failed for {item['model_display']}")
+
+            stages = [threading.Thread(target=prep_stage, daemon=True), threading.Thread(target=publish_stage, daemon=True)]
+            for t in stages: t.start()
+            try:
+                # Keeps draining after a stop so the prep stage is never left blocked
+                while (ctx := prepped.get()) is not None:
+                    prep_slots.release()
+                    if self.stop_requested: continue
+                    try: finished.put(self.quantize_model(ctx, gen_list, up_list))
+                    except Exception: logging.exception(f"Quantization failed for {ctx['model_display']}")
+            finally:
+                finished.put(None)
+                for t in stages: t.join()
 
             if strategy == "all_end" and not self.stop_requested:
                 for item in batch_results:
@@ -984,11 +984,397 @@ class ConverterApp:
             logging.exception("Error")
             messagebox.showerror("Error", str(e))
         finally:
+            if self.upload_queue:
+                self.upload_queue.close(wait=not self.stop_requested)
+                files, nbytes, secs = self.upload_queue.stats()
+                if files: logging.info(f"[UPLOAD] Batch total: {files} files, {uploader.throughput(nbytes, secs)} aggregate")
+                self.upload_queue = self.hf_api = None
+            if self.tool_pool:
+                self.tool_pool.close()
+                self.tool_pool = None
             # Restore streams when thread finishes
             sys.stdout, sys.stderr = old_stdout, old_stderr
             self.is_running = False
             self.btn_run.config(state="normal")
 
+    def prepare_model(self, f, gen_list, up_list, out_mode, keep_dequant):
+        """Pipeline stage 1: output folder, stale fix files and the GGUF prep (CONVERT.gguf) of one model."""
+        fix_file = "fix_5d_tensors_wan.safetensors"
+        if os.path.exists(fix_file):
+            try: os.remove(fix_file)
+            except: pass
+
+        model_base = os.path.basename(f)
+        name = re.sub(r'-(f16|F16|BF16|CONVERT|UnFixed|FIXED)$', '', os.path.splitext(model_base)[0], flags=re.IGNORECASE)
+        
+        if out_mode == "custom":
+            dat = self.custom_file_data.get(f, {})
+            out_dir = dat["out"].get() if "out" in dat else os.path.dirname(f)
+        else:
+            base = self.out_dir_var.get() if self.out_dir_var.get() else os.path.dirname(f)
+            out_dir = os.path.join(base, name) if out_mode == "folder" else base
+        
+        os.makedirs(out_dir, exist_ok=True)
+        ctx = {"name": name, "model_display": model_base, "src_path": f, "out_dir": out_dir,
+               "files": [], "gguf_src": None, "quant_src": None, "fix_file": None}
+        
+        # Clean both possible locations where fix files might linger
+        locations_to_clean = [
+            os.path.dirname(os.path.abspath(__file__)),  # GUI script folder
+            out_dir                                     # current model's output folder
+        ]
+        
+        for loc in locations_to_clean:
+            for stale in glob.glob(os.path.join(loc, "fix_5d_tensors_*.safetensors")):
+                try:
+                    os.remove(stale)
+                    logging.info(f"Cleaned stale fix file from {loc}: {stale}")
+                except Exception as e:
+                    logging.debug(f"Could not remove {stale}: {e}")
+
+        all_gguf_active = [q for q in set(gen_list + up_list) if "FP8" not in q]
+        gguf_gen_needed = [q for q in gen_list if "FP8" not in q]
+        if not all_gguf_active or not gguf_gen_needed or self.stop_requested: return ctx
+
+        generated_files = ctx["files"]
+        gguf_src = None
+        if self._journal_done(model_base, "GGUF Prep"):
+            # Prepped before the interruption and its outputs are untouched: pick them up again
+            for path in self.journal.outputs(model_base, "GGUF Prep"):
+                if path.endswith("-CONVERT.gguf") or os.path.abspath(path) == os.path.abspath(f): gguf_src = path
+                if path.endswith(NO_SCALARS_SUFFIX): ctx["quant_src"] = path
+                if "fix_5d_tensors_" in os.path.basename(path): ctx["fix_file"] = path
+                if os.path.abspath(path) != os.path.abspath(f): generated_files.append(path)
+            logging.info(f"[RESUME] GGUF prep of {model_base} already done, skipping")
+            self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "DONE"))
+            ctx["gguf_src"] = gguf_src
+            return ctx
+        if all(self._journal_done(model_base, q) or self._up_to_date(ctx, os.path.join(out_dir, f"{name}-{q}.gguf"), q) for q in gguf_gen_needed):
+            logging.info(f"Every GGUF quant of {model_base} is already done or up to date, skipping its prep")
+            self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "SKIP"))
+            return ctx
+        self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "RUNNING"))
+        if f.lower().endswith(".safetensors"):
+            curr = f
+            dq = os.path.join(out_dir, f"{name}-dequant.safetensors")
+            conv = os.path.join(out_dir, f"{name}-CONVERT.gguf")
+            # Header-only scan: plain F16 checkpoints skip the dequant pass entirely
+            steps = ["dequant", "convert"]
+            try:
+                from safetensors_scan import scan, prep_steps
+                report = scan(f)
+                steps = prep_steps(report)
+                logging.info(f"[SCAN] {report.summary()} -> {' + '.join(steps)}")
+            except Exception as e:
+                logging.warning(f"Header scan failed ({e}), running the full GGUF prep")
+
+            # Same source bytes + same tool scripts + same options = same CONVERT.gguf: reuse it from the cache
+            cache, key, hit = self._prep_cache(), None, None
+            want_dq = keep_dequant and steps[0] != "convert"
+            if cache:
+                try:
+                    key = cache.key(f, {"steps": steps, "dtype": "fp16", "strip_fp8": True})
+                    hit = cache.get(key, required=["CONVERT.gguf"] + (["dequant.safetensors"] if want_dq else []))
+                except Exception as e:
+                    logging.warning(f"Prep cache unavailable ({e})")
+
+            if hit:
+                from prep_cache import link_or_copy
+                how = link_or_copy(hit["CONVERT.gguf"], conv)
+                logging.info(f"[CACHE] GGUF prep of {model_base} found in the cache ({key[:12]}, {how}), skipping {' + '.join(steps)}")
+                if want_dq: link_or_copy(hit["dequant.safetensors"], dq); generated_files.append(dq)
+                for fname, path in hit.items():
+                    if not fname.startswith("fix_5d_tensors_"): continue
+                    owned = os.path.join(out_dir, f"{name}-{fname}")
+                    link_or_copy(path, owned)
+                    ctx["fix_file"] = owned; generated_files.append(owned)
+            else:
+                if steps == ["convert"]:
+                    ok = self.run_cmd([sys.executable, "-u", "convert.py", "--src", f, "--dst", conv])
+                elif os.path.exists("dequant_convert.py"):
+                    # Dequantized tensors go straight into convert.py; the dequant file is only written when kept
+                    cmd = [sys.executable, "-u", "dequant_convert.py", "--src", f, "--dst", conv, "--strip-fp8", "--dtype", "fp16"]
+                    if keep_dequant: cmd += ["--keep-dequant", dq]
+                    ok = self.run_cmd(cmd)
+                    if keep_dequant and os.path.exists(dq): generated_files.append(dq)
+                else:
+                    if os.path.exists("dequantize_fp8v2.py"):
+                        self.run_cmd([sys.executable, "-u", "dequantize_fp8v2.py", "--src", f, "--dst", dq, "--strip-fp8", "--dtype", "fp16", "--stream"])
+                        if os.path.exists(dq): curr = dq; generated_files.append(dq)
+                    ok = self.run_cmd([sys.executable, "-u", "convert.py", "--src", curr, "--dst", conv])
+
+                # convert.py drops its 5D fix file in the working folder; give it a per-model name
+                # before the next model's prep starts (and cleans fix files) while this one still quantizes
+                fix_name = None
+                for loc in {os.getcwd(), *locations_to_clean}:
+                    for fix in glob.glob(os.path.join(loc, "fix_5d_tensors_*.safetensors")):
+                        owned = os.path.join(out_dir, f"{name}-{os.path.basename(fix)}")
+                        try:
+                            shutil.move(fix, owned)
+                            ctx["fix_file"] = owned; generated_files.append(owned); fix_name = os.path.basename(fix)
+                        except Exception as e:
+                            logging.warning(f"Could not claim fix file {fix}: {e}")
+
+                if cache and key and ok and os.path.exists(conv):
+                    files = {"CONVERT.gguf": conv}
+                    if want_dq and os.path.exists(dq): files["dequant.safetensors"] = dq
+                    if fix_name: files[fix_name] = ctx["fix_file"]
+                    try:
+                        if cache.put(key, files, source=f): logging.info(f"[CACHE] Stored GGUF prep of {model_base} ({key[:12]})")
+                        else: logging.info(f"[CACHE] GGUF prep of {model_base} is larger than the cache budget, not cached")
+                    except Exception as e:
+                        logging.warning(f"Could not cache the GGUF prep of {model_base}: {e}")
+            if os.path.exists(conv): gguf_src = conv; generated_files.append(conv)
+        elif f.lower().endswith(".gguf"): gguf_src = f
+        ctx["gguf_src"] = gguf_src
+        if gguf_src and any(q not in ["F16", "BF16"] for q in gguf_gen_needed): ctx["quant_src"] = self._strip_scalars(ctx, gguf_src)
+        if gguf_src: self._cell_done(model_base, "GGUF Prep", list(dict.fromkeys(generated_files + [gguf_src])))
+        else: self.msg_queue.put(("UPDATE_GRID", model_base, "GGUF Prep", "ERROR"))
+        return ctx
+
+    def _strip_scalars(self, ctx, gguf_src):
+        """The llama-quantize input: `gguf_src` itself, or a copy without its 0-dim tensors (they crash llama-quantize),
+        all metadata kept. `gguf_src` is never modified, so F16/BF16 still get every tensor; the copy is removed at cleanup."""
+        try:
+            from gguf_surgery import read_layout, rewrite_gguf, is_scalar
+            scalars = [t.name for t in read_layout(gguf_src)[3] if is_scalar(t)]
+            if not scalars: return gguf_src
+            dst = os.path.join(ctx["out_dir"], f"{ctx['name']}{NO_SCALARS_SUFFIX}")
+            t0 = time.time()
+            rewrite_gguf(gguf_src, dst, keep=lambda t: not is_scalar(t))
+            logging.info(f"Quantizing {os.path.basename(dst)}: {os.path.basename(gguf_src)} without its {len(scalars)} scalar tensors ({', '.join(scalars)}), written in {time.time() - t0:.1f}s")
+            if dst not in ctx["files"]: ctx["files"].append(dst)
+            return dst
+        except Exception as e:
+            logging.warning(f"Scalar tensor check failed ({e}), quantizing {os.path.basename(gguf_src)} as is")
+            return gguf_src
+
+    def _prep_cache(self):
+        """The GGUF prep cache, or None when its budget is 0 (disabled) or it cannot be opened."""
+        try: budget = float(self.prep_cache_var.get() or 0)
+        except (ValueError, tk.TclError): budget = 0
+        if budget <= 0: return None
+        root = self.prep_cache_dir_var.get() or os.path.join(os.path.dirname(os.path.abspath(__file__)), "prep_cache")
+        try:
+            from prep_cache import PrepCache
+            return PrepCache(root, int(budget * 1024**3))
+        except Exception as e:
+            logging.warning(f"Prep cache disabled: {e}")
+            return None
+
+    def quantize_model(self, ctx, gen_list, up_list):
+        """Pipeline stage 2: FP8 variants and every GGUF quant type of one prepared model."""
+        f, model_base, name, out_dir = ctx["src_path"], ctx["model_display"], ctx["name"], ctx["out_dir"]
+        generated_files, gguf_src = ctx["files"], ctx["gguf_src"]
+        quant_src = ctx.get("quant_src") or gguf_src
+
+        # --- FP8 Logic ---
+        # Every selected variant is produced from a single read of the source
+        fp8_targets = ["FP8_E5M2", "FP8_E5M2 (All)", "FP8_E4M3FN", "FP8_E4M3FN (All)"]
+        fp8_jobs = []
+        for q in fp8_targets:
+            if q in gen_list or q in up_list:
+                if self.stop_requested: break
+                self.msg_queue.put(("UPDATE_GRID", model_base, q, "RUNNING"))
+                suffix = "_All" if "All" in q else ""
+                base_q_name = q.split(" ")[0]
+                expected_path = os.path.join(out_dir, f"{name}-{base_q_name}{suffix}.safetensors")
+                if q in gen_list:
+                    if self._journal_done(model_base, q):
+                        self._resume_cell(ctx, q, up_list); continue
+                    if self._up_to_date(ctx, expected_path, q):
+                        self._reuse_artifact(ctx, expected_path, q, up_list); continue
+                    dtype_str = "float8_e5m2" if "E5M2" in q else "float8_e4m3fn"
+                    fp8_jobs.append((q, (expected_path, dtype_str, "All" not in q)))
+                elif q in up_list:
+                    if os.path.exists(expected_path):
+                        generated_files.append(expected_path)
+                        self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
+                        self.ship_artifact(ctx, expected_path, q, up_list)
+                    else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
+
+        if fp8_jobs and not self.stop_requested:
+            # Runs in its own process: the tensors it loads never inflate the GUI, and cancel kills it
+            cmd = [sys.executable, "-u", "quantize_fp8.py", "--src", f,
+                   "--workers", str(self._get_number(self.fp8_workers_var, os.cpu_count() or 1)),
+                   "--max-inflight-gb", str(self._get_number(self.fp8_budget_var, 4, float))]
+            for _, (dst, dtype_str, unet_only) in fp8_jobs:
+                cmd += ["--target", dst, dtype_str, "unet" if unet_only else "all"]
+            if self.fp8_engine_var.get() != "auto": cmd += ["--engine", self.fp8_engine_var.get()]
+            if self.run_cmd(cmd):
+                generated_files.extend(job[0] for _, job in fp8_jobs)
+                status = "DONE"
+            else:
+                # A killed worker cannot clean up after itself: drop its partial outputs
+                for _, job in fp8_jobs:
+                    if os.path.exists(job[0]):
+                        try: os.remove(job[0])
+                        except: pass
+                status = "CANCEL" if self.stop_requested else "ERROR"
+            for q, job in fp8_jobs:
+                if status != "DONE":
+                    self.msg_queue.put(("UPDATE_GRID", model_base, q, status)); continue
+                self._cell_done(model_base, q, [job[0]])
+                self._artifact_done(ctx, job[0], q, up_list)
+
+        # --- GGUF Logic ---
+        all_gguf_active = [q for q in set(gen_list + up_list) if "FP8" not in q]
+        quant_jobs, full_copies = [], []
+        for q in all_gguf_active:
+            if self.stop_requested: break
+            expected_path = os.path.join(out_dir, f"{name}-{q}.gguf")
+            if q in gen_list:
+                if self._journal_done(model_base, q):
+                    self._resume_cell(ctx, q, up_list); continue
+                if self._up_to_date(ctx, expected_path, q):
+                    self._reuse_artifact(ctx, expected_path, q, up_list); continue
+                if not gguf_src: 
+                    self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
+                    continue
+                if q in ["F16", "BF16"]:
+                    full_copies.append(q); continue
+                quant_jobs.append(q)
+            elif q in up_list:
+                if os.path.exists(expected_path):
+                    generated_files.append(expected_path)
+                    self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
+                    self.ship_artifact(ctx, expected_path, q, up_list)
+                else: self.msg_queue.put(("UPDATE_GRID", model_base, q, "SKIP"))
+
+        # All quant types read the same CONVERT.gguf: fan them out within the core/RAM budget
+        if quant_jobs and not self.stop_requested:
+            from job_scheduler import JobScheduler, estimate_quant_ram, physical_memory
+            cores = os.cpu_count() or 1
+            ram = physical_memory()
+            budget = int(self._get_number(self.quant_ram_var, (ram or 0) * 0.8 / 1024**3, float) * 1024**3) or None
+            sched = JobScheduler(self._get_number(self.quant_jobs_var, max(1, cores // 8)), cores, budget)
+            per_job = estimate_quant_ram(quant_src)
+            logging.info(f"Quantizing {len(quant_jobs)} types, up to {min(sched.max_jobs, len(quant_jobs))} at a time "
+                         f"(~{per_job / 1024**3:.1f} GB each, budget {budget / 1024**3 if budget else 0:.0f} GB)")
+            sched.map(lambda q, threads: self.quantize_gguf(model_base, name, out_dir, quant_src, q, threads, generated_files, ctx["fix_file"],
+                                                            on_done=lambda path: self._artifact_done(ctx, path, q, up_list)),
+                      quant_jobs, mem_for=lambda q: per_job, cancelled=lambda: self.stop_requested)
+
+        # F16/BF16 are CONVERT.gguf itself: share its data, or hand the file over once no quant reads it any more
+        from materialize import materialize
+        for i, q in enumerate(full_copies):
+            if self.stop_requested: break
+            expected_path = os.path.join(out_dir, f"{name}-{q}.gguf")
+            self.msg_queue.put(("UPDATE_GRID", model_base, q, "RUNNING"))
+            consume = i == len(full_copies) - 1 and gguf_src in generated_files and not self.keep_convert_var.get()
+            try:
+                how = materialize(gguf_src, expected_path, keep_src=not consume)
+                logging.info(f"[{q}] {os.path.basename(gguf_src)} -> {os.path.basename(expected_path)} ({how})")
+                generated_files.append(expected_path)
+                self._cell_done(model_base, q, [expected_path])
+                self._artifact_done(ctx, expected_path, q, up_list)
+            except Exception as e:
+                logging.error(f"[{q}] Could not create {os.path.basename(expected_path)}: {e}")
+                self.msg_queue.put(("UPDATE_GRID", model_base, q, "ERROR"))
+
+        return {"name": name, "files": list(set(generated_files)), "model_display": model_base, "src_path": f}
+
+    def quantize_gguf(self, model_base, name, out_dir, gguf_src, q, threads, generated_files, fix_file=None, on_done=None):
+        """One llama-quantize (+ 5D fix) job; safe to run from several scheduler threads at once.
+        `on_done(path)` gets the final file once it is renamed into place."""
+        if self.stop_requested: return False
+        self.msg_queue.put(("UPDATE_GRID", model_base, q, "RUNNING"))
+        expected_path = os.path.join(out_dir, f"{name}-{q}.gguf")
+        unfixed = os.path.join(out_dir, f"{name}-{q}-UnFixed.gguf")
+        if not self.run_cmd([self.quant_cmd, gguf_src, unfixed, q, str(threads)], prefix=f"[{q}] "):
+            self.msg_queue.put(("UPDATE_GRID", model_base, q, "CANCEL" if self.stop_requested else "ERROR"))
+            return False
+        final = unfixed
+        fixes = [fix_file] if fix_file else glob.glob(os.path.join(out_dir, "fix_5d_tensors_*.safetensors"))
+        if fixes and not self._patch_5d(unfixed, fixes[0], q):
+            fixed = os.path.join(out_dir, f"{name}-{q}-FIXED.gguf")
+            self.run_cmd([sys.executable, "-u", "fix_5d_tensors.py", "--src", unfixed, "--dst", fixed, "--fix", fixes[0], "--overwrite"], prefix=f"[{q}] ")
+            if os.path.exists(fixed): final = fixed
+        try:
+            from materialize import materialize
+            how = materialize(final, expected_path, keep_src=False)
+            logging.info(f"[{q}] {os.path.basename(final)} -> {os.path.basename(expected_path)} ({how})")
+            generated_files.append(expected_path)
+        except Exception: generated_files.append(final)
+        if os.path.exists(unfixed) and os.path.abspath(unfixed) != os.path.abspath(expected_path):
+            try: os.remove(unfixed)
+            except: pass
+        self._cell_done(model_base, q, [expected_path if os.path.exists(expected_path) else final])
+        if on_done and os.path.exists(expected_path): on_done(expected_path)
+        return True
+
+    def _journal_done(self, model, step):
+        """True when the job journal holds this cell as finished with its outputs unchanged."""
+        return bool(self.journal) and self.journal.done(model, step)
+
+    def _cell_done(self, model, step, outputs=()):
+        """Marks a grid cell Done and journals it, with the files it produced, so a resumed batch can skip it."""
+        self.msg_queue.put(("UPDATE_GRID", model, step, "DONE"))
+        if not self.journal: return
+        try: self.journal.record(model, step, outputs)
+        except Exception as e: logging.warning(f"Could not update the job journal: {e}")
+
+    def _resume_cell(self, ctx, q, up_list):
+        """Picks up a quant finished before the interruption instead of producing it again."""
+        model_base = ctx["model_display"]
+        outputs = self.journal.outputs(model_base, q)
+        ctx["files"].extend(outputs)
+        logging.info(f"[RESUME] {model_base} {q} already done, skipping")
+        self.msg_queue.put(("UPDATE_GRID", model_base, q, "DONE"))
+        if not self._journal_done(model_base, "Upload"):
+            for path in outputs: self.ship_artifact(ctx, path, q, up_list)
+
+    def _artifact_spec(self, src, q):
+        """What artifact `q` of `src` would be built from right now (see artifact_manifest); None if that cannot be told."""
+        try:
+            from artifact_manifest import describe
+            from prep_cache import PREP_TOOLS, tools_digest
+        except ImportError:
+            return None
+        if "FP8" in q:
+            tools = ("quantize_fp8.py", "safetensors_stream.py")
+            options = {"dtype": "float8_e5m2" if "E5M2" in q else "float8_e4m3fn", "scope": "all" if "All" in q else "unet"}
+        else:
+            tools = PREP_TOOLS if q in ["F16", "BF16"] else PREP_TOOLS + ("fix_5d_tensors.py", "gguf_surgery.py", self.quant_cmd)
+            options = {"dtype": "fp16", "strip_fp8": True}
+        if tools not in self.tool_digests: self.tool_digests[tools] = tools_digest(tools)
+        return describe(src, q, self.tool_digests[tools], options)
+
+    def _up_to_date(self, ctx, path, q):
+        """True when `path` was built by an earlier run from the same source, tools and options (and Force is off)."""
+        if self.force_var.get() or not os.path.exists(path): return False
+        spec = self._artifact_spec(ctx["src_path"], q)
+        if not spec: return False
+        from artifact_manifest import is_current
+        return is_current(path, spec)
+
+    def _reuse_artifact(self, ctx, path, q, up_list):
+        logging.info(f"[SKIP] {os.path.basename(path)} is up to date")
+        ctx["files"].append(path)
+        self._cell_done(ctx["model_display"], q, [path])
+        self.ship_artifact(ctx, path, q, up_list)
+
+    def _artifact_done(self, ctx, path, q, up_list):
+        """A freshly built artifact: writes its manifest entry, then hands it to the upload queue."""
+        spec = self._artifact_spec(ctx["src_path"], q)
+        if spec:
+            from artifact_manifest import record
+            record(path, spec)
+        self.ship_artifact(ctx, path, q, up_list)
+
+    def _patch_5d(self, path, fix, q):
+        """5D fix by patching the quantized file's tensor info (and only the restored tensors' data) in place.
+        "unchanged" (no tensor of the fix in this file) is success too; only a failure falls back to fix_5d_tensors.py."""
+        try:
+            from gguf_surgery import patch_tensors, load_fix
+            t0 = time.time()
+            how = patch_tensors(path, load_fix(fix))
+            logging.info(f"[{q}] 5D fix: {os.path.basename(path)} {how} in {time.time() - t0:.2f}s")
+            return True
+        except Exception as e:
+            logging.warning(f"[{q}] In-place 5D fix not possible ({e}), running fix_5d_tensors.py")
+            return False
+
     def _check_file_match_quant(self, fname, q):
         if "FP8" in q:
             base_q = q.split(" ")[0] 
@@ -998,6 +1384,57 @@ class ConverterApp:
         if q in ["F16", "BF16"]: return f"-{q}.gguf" in fname
         return f"-{q}.gguf" in fname
 
+    def _upload_targets(self, name, src, up_mode, out_mode):
+        """(gguf repo, gguf folder, fp8 repo, fp8 folder) for one model."""
+        r_gguf, d_gguf, r_fp8, d_fp8 = self.hf_repo_gguf.get(), self.hf_dest_gguf.get(), self.hf_repo_fp8.get(), self.hf_dest_fp8.get()
+        
+        if up_mode == "custom":
+            dat = self.custom_file_data.get(src, {})
+            if "gguf_r" in dat and dat["gguf_r"].get(): r_gguf = dat["gguf_r"].get()
+            if "gguf_d" in dat and dat["gguf_d"].get(): d_gguf = dat["gguf_d"].get()
+            if "fp8_r" in dat and dat["fp8_r"].get(): r_fp8 = dat["fp8_r"].get()
+            if "fp8_d" in dat and dat["fp8_d"].get(): d_fp8 = dat["fp8_d"].get()
+
+        if out_mode == "folder" and up_mode == "global":
+            d_gguf = f"{d_gguf}/{name}" if d_gguf else name
+            d_fp8 = f"{d_fp8}/{name}" if d_fp8 else name
+        return r_gguf, d_gguf, r_fp8, d_fp8
+
+    def _wants_upload(self, path, up_list):
+        if path.endswith(("-CONVERT.gguf", NO_SCALARS_SUFFIX, "-UnFixed.gguf", "-dequant.safetensors")): return False
+        return any(self._check_file_match_quant(os.path.basename(path), q) for q in up_list)
+
+    def ship_artifact(self, ctx, path, q, up_list):
+        """Hands one finished artifact to the background upload queue (no-op when uploading is off or it is not selected)."""
+        uq = self.upload_queue
+        if not uq or self.stop_requested or not self._wants_upload(path, up_list): return
+        r_gguf, d_gguf, r_fp8, d_fp8 = self._upload_targets(ctx["name"], ctx["src_path"], self.upload_mode_var.get(), self.out_mode_var.get())
+        repo, dest = (r_fp8, d_fp8) if "FP8" in path else (r_gguf, d_gguf)
+        if not repo: return
+        if uq.submit(ctx["model_display"], path, repo, dest, tag=(ctx["model_display"], q)):
+            self.msg_queue.put(("UPDATE_GRID", ctx["model_display"], "Upload", "RUNNING"))
+
+    def _preupload_artifact(self, path, repo, dest):
+        """Upload queue job: sends the file's LFS payload unless the repo already has the same content at its path.
+        Returns the operations still to be committed (none when unchanged)."""
+        ops, unchanged = uploader.skip_unchanged(self.hf_api, repo, uploader.build_operations([path], dest), retries=self._upload_attempts() - 1)
+        if unchanged: logging.info(f"[UPLOAD] {os.path.basename(path)} is unchanged on {repo}, skipping")
+        return uploader.preupload(self.hf_api, ops, repo) if ops else []
+
+    def _on_upload_state(self, job, state):
+        """Upload queue callback (worker threads): per-file state into the artifact's grid cell, throughput into the log."""
+        model, q = job.tag
+        if state == "UPLOADED" and not job.result:
+            self.msg_queue.put(("UPDATE_GRID", model, q, "UP_TO_DATE")); return
+        self.msg_queue.put(("UPDATE_GRID", model, q, state))
+        if state == "UPLOADED":
+            retried = f", {job.attempts} retries" if job.attempts else ""
+            logging.info(f"[UPLOAD] {os.path.basename(job.path)} -> {job.args[0]}/{job.result[0].path_in_repo} "
+                         f"({uploader.throughput(job.nbytes, job.seconds)}{retried})")
+
+    def _upload_attempts(self):
+        return self._get_number(self.upload_retries_var, 4) + 1
+
     def handle_upload_cleanup(self, item, keep_list, up_list, up_mode, out_mode, keep_dequant, keep_convert):
         if self.stop_requested: return
         
@@ -1011,47 +1448,62 @@ class ConverterApp:
             try_load_uploader()
 
         name, files, disp, src = item['name'], item['files'], item['model_display'], item['src_path']
-        r_gguf, d_gguf, r_fp8, d_fp8 = self.hf_repo_gguf.get(), self.hf_dest_gguf.get(), self.hf_repo_fp8.get(), self.hf_dest_fp8.get()
-        
-        if up_mode == "custom":
-            dat = self.custom_file_data.get(src, {})
-            if "gguf_r" in dat and dat["gguf_r"].get(): r_gguf = dat["gguf_r"].get()
-            if "gguf_d" in dat and dat["gguf_d"].get(): d_gguf = dat["gguf_d"].get()
-            if "fp8_r" in dat and dat["fp8_r"].get(): r_fp8 = dat["fp8_r"].get()
-            if "fp8_d" in dat and dat["fp8_d"].get(): d_fp8 = dat["fp8_d"].get()
-
-        if out_mode == "folder" and up_mode == "global":
-            d_gguf = f"{d_gguf}/{name}" if d_gguf else name
-            d_fp8 = f"{d_fp8}/{name}" if d_fp8 else name
+        r_gguf, d_gguf, r_fp8, d_fp8 = self._upload_targets(name, src, up_mode, out_mode)
 
-        if self.do_upload.get():
+        if self.do_upload.get() and self._journal_done(disp, "Upload"):
+            logging.info(f"[RESUME] {disp} was already uploaded, skipping")
+            self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "DONE"))
+        elif self.do_upload.get():
             if not UPLOADER_AVAILABLE:
                 logging.error("Upload requested but upload_to_hf.py is missing.")
                 self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "ERROR"))
+            elif self.upload_queue:
+                # Artifacts were queued as they were finished: queue anything that slipped through,
+                # then wait for this model's uploads before its files can be cleaned up
+                for f in set(files) - self.upload_queue.submitted(disp):
+                    q = next((q for q in up_list if self._check_file_match_quant(os.path.basename(f), q)), None)
+                    if q: self.ship_artifact(item, f, q, up_list)
+                failed = self.upload_queue.wait(disp, cancelled=lambda: self.stop_requested)
+                if self.stop_requested: return
+                # One commit per repo for the whole model; payloads are already on the Hub, so this is only the commit call
+                by_repo = {}
+                for job in self.upload_queue.jobs(disp):
+                    if job.ok and job.result: by_repo.setdefault(job.args[0], []).append(job)
+                card = self.hf_card.get() if os.path.isfile(self.hf_card.get()) else None
+                for repo, jobs in by_repo.items():
+                    ops = [op for job in jobs for op in job.result]
+                    try:
+                        # Payloads are already on the Hub: a retried commit does not send them again
+                        info = uploader.call_with_retries(
+                            lambda: uploader.commit_batch(self.hf_api, repo, ops, card=card, commit_message=f"Upload {name} ({len(ops)} files)",
+                                                          num_threads=self._get_number(self.upload_jobs_var, 2)),
+                            attempts=self._upload_attempts(), label=f"Commit to {repo}", cancelled=lambda: self.stop_requested)
+                        logging.info(f"[UPLOAD] {len(ops)} files of {name} committed to {repo}: {info.commit_url}")
+                    except Exception as e:
+                        logging.error(f"Commit to {repo} failed: {e}")
+                        failed.extend(jobs)
+                        for job in jobs: self.msg_queue.put(("UPDATE_GRID", *job.tag, "UPLOAD_ERROR"))
+                files_sent, nbytes, secs = self.upload_queue.stats(disp)
+                if files_sent: logging.info(f"[UPLOAD] {name}: {files_sent} files, {uploader.throughput(nbytes, secs)} aggregate")
+                if failed: self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "ERROR"))
+                else: self._cell_done(disp, "Upload")
             else:
                 self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "RUNNING"))
-                files_to_upload = []
-                for f in files:
-                    if f.endswith("-CONVERT.gguf") or f.endswith("-UnFixed.gguf") or f.endswith("-dequant.safetensors"): continue
-                    fname = os.path.basename(f)
-                    should_upload = False
-                    for q in up_list:
-                        if self._check_file_match_quant(fname, q):
-                            should_upload = True; break
-                    if should_upload: files_to_upload.append(f)
-                
-                files_to_upload = list(set(files_to_upload))
+                files_to_upload = list(set(f for f in files if self._wants_upload(f, up_list)))
                 fp8s = [f for f in files_to_upload if "FP8" in f]
                 ggufs = [f for f in files_to_upload if "FP8" not in f]
                 
                 # NOTE: Redirection is NOT needed here because run_main_logic 
                 # already redirected sys.stdout for the entire thread.
                 try:
+                    card = self.hf_card.get() if os.path.isfile(self.hf_card.get()) else None
                     if fp8s and r_fp8: 
-                        uploader.main(token=self.hf_token.get(), repo_id=r_fp8, local_paths_args=fp8s, dest_folder=d_fp8, non_interactive=True)
+                        uploader.main(token=self.hf_token.get(), repo_id=r_fp8, local_paths_args=fp8s, dest_folder=d_fp8, non_interactive=True, batch=True, card=card,
+                                      workers=self._get_number(self.upload_jobs_var, 2), retries=self._upload_attempts() - 1)
                     if ggufs and r_gguf: 
-                        uploader.main(token=self.hf_token.get(), repo_id=r_gguf, local_paths_args=ggufs, dest_folder=d_gguf, non_interactive=True)
-                    self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "DONE"))
+                        uploader.main(token=self.hf_token.get(), repo_id=r_gguf, local_paths_args=ggufs, dest_folder=d_gguf, non_interactive=True, batch=True, card=card,
+                                      workers=self._get_number(self.upload_jobs_var, 2), retries=self._upload_attempts() - 1)
+                    self._cell_done(disp, "Upload")
                 except Exception as e:
                     logging.error(f"Upload Error: {e}")
                     self.msg_queue.put(("UPDATE_GRID", disp, "Upload", "ERROR"))
@@ -1071,49 +1523,96 @@ class ConverterApp:
             if not should_keep: 
                 try: os.remove(p)
                 except: pass
-        self.msg_queue.put(("UPDATE_GRID", disp, "Cleanup", "DONE"))
+        self._cell_done(disp, "Cleanup")
 
-    def run_cmd(self, cmd):
-        logging.info(f"CMD: {' '.join(cmd)}")
+    def _tool_env(self):
         env = os.environ.copy()
         env["PYTHONUNBUFFERED"] = "1"
         env["COLUMNS"] = "100"  # Ensures progress bars don't wrap and break logic
         env["TERM"] = "xterm"   # Forces standard terminal control codes
+        return env
+
+    def _run_pooled(self, cmd, prefix=None):
+        """run_cmd on a tool worker: same log streaming, and cancel kills the worker. Returns the exit code (None if the worker died)."""
+        logging.info(f"CMD (worker): {' '.join(cmd)}")
+        partial = [""]
+        def write(text):
+            if prefix is None: return sys.stdout.write(text)
+            *lines, partial[0] = (partial[0] + text).split("\n")
+            for line in lines: sys.stdout.write(f"{prefix}{line}\n")
+        def on_proc(proc, running):
+            if not running: return self.child_processes.discard(proc)
+            self.child_processes.add(proc)
+            self.current_process = proc
+            if self.stop_requested: proc.kill()
+        code = self.tool_pool.run(cmd[2], cmd[3:], write, on_proc=on_proc)
+        if partial[0]: sys.stdout.write(f"{prefix}{partial[0]}\n")
+        return code
+
+    def run_cmd(self, cmd, prefix=None):
+        """Runs a tool, streaming its output into the log. With `prefix`, output is forwarded whole lines at a time
+        and tagged, so several commands can run in parallel without garbling the log.
+        POOLED_TOOLS go to the batch's tool workers when there are any; a worker that dies falls back to a new process."""
+        if self.tool_pool and len(cmd) > 2 and cmd[0] == sys.executable and os.path.basename(cmd[2]) in POOLED_TOOLS:
+            try: code = self._run_pooled(cmd, prefix)
+            except RuntimeError: code = None  # pool closed under us
+            if code is not None or self.stop_requested: return code == 0 and not self.stop_requested
+            logging.warning(f"Tool worker died running {os.path.basename(cmd[2])}, retrying in a new process")
+        logging.info(f"CMD: {' '.join(cmd)}")
+        env = self._tool_env()
 
+        proc = None
         try:
-            self.current_process = subprocess.Popen(
+            proc = self.current_process = subprocess.Popen(
                 cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
                 text=True, bufsize=1, encoding='utf-8', errors='replace', env=env
             )
+            self.child_processes.add(proc)
+
+            if prefix is not None:
+                for line in proc.stdout:
+                    sys.stdout.write(prefix + line)
+                    if self.stop_requested:
+                        proc.kill()
+                        return False
+                return (proc.wait() == 0) and not self.stop_requested
 
             # Read in larger chunks for speed (prevents GUI lag)
             while True:
-                chunk = self.current_process.stdout.read(256)
-                if not chunk and self.current_process.poll() is not None:
+                chunk = proc.stdout.read(256)
+                if not chunk and proc.poll() is not None:
                     break
                 if chunk:
                     sys.stdout.write(chunk)
                     # No need to flush manually, DualOutput handles it
 
                 if self.stop_requested:
-                    self.current_process.kill()
+                    proc.kill()
                     return False
             
-            return (self.current_process.wait() == 0)
+            return (proc.wait() == 0)
         except Exception as e:
             logging.error(f"Execution error: {e}")
             return False
+        finally:
+            self.child_processes.discard(proc)
 
     def save_settings(self, f):
         d = {
             "python": self.python_path_var.get(), "out": self.out_dir_var.get(),
             "out_mode": self.out_mode_var.get(), "up_mode": self.upload_mode_var.get(),
             "token": self.hf_token.get(), "r_gguf": self.hf_repo_gguf.get(), "d_gguf": self.hf_dest_gguf.get(),
-            "r_fp8": self.hf_repo_fp8.get(), "d_fp8": self.hf_dest_fp8.get(), "clean": self.cleanup_mode.get(),
-            "shut": self.shutdown_var.get(), "q_gen": [k for k,v in self.quant_vars_gen.items() if v.get()],
+            "r_fp8": self.hf_repo_fp8.get(), "d_fp8": self.hf_dest_fp8.get(), "card": self.hf_card.get(), "clean": self.cleanup_mode.get(),
+            "shut": self.shutdown_var.get(), "force": self.force_var.get(), "q_gen": [k for k,v in self.quant_vars_gen.items() if v.get()],
             "q_up": [k for k,v in self.quant_vars_up.items() if v.get()],
             "q_keep": [k for k,v in self.quant_vars_keep.items() if v.get()],
             "k_dequant": self.keep_dequant_var.get(), "k_convert": self.keep_convert_var.get(),
+            "fp8_workers": self.fp8_workers_var.get(), "fp8_budget": self.fp8_budget_var.get(),
+            "fp8_engine": self.fp8_engine_var.get(),
+            "quant_jobs": self.quant_jobs_var.get(), "quant_ram": self.quant_ram_var.get(),
+            "upload_jobs": self.upload_jobs_var.get(), "upload_retries": self.upload_retries_var.get(),
+            "prep_cache": self.prep_cache_var.get(), "prep_cache_dir": self.prep_cache_dir_var.get(),
+            "tool_workers": self.tool_workers_var.get(),
             "geometry": self.root.geometry()
         }
         try: json.dump(d, open(f, 'w'), indent=4)
@@ -1130,12 +1629,24 @@ class ConverterApp:
             if "d_gguf" in d: self.hf_dest_gguf.set(d["d_gguf"])
             if "r_fp8" in d: self.hf_repo_fp8.set(d["r_fp8"])
             if "d_fp8" in d: self.hf_dest_fp8.set(d["d_fp8"])
+            if "card" in d: self.hf_card.set(d["card"])
             if "out_mode" in d: self.out_mode_var.set(d["out_mode"])
             if "up_mode" in d: self.upload_mode_var.set(d["up_mode"])
             if "clean" in d: self.cleanup_mode.set(d["clean"])
             if "shut" in d: self.shutdown_var.set(d["shut"])
+            if "force" in d: self.force_var.set(d["force"])
             if "k_dequant" in d: self.keep_dequant_var.set(d["k_dequant"])
             if "k_convert" in d: self.keep_convert_var.set(d["k_convert"])
+            if "fp8_workers" in d: self.fp8_workers_var.set(d["fp8_workers"])
+            if "fp8_budget" in d: self.fp8_budget_var.set(d["fp8_budget"])
+            if "fp8_engine" in d: self.fp8_engine_var.set(d["fp8_engine"])
+            if "quant_jobs" in d: self.quant_jobs_var.set(d["quant_jobs"])
+            if "quant_ram" in d: self.quant_ram_var.set(d["quant_ram"])
+            if "upload_jobs" in d: self.upload_jobs_var.set(d["upload_jobs"])
+            if "upload_retries" in d: self.upload_retries_var.set(d["upload_retries"])
+            if "prep_cache" in d: self.prep_cache_var.set(d["prep_cache"])
+            if "prep_cache_dir" in d: self.prep_cache_dir_var.set(d["prep_cache_dir"])
+            if "tool_workers" in d: self.tool_workers_var.set(d["tool_workers"])
             if "geometry" in d: self.root.geometry(d["geometry"])
             for v in self.quant_vars_gen.values(): v.set(False)
             for v in self.quant_vars_up.values(): v.set(False)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""job_journal.py — Persistent record of finished (model, step) cells of a batch
+* The batch spec (sources, selected quants) and every finished cell are kept in one JSON file
+* Each cell stores fingerprints (size, mtime) of the files it produced
+* Every update is written to a temp file and renamed over the journal, so a crash never leaves it half-written
+* On resume a cell counts as done only if all its outputs still match their fingerprints
+"""
+
+import os
+import sys
+import threading
+import time
+
+from sha256_cache import load_json, save_json
+
+
+def file_fingerprint(path: str) -> dict | None:
+    try: st = os.stat(path)
+    except OSError: return None
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class JobJournal:
+    """Thread-safe journal stored at `path`; cells are addressed by (model, step) as shown in the progress grid."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        data = load_json(self.path)
+        return data if isinstance(data.get("cells"), dict) else {"spec": None, "cells": {}}
+
+    def _save(self) -> None:
+        save_json(self.path, self.data, fsync=True)
+
+    @property
+    def spec(self) -> dict | None:
+        return self.data.get("spec")
+
+    def start(self, spec: dict) -> None:
+        """Begins a new batch: forgets every recorded cell."""
+        with self._lock:
+            self.data = {"spec": dict(spec, started=time.time()), "cells": {}}
+            self._save()
+
+    def record(self, model: str, step: str, outputs=()) -> None:
+        """Marks a cell finished, fingerprinting the files it produced."""
+        prints = [fp for fp in map(file_fingerprint, outputs) if fp]
+        with self._lock:
+            self.data["cells"].setdefault(model, {})[step] = {"outputs": prints, "at": time.time()}
+            self._save()
+
+    def done(self, model: str, step: str) -> bool:
+        """True if the cell was recorded and every output it recorded is still there, unchanged."""
+        with self._lock:
+            cell = self.data["cells"].get(model, {}).get(step)
+        if cell is None: return False
+        for fp in cell["outputs"]:
+            now = file_fingerprint(fp["path"])
+            if not now or now["size"] != fp["size"] or now["mtime_ns"] != fp["mtime_ns"]: return False
+        return True
+
+    def steps(self, model: str) -> list[str]:
+        with self._lock:
+            return list(self.data["cells"].get(model, {}))
+
+    def outputs(self, model: str, step: str) -> list[str]:
+        with self._lock:
+            cell = self.data["cells"].get(model, {}).get(step) or {}
+        return [fp["path"] for fp in cell.get("outputs", [])]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python job_journal.py <journal.json>")
+        sys.exit(1)
+    journal = JobJournal(sys.argv[1])
+    spec = journal.spec or {}
+    print(f"Batch of {len(spec.get('sources', []))} models, started {time.ctime(spec.get('started', 0))}")
+    for model, cells in journal.data["cells"].items():
+        print(f"  {model}: " + ", ".join(f"{step}{'' if journal.done(model, step) else ' (stale)'}" for step in cells))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""job_scheduler.py — CPU/RAM-aware fan-out of subprocess jobs
+* Runs jobs concurrently inside a core budget and a memory budget
+* Each job gets an explicit thread count (cores split between the concurrent jobs)
+* A job that does not fit waits; a single oversized job still runs alone
+* Results come back in submission order
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --------- helpers & constants ---------
+QUANT_WORK_BYTES_PER_ELEM = 8     # llama-quantize: f32 conversion buffer + work buffer of the tensor in flight
+QUANT_BASE_BYTES = 256 << 20      # binary, ggml context, mmap'd metadata
+
+
+def physical_memory() -> int | None:
+    """Total physical RAM in bytes, or None where it cannot be read."""
+    try: return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError): pass
+    try:
+        import ctypes
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong), ("ullTotalPhys", ctypes.c_ulonglong),
+                        ("ullAvailPhys", ctypes.c_ulonglong), ("ullTotalPageFile", ctypes.c_ulonglong),
+                        ("ullAvailPageFile", ctypes.c_ulonglong), ("ullTotalVirtual", ctypes.c_ulonglong),
+                        ("ullAvailVirtual", ctypes.c_ulonglong), ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        stat = MEMORYSTATUSEX(); stat.dwLength = ctypes.sizeof(stat)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)): return stat.ullTotalPhys
+    except Exception: pass
+    return None
+
+
+def estimate_quant_ram(gguf_path: str) -> int:
+    """
+    Peak RAM of one llama-quantize run on `gguf_path`: the input is mmap'd, so what counts is the
+    per-tensor working set of the largest tensor. Read from the GGUF header; falls back to a quarter of the file.
+    """
+    try:
+        import gguf
+        largest = max(int(t.n_elements) for t in gguf.GGUFReader(gguf_path).tensors)
+        return QUANT_BASE_BYTES + largest * QUANT_WORK_BYTES_PER_ELEM
+    except Exception:
+        return QUANT_BASE_BYTES + os.path.getsize(gguf_path) // 4
+
+
+class ResourcePool:
+    """Counting budget of cores and bytes; acquire() blocks until a job fits (an idle pool always admits one)."""
+
+    def __init__(self, cores: int, mem_bytes: int | None = None):
+        self.cores, self.mem_bytes = max(1, cores), mem_bytes
+        self._used_cores = self._used_mem = self._jobs = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, cores: int, mem: int) -> bool:
+        if self._jobs == 0: return True
+        if self._used_cores + cores > self.cores: return False
+        return self.mem_bytes is None or self._used_mem + mem <= self.mem_bytes
+
+    def acquire(self, cores: int, mem: int = 0, cancelled=None) -> bool:
+        """Waits for room; returns False without acquiring if `cancelled()` turns true meanwhile."""
+        with self._cond:
+            while not self._fits(cores, mem):
+                if cancelled and cancelled(): return False
+                self._cond.wait(timeout=0.5)
+            if cancelled and cancelled(): return False
+            self._used_cores += cores; self._used_mem += mem; self._jobs += 1
+            return True
+
+    def release(self, cores: int, mem: int = 0) -> None:
+        with self._cond:
+            self._used_cores -= cores; self._used_mem -= mem; self._jobs -= 1
+            self._cond.notify_all()
+
+
+class JobScheduler:
+    """
+    Runs `fn(job, threads)` for each job, at most `max_jobs` at a time, within `cores` and `mem_bytes`.
+    `mem_for(job)` gives a job's RAM estimate; `cancelled()` stops jobs that have not started yet.
+    """
+
+    def __init__(self, max_jobs: int, cores: int | None = None, mem_bytes: int | None = None):
+        self.max_jobs = max(1, max_jobs)
+        self.pool = ResourcePool(cores or os.cpu_count() or 1, mem_bytes)
+
+    def map(self, fn, jobs, mem_for=lambda job: 0, cancelled=None) -> list:
+        jobs = list(jobs)
+        if not jobs: return []
+        width = min(self.max_jobs, len(jobs))
+        threads = max(1, self.pool.cores // width)
+
+        def run(job):
+            mem = mem_for(job)
+            if not self.pool.acquire(threads, mem, cancelled): return None
+            try: return fn(job, threads)
+            finally: self.pool.release(threads, mem)
+
+        with ThreadPoolExecutor(width) as ex:
+            return list(ex.map(run, jobs))
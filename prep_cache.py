@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""prep_cache.py — Content-addressed cache for GGUF prep intermediates
+* Entries are keyed by the source's SHA-256, the prep tools' script hashes and the prep options
+* Source digests are remembered in the cache root by (path, size, mtime_ns): an unchanged source is never re-read,
+  and nothing is written next to the sources
+* A hit hands back the CONVERT.gguf (and dequant / 5D fix files) without running anything
+* Files enter and leave the cache as reflinks or hard links where possible, so a hit costs no copy
+* Least recently used entries are evicted to stay under a byte budget
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+from materialize import materialize
+from sha256_cache import load_json, save_json, sha256_file
+
+# --------- helpers & constants ---------
+PREP_TOOLS = ("convert.py", "dequant_convert.py", "dequantize_fp8v2.py", "safetensors_stream.py")
+META_NAME = "meta.json"
+SOURCES_NAME = "sources.json"
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """Shares `src`'s data with `dst` (reflink or hard link), copying only when neither is possible; returns the strategy."""
+    return materialize(src, dst)
+
+
+def tools_digest(tools=PREP_TOOLS, base_dir: str | None = None) -> str:
+    """Hash of the scripts / binaries a step runs (and the gguf package version): editing any of them changes it.
+    Bare command names that are not next to this file are looked up on PATH."""
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for tool in tools:
+        path = os.path.join(base_dir, tool)
+        if not os.path.exists(path): path = shutil.which(tool) or path
+        h.update(os.path.basename(tool).encode())
+        if os.path.isfile(path):
+            with open(path, "rb") as f: h.update(hashlib.sha256(f.read()).digest())
+    try:
+        from importlib.metadata import version
+        h.update(version("gguf").encode())
+    except Exception: pass
+    return h.hexdigest()
+
+
+class PrepCache:
+    """
+    On-disk cache under `root`, one folder per key holding the cached files plus meta.json.
+    `budget_bytes` bounds the total size; the least recently used entries go first.
+    """
+
+    def __init__(self, root: str, budget_bytes: int):
+        self.root, self.budget_bytes = root, budget_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, src: str, options: dict, tools=PREP_TOOLS) -> str:
+        """Cache key of one prep: source content + tool scripts + options (order-independent)."""
+        parts = {"src": self.source_digest(src), "tools": tools_digest(tools), "options": options}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def source_digest(self, src: str) -> str:
+        """SHA-256 of `src`, hashed only when its size or mtime changed since the last time this cache saw it."""
+        path, st = os.path.abspath(src), os.stat(src)
+        index = os.path.join(self.root, SOURCES_NAME)
+        with self._lock:
+            entry = load_json(index).get(path)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns: return entry["sha256"]
+
+        digest = sha256_file(src)
+        with self._lock:
+            data = {p: e for p, e in load_json(index).items() if os.path.exists(p)}
+            data[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+            save_json(index, data)
+        return digest
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _meta(self, entry: str) -> dict:
+        return load_json(os.path.join(entry, META_NAME))
+
+    def get(self, key: str, required=()) -> dict | None:
+        """{name: cached path} when the entry exists and holds every `required` name; marks it as recently used."""
+        entry = self._entry(key)
+        with self._lock:
+            meta = self._meta(entry)
+            files = {name: os.path.join(entry, name) for name in meta.get("files", {})
+                     if os.path.exists(os.path.join(entry, name))}
+            if not files or any(name not in files for name in required): return None
+            meta["last_used"] = time.time()
+            save_json(os.path.join(entry, META_NAME), meta)
+            return files
+
+    def put(self, key: str, files: dict, source: str = "") -> dict | None:
+        """Adds {name: path} to the entry for `key` (merging with what it holds), then evicts down to the budget.
+        Returns the cached paths, or None when the entry alone would not fit the budget."""
+        size = sum(os.path.getsize(p) for p in files.values())
+        if size > self.budget_bytes: return None
+        entry = self._entry(key)
+        with self._lock:
+            os.makedirs(entry, exist_ok=True)
+            meta = self._meta(entry) or {"source": source, "created": time.time(), "files": {}}
+            for name, path in files.items():
+                link_or_copy(path, os.path.join(entry, name))
+                meta["files"][name] = os.path.getsize(path)
+            meta["last_used"] = time.time()
+            save_json(os.path.join(entry, META_NAME), meta)
+            self._evict(keep=entry)
+        return {name: os.path.join(entry, name) for name in meta["files"]}
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        """(last_used, bytes, folder) of every entry."""
+        out = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir): continue
+            for key in os.listdir(shard_dir):
+                entry = os.path.join(shard_dir, key)
+                meta = self._meta(entry)
+                out.append((meta.get("last_used", 0.0), sum(meta.get("files", {}).values()), entry))
+        return out
+
+    def _evict(self, keep: str | None = None) -> None:
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.budget_bytes: break
+            if entry == keep: continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            print(f"[CACHE] Evicted {os.path.basename(entry)[:12]} ({size / 1024**3:.1f} GB)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python prep_cache.py <cache dir>")
+        sys.exit(1)
+    cache = PrepCache(sys.argv[1], budget_bytes=1 << 62)
+    for last_used, size, entry in sorted(cache.entries(), reverse=True):
+        meta = cache._meta(entry)
+        print(f"{os.path.basename(entry)[:12]}  {size / 1024**3:7.2f} GB  {time.ctime(last_used)}  {meta.get('source', '')}")
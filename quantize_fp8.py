@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+"""quantize_fp8.py — FP8 (E5M2 / E4M3FN) weight quantizer used by the GUI
+* Streams the source tensor by tensor into the output file
+* Quantizes in fixed-size blocks through one reusable scratch buffer per thread
+* Tensors are quantized concurrently by a thread pool under an in-flight byte budget
+* Several FP8 variants can be produced from a single read of the source
+* engine="numpy": torch-free rounding by bit manipulation on the memory-mapped source
+* Runnable as a script, so callers can run it in a short-lived process whose memory goes back to the OS
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import contextlib
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from safetensors_stream import StreamingWriter, dtype_name, entries_from, read_header, tensor_nbytes, DTYPE_SIZES, FLOAT_DTYPES
+
+# torch is an optional accelerator: without it the numpy engine is used
+try:
+    import torch
+    from safetensors import safe_open
+    TORCH_AVAILABLE = True
+    _inference_mode = torch.inference_mode
+except ImportError:
+    TORCH_AVAILABLE = False
+    _inference_mode = lambda: (lambda fn: fn)
+
+# --------- helpers & constants ---------
+BLOCK_ELEMS = 1 << 22  # elements per block: bounds the scratch buffer to 4M elements per thread
+NP_BLOCK_ELEMS = 1 << 16  # numpy engine: its temporaries per block stay cache-resident (2x faster than 4M blocks)
+DEFAULT_INFLIGHT_BYTES = 4 << 30  # source + FP8 bytes allowed to be loaded but not yet written
+ENGINES = ("torch", "numpy")
+
+# Per FP8 format, matching torch's tensor casts:
+# (first magnitude that overflows, code it overflows to, smallest normal, subnormal rounding constant, mantissa shift, exponent rebias)
+# E4M3FN has no infinity and saturates to 448 above 464 (the last tie that rounds down); E5M2 overflows to inf
+_FP8_ENCODING = {
+    "float8_e4m3fn": (0x43E80001, 0x7E, 121 << 23, 141 << 23, 20, (7 - 127) << 23),
+    "float8_e5m2":   (143 << 23, 0x7C, 113 << 23, 134 << 23, 21, (15 - 127) << 23),
+}
+_NP_COMPUTE = {"F64": np.float64, "F32": np.float32, "F16": np.float32, "BF16": np.float32}
+
+def _widen(raw: np.ndarray, dtype: str, out: np.ndarray) -> np.ndarray:
+    """Writes the exact values of a float tensor's raw bytes into the compute buffer `out`."""
+    if dtype == "BF16":
+        bits = out.view(np.uint32)
+        np.left_shift(raw.view(np.uint16), 16, out=bits, dtype=np.uint32)
+    else:
+        np.copyto(out, raw.view({"F64": np.float64, "F32": np.float32, "F16": np.float16}[dtype]))
+    return out
+
+def _round_(x: np.ndarray, dtype: str, tmp: np.ndarray) -> np.ndarray:
+    """
+    Rounds a float32 buffer in place to the precision of a 16-bit weight dtype (round-to-nearest-even).
+    torch computes half/bfloat16 ops in float32 and rounds each result, so doing the same after every op
+    reproduces its arithmetic exactly. `tmp` is a same-sized uint32 scratch.
+    """
+    if dtype == "F16":
+        np.copyto(tmp.view(np.float16)[:x.size], x, casting="same_kind")
+        np.copyto(x, tmp.view(np.float16)[:x.size])
+    elif dtype == "BF16":
+        bits = x.view(np.uint32)
+        nan = np.isnan(x)
+        np.right_shift(bits, 16, out=tmp); tmp &= 1; tmp += 0x7FFF
+        bits += tmp; bits &= 0xFFFF0000
+        if nan.any(): bits[nan] = 0x7FC00000
+    return x
+
+def _encode_fp8(x: np.ndarray, quant_dtype: str, out: np.ndarray) -> np.ndarray:
+    """Float32 -> FP8 bit patterns, vectorized over the bits: round-to-nearest-even, overflow and NaN like torch's cast."""
+    overflow, top, min_normal, denorm, shift, rebias = _FP8_ENCODING[quant_dtype]
+    bits = x.view(np.uint32)
+    sign = ((bits >> 24) & 0x80).astype(np.uint8)
+    mag = bits & 0x7FFFFFFF
+
+    # Normal range: add the rounding bias (plus one when the kept mantissa is odd), then drop the low bits
+    res = (mag >> shift) & 1
+    res += mag
+    res += np.uint32((rebias + (1 << (shift - 1)) - 1) & 0xFFFFFFFF)
+    res >>= shift
+    # Subnormals: adding a power of two makes the FPU do the rounding
+    small = mag < min_normal
+    if small.any():
+        sub = (mag[small].view(np.float32) + np.uint32(denorm).view(np.float32)).view(np.uint32) - np.uint32(denorm)
+        res[small] = sub
+    big = mag >= overflow
+    if big.any(): res[big] = np.where(mag[big] > 0x7F800000, 0x7F, top)  # NaN stays NaN
+    np.bitwise_or(res, sign, out=out, casting="unsafe")
+    return out
+
+
+class FP8Quantizer:
+    def __init__(self, quant_dtype: str = "float8_e5m2", workers: int | None = None, max_inflight_bytes: int | None = None,
+                 engine: str | None = None):
+        self.quant_dtype = quant_dtype
+        self.engine = engine or ("torch" if TORCH_AVAILABLE else "numpy")
+        if self.engine not in ENGINES: raise ValueError(f"Unknown FP8 engine '{self.engine}'")
+        if self.engine == "torch" and not TORCH_AVAILABLE: raise RuntimeError("torch is not installed: use engine='numpy'")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_inflight_bytes = max_inflight_bytes or DEFAULT_INFLIGHT_BYTES
+        self._local = threading.local()
+
+    def _scratch(self, n: int, dtype: torch.dtype, device: torch.device) -> torch.Tensor:
+        """Per-thread scratch buffer, only reallocated when a bigger block or another dtype shows up."""
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.dtype != dtype or buf.device != device or buf.numel() < n:
+            buf = torch.empty(n, dtype=dtype, device=device)
+            self._local.buf = buf
+        return buf[:n]
+
+    @_inference_mode()
+    def quantize_weights(self, weight: torch.Tensor, quant_dtypes: list[str] | None = None):
+        """
+        Block-wise equivalent of round(w / scale * 127) / 127 * scale cast to FP8.
+        Every op runs in the weight's own dtype, exactly like the unfused expression,
+        so the output is bit-identical while the only temporary is one scratch block.
+        With `quant_dtypes`, the absmax, scale and rounding are computed once and each
+        block is cast into every requested dtype; a {dtype: tensor} dict is returned.
+        """
+        if not weight.is_floating_point():
+            return weight if quant_dtypes is None else {qd: weight for qd in quant_dtypes}
+        dev = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+        w = weight.to(dev).reshape(-1)
+        outs = {qd: torch.empty(weight.shape, dtype=getattr(torch, qd), device=dev) for qd in (quant_dtypes or [self.quant_dtype])}
+        result = outs if quant_dtypes is not None else outs[self.quant_dtype]
+        if w.numel() == 0: return result
+
+        # max(|w|) without materializing abs(w): the extremes are exact, so this is the same value
+        lo, hi = torch.aminmax(w)
+        mx = torch.maximum(hi, -lo)
+        if mx == 0:
+            for out in outs.values(): out.zero_()
+            return result
+        scale = torch.max(mx / 127.0, torch.tensor(1e-12, device=dev, dtype=w.dtype))
+
+        flats = [out.view(-1) for out in outs.values()]
+        buf = self._scratch(min(w.numel(), BLOCK_ELEMS), w.dtype, dev)
+        for start in range(0, w.numel(), BLOCK_ELEMS):
+            blk = w[start:start + BLOCK_ELEMS]
+            b = buf[:blk.numel()]
+            torch.div(blk, scale, out=b)
+            b.mul_(127.0).round_().div_(127.0).mul_(scale)
+            for flat in flats: flat[start:start + BLOCK_ELEMS].copy_(b)
+        return result
+
+    def _np_scratch(self, n: int, dtype) -> tuple[np.ndarray, np.ndarray]:
+        """Per-thread compute buffer and uint32 scratch for the numpy engine, reused like _scratch."""
+        bufs = getattr(self._local, "np_bufs", None)
+        if bufs is None or bufs[0].dtype != dtype or bufs[0].size < n:
+            bufs = (np.empty(n, dtype=dtype), np.empty(n, dtype=np.uint32))
+            self._local.np_bufs = bufs
+        return bufs[0][:n], bufs[1][:n]
+
+    def quantize_array(self, raw: np.ndarray, dtype: str, quant_dtypes: list[str] | None = None):
+        """
+        NumPy twin of quantize_weights over a tensor's raw bytes (`dtype` is its safetensors name).
+        Every op is rounded to the weight dtype as torch does and the FP8 cast works on the float32 bits,
+        so the returned uint8 arrays hold exactly the bytes the torch engine writes.
+        """
+        if dtype not in FLOAT_DTYPES:
+            return raw if quant_dtypes is None else {qd: raw for qd in quant_dtypes}
+        if dtype not in _NP_COMPUTE: raise TypeError(f"Cannot quantize {dtype} weights")
+        n, width, ct = raw.size // DTYPE_SIZES[dtype], DTYPE_SIZES[dtype], _NP_COMPUTE[dtype]
+        outs = {qd: np.empty(n, dtype=np.uint8) for qd in (quant_dtypes or [self.quant_dtype])}
+        result = outs if quant_dtypes is not None else outs[self.quant_dtype]
+        if n == 0: return result
+
+        buf, tmp = self._np_scratch(min(n, NP_BLOCK_ELEMS), ct)
+        def blocks():
+            for start in range(0, n, NP_BLOCK_ELEMS):
+                stop = min(start + NP_BLOCK_ELEMS, n)
+                yield start, _widen(raw[start * width:stop * width], dtype, buf[:stop - start]), tmp[:stop - start]
+
+        # max(|w|), one block at a time: widening is exact, so this matches torch.aminmax
+        mx = ct(0)
+        for _, b, _ in blocks(): mx = np.maximum(mx, np.maximum(b.max(), -b.min()))
+        if mx == 0:
+            for out in outs.values(): out.fill(0)
+            return result
+        one, tiny = np.empty(1, dtype=np.uint32), np.array([mx / ct(127.0), 1e-12], dtype=ct)
+        _round_(tiny[:1], dtype, one); _round_(tiny[1:], dtype, one)
+        scale = np.maximum(tiny[0], tiny[1])
+
+        with np.errstate(all="ignore"):
+            for start, b, t in blocks():
+                np.divide(b, scale, out=b); _round_(b, dtype, t)
+                b *= ct(127.0); _round_(b, dtype, t)
+                np.rint(b, out=b)
+                b /= ct(127.0); _round_(b, dtype, t)
+                b *= scale; _round_(b, dtype, t)
+                # torch narrows double to float before the FP8 cast
+                x = b.astype(np.float32) if dtype == "F64" else b
+                for qd, out in outs.items(): _encode_fp8(x, qd, out[start:start + b.size])
+        return result
+
+    def apply_quantization_to_file(self, src_path, dst_path, unet_only=True, check_stop_func=None):
+        return self.apply_quantization_multi(src_path, [(dst_path, self.quant_dtype, unet_only)], check_stop_func)
+
+    def apply_quantization_multi(self, src_path, targets, check_stop_func=None):
+        """
+        Writes several FP8 variants in one pass over the source.
+        `targets` is a list of (dst_path, quant_dtype, unet_only); each tensor is read once,
+        quantized once per distinct dtype, and fanned out to every output that wants it.
+        """
+        # Streams tensor by tensor: peak RAM is about one tensor (plus its FP8 copies) and the headers
+        if self.engine == "numpy":
+            if not src_path.endswith(".safetensors"):
+                raise ValueError("The numpy engine only reads .safetensors: install torch for other checkpoints")
+            # Raw bytes straight from the memory-mapped file, in name order like safe_open.keys()
+            header, data_start = read_header(src_path)
+            src, mm = contextlib.nullcontext(), np.memmap(src_path, dtype=np.uint8, mode="r")
+            spans = {name: span for name, _, _, span in header}
+            src_entries = sorted((name, dtype, shape) for name, dtype, shape, _ in header)
+            get_tensor = lambda name: mm[data_start + spans[name][0]:data_start + spans[name][1]]
+        elif src_path.endswith(".safetensors"):
+            src = safe_open(src_path, framework="pt", device="cpu")
+            src_entries = entries_from(src)
+            get_tensor = src.get_tensor
+        else:
+            src = contextlib.nullcontext()
+            state_dict = torch.load(src_path, map_location="cpu")
+            src_entries = [(n, dtype_name(t.dtype), list(t.shape)) for n, t in state_dict.items()]
+            get_tensor = state_dict.__getitem__
+        if not src_entries or not targets: return False
+
+        # wanted[name] = the FP8 dtype each target needs for this tensor (None = copied unchanged)
+        names, wanted, cost, src_dtype = [], {}, {}, {}
+        target_entries = [[] for _ in targets]
+        for name, dtype, shape in src_entries:
+            numel = 1
+            for d in shape: numel *= int(d)
+            wanted[name], src_dtype[name] = [], dtype
+            # Budget cost: the loaded source tensor plus one copy per distinct output dtype
+            cost[name] = tensor_nbytes(name, dtype, shape)
+            for t_idx, (_, quant_dtype, unet_only) in enumerate(targets):
+                out_dtype = dtype
+                if dtype in FLOAT_DTYPES and not (unet_only and "model.diffusion_model" not in name):
+                    out_dtype = dtype_name(quant_dtype)
+                    if quant_dtype not in wanted[name]: cost[name] += numel * DTYPE_SIZES[out_dtype]
+                    wanted[name].append(quant_dtype)
+                else:
+                    wanted[name].append(None)
+                target_entries[t_idx].append((name, out_dtype, shape))
+            names.append(name)
+
+        def process(name, param, dtypes):
+            quantized = {}
+            if any(dtypes):
+                qds = sorted({qd for qd in dtypes if qd})
+                if self.engine == "numpy": quantized = self.quantize_array(param, src_dtype[name], qds)
+                else: quantized = self.quantize_weights(param, qds)
+            return [quantized[qd] if qd else param for qd in dtypes]
+
+        total, total_bytes = len(names), sum(cost.values()) or 1
+        pending, started = collections.deque(), time.perf_counter()
+        done = done_bytes = inflight = 0
+
+        def write_next(writers):
+            # Results are written in submission order, so the output is deterministic
+            nonlocal done, done_bytes, inflight
+            name, fut = pending.popleft()
+            for writer, tensor in zip(writers, fut.result()): writer.write(name, tensor)
+            inflight -= cost[name]; done += 1; done_bytes += cost[name]
+
+            # Aggregate progress over all workers (every 5 tensors)
+            if done % 5 == 0 or done == total:
+                rate = done_bytes / max(time.perf_counter() - started, 1e-6) / 1024**2
+                sys.stdout.write(f"\r[FP8 Progress] {done_bytes / total_bytes * 100:3.1f}% | Tensor {done}/{total} "
+                                 f"| {len(pending)} in flight | {rate:.0f} MB/s")
+                sys.stdout.flush()
+
+        # The pool gets the cores; split torch's intra-op threads between the workers
+        # (NumPy's ufuncs are single-threaded and release the GIL, so the pool alone scales them)
+        if self.engine == "torch":
+            old_threads = torch.get_num_threads()
+            torch.set_num_threads(max(1, old_threads // self.workers))
+        try:
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(src)
+                writers = [stack.enter_context(StreamingWriter(dst, entries)) for (dst, _, _), entries in zip(targets, target_entries)]
+                pool = stack.enter_context(ThreadPoolExecutor(self.workers))
+                for name in names:
+                    if check_stop_func and check_stop_func():
+                        for _, fut in pending: fut.cancel()
+                        for writer in writers: writer.abort()
+                        return False
+
+                    # Stay under the byte budget: write finished tensors before loading more
+                    while pending and (inflight + cost[name] > self.max_inflight_bytes or len(pending) >= 2 * self.workers):
+                        write_next(writers)
+
+                    param = get_tensor(name)
+                    pending.append((name, pool.submit(process, name, param, wanted[name]))); inflight += cost[name]
+                    del param
+
+                while pending: write_next(writers)
+        finally:
+            if self.engine == "torch": torch.set_num_threads(old_threads)
+
+        print("") # Move to next line after progress is done
+        return True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="FP8 (E5M2 / E4M3FN) quantizer")
+    ap.add_argument("--src", required=True, help="Input .safetensors (or torch checkpoint)")
+    ap.add_argument("--target", nargs=3, action="append", required=True, metavar=("DST", "DTYPE", "SCOPE"),
+                    help="Output file, float8_e5m2|float8_e4m3fn, unet|all (repeat to write several variants in one pass)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-inflight-gb", type=float, default=None, help="RAM budget for tensors loaded but not yet written")
+    ap.add_argument("--engine", choices=ENGINES, default=None, help="Default: torch when installed, else numpy")
+    args = ap.parse_args()
+
+    targets = []
+    for dst, quant_dtype, scope in args.target:
+        if quant_dtype not in _FP8_ENCODING or scope not in ("unet", "all"):
+            ap.error(f"invalid --target {dst} {quant_dtype} {scope}")
+        targets.append((dst, quant_dtype, scope == "unet"))
+
+    budget = int(args.max_inflight_gb * 1024**3) if args.max_inflight_gb else None
+    try:
+        qzer = FP8Quantizer(workers=args.workers, max_inflight_bytes=budget, engine=args.engine)
+        print(f"Quantizing {args.src} -> {len(targets)} FP8 file(s) ({qzer.engine} engine) ...")
+        if not qzer.apply_quantization_multi(args.src, targets):
+            sys.exit("❌ Source has no tensors")
+    except Exception as err:
+        print("❌ FP8 quantization failed:", err, file=sys.stderr)
+        sys.exit(1)
+    print("Done ✅")
+
+
+if __name__ == "__main__":
+    main()
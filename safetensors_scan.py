@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""safetensors_scan.py — Header-only classification of a .safetensors input
+* Reads only the JSON header (milliseconds, no torch, no tensor data)
+* Reports dtypes, FP8 weights, scale keys, 5D tensors and component prefixes
+* prep_steps() picks the minimal GGUF prep for the file
+* Reports are cached per file fingerprint (path, size, mtime)
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from safetensors_stream import read_header
+
+# --------- helpers & constants ---------
+FP8_DTYPES = {"F8_E4M3", "F8_E5M2"}
+SCALE_SUFFIXES = ("weight_scale", "scale_weight", "scale_input", "scale", "scale_inv", "scale_reciprocal")
+JUNK_SUFFIXES = (".comfy_quant", ".weight_scale", "scale_inv")  # always dropped by the dequantizer
+COMPONENT_PREFIXES = ("model.diffusion_model.", "first_stage_model.", "conditioner.", "cond_stage_model.",
+                      "text_encoders.", "vae.", "model.", "net.")
+
+_cache, _cache_lock = {}, threading.Lock()
+
+
+@dataclass
+class ScanReport:
+    path: str
+    tensors: int = 0
+    dtypes: Counter = field(default_factory=Counter)  # safetensors dtype -> tensor count
+    fp8_weights: list = field(default_factory=list)
+    scale_keys: list = field(default_factory=list)
+    junk_keys: list = field(default_factory=list)
+    nd5_tensors: list = field(default_factory=list)  # tensors with more than 4 dims (need the 5D fix after quantizing)
+    components: Counter = field(default_factory=Counter)  # prefix -> tensor count ("" = no known prefix)
+
+    @property
+    def has_fp8(self) -> bool:
+        return bool(self.fp8_weights)
+
+    def summary(self) -> str:
+        dtypes = ", ".join(f"{k}={v}" for k, v in self.dtypes.most_common())
+        comps = ", ".join(f"{k.rstrip('.') or '<root>'}={v}" for k, v in self.components.most_common())
+        return (f"{os.path.basename(self.path)}: {self.tensors} tensors [{dtypes}] | FP8 weights: {len(self.fp8_weights)} "
+                f"| scale keys: {len(self.scale_keys)} | 5D: {len(self.nd5_tensors)} | components: {comps}")
+
+
+def fingerprint(path: str) -> tuple:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def scan(path: str) -> ScanReport:
+    """Classifies a .safetensors file from its header; repeated calls for an unchanged file hit the cache."""
+    key = fingerprint(path)
+    with _cache_lock:
+        if key in _cache: return _cache[key]
+
+    entries, _ = read_header(path)
+    report = ScanReport(path=path, tensors=len(entries))
+    for name, dtype, shape, _ in entries:
+        report.dtypes[dtype] += 1
+        if dtype in FP8_DTYPES and name.endswith(".weight"): report.fp8_weights.append(name)
+        if name.rpartition(".")[2] in SCALE_SUFFIXES: report.scale_keys.append(name)
+        if name.endswith(JUNK_SUFFIXES): report.junk_keys.append(name)
+        if len(shape) > 4: report.nd5_tensors.append(name)
+        report.components[next((p for p in COMPONENT_PREFIXES if name.startswith(p)), "")] += 1
+
+    with _cache_lock:
+        _cache[key] = report
+    return report
+
+
+def prep_steps(report: ScanReport) -> list[str]:
+    """
+    Minimal GGUF prep for a scanned file, as an ordered list of steps:
+    * "dequant": FP8 weights must be restored (or scale/junk keys dropped) before convert.py can read it
+    * "cast": no FP8, but F32/BF16/F64 tensors still have to become F16 like the dequantizer would make them
+    * "convert": convert.py to the -CONVERT.gguf, always needed
+    Only a checkpoint whose floats are all F16 goes straight to convert.py.
+    """
+    steps = []
+    if report.has_fp8 or report.junk_keys: steps.append("dequant")
+    elif report.dtypes.keys() & {"F32", "BF16", "F64"}: steps.append("cast")
+    steps.append("convert")
+    return steps
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python safetensors_scan.py <model.safetensors> [...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        rep = scan(path)
+        print(rep.summary())
+        print(f"  prep steps: {' -> '.join(prep_steps(rep))}")
+        for name in rep.nd5_tensors: print(f"  5D tensor: {name}")
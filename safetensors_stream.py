@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""safetensors_stream.py — Incremental .safetensors writer
+* Header is computed up front from tensor names, dtypes and shapes
+* Tensor bytes are written to disk one tensor at a time, in header order
+* Output is preallocated and written with large sequential writes
+* Never holds more than the tensor currently being written
+* Accepts torch tensors or NumPy arrays; headers can be read without torch
+"""
+
+import json
+import os
+import struct
+
+# --------- helpers & constants ---------
+# Bits per element of every dtype the safetensors format defines (F4 and F6 are packed: a tensor fills whole bytes)
+DTYPE_BITS = {
+    "F64": 64, "F32": 32, "F16": 16, "BF16": 16, "C64": 64,
+    "F8_E4M3": 8, "F8_E5M2": 8, "F8_E4M3FNUZ": 8, "F8_E5M2FNUZ": 8, "F8_E8M0": 8, "F6_E2M3": 6, "F6_E3M2": 6, "F4": 4,
+    "I64": 64, "I32": 32, "I16": 16, "I8": 8, "U64": 64, "U32": 32, "U16": 16, "U8": 8, "BOOL": 8,
+}
+DTYPE_SIZES = {k: bits // 8 for k, bits in DTYPE_BITS.items() if bits % 8 == 0}  # bytes per element
+FLOAT_DTYPES = {"F64", "F32", "F16", "BF16", "F8_E4M3", "F8_E5M2"}
+WRITE_BUFFER = 16 << 20  # small tensors are coalesced into writes of this size
+
+_TORCH_NAMES = {
+    "float64": "F64", "float32": "F32", "float16": "F16", "bfloat16": "BF16",
+    "float8_e4m3fn": "F8_E4M3", "float8_e5m2": "F8_E5M2", "float8_e4m3fnuz": "F8_E4M3FNUZ", "float8_e5m2fnuz": "F8_E5M2FNUZ",
+    "float8_e8m0fnu": "F8_E8M0", "complex64": "C64",
+    "int64": "I64", "int32": "I32", "int16": "I16", "int8": "I8",
+    "uint64": "U64", "uint32": "U32", "uint16": "U16", "uint8": "U8", "bool": "BOOL",
+}
+
+def dtype_name(dtype) -> str:
+    """Returns the safetensors dtype string (e.g. 'BF16') for a torch dtype."""
+    name = str(dtype).replace("torch.", "")
+    if name not in _TORCH_NAMES: raise ValueError(f"No safetensors dtype for torch.{name}")
+    return _TORCH_NAMES[name]
+
+def _checked_dtype(name: str, dtype: str) -> str:
+    if dtype not in DTYPE_BITS: raise ValueError(f"Tensor '{name}' has unsupported dtype {dtype!r}")
+    return dtype
+
+def tensor_nbytes(name: str, dtype: str, shape) -> int:
+    """Size in bytes of tensor `name`; ValueError for an unknown dtype or a packed tensor that does not fill whole bytes."""
+    bits = DTYPE_BITS[_checked_dtype(name, dtype)]
+    for d in shape: bits *= int(d)
+    if bits % 8: raise ValueError(f"Tensor '{name}': {dtype} {list(shape)} does not fill a whole number of bytes")
+    return bits // 8
+
+def entries_from(f, names=None) -> list:
+    """(name, dtype, shape) for each tensor of an open `safe_open` handle, read from the header only."""
+    out = []
+    for name in (f.keys() if names is None else names):
+        sl = f.get_slice(name)
+        out.append((name, _checked_dtype(name, sl.get_dtype()), sl.get_shape()))
+    return out
+
+def read_header(path: str) -> tuple[list, int]:
+    """
+    Parses a .safetensors header without torch.
+    Returns ([(name, dtype, shape, (begin, end)), ...] in file order, offset of the data section).
+    """
+    with open(path, "rb") as f:
+        (n,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(n))
+    header.pop("__metadata__", None)
+    entries = [(name, _checked_dtype(name, h["dtype"]), h["shape"], tuple(h["data_offsets"])) for name, h in header.items()]
+    entries.sort(key=lambda e: e[3][0])
+    return entries, 8 + n
+
+def tensor_bytes(tensor) -> memoryview:
+    """Raw, C-ordered bytes of a tensor (or NumPy array) without an intermediate copy where possible."""
+    if hasattr(tensor, "__array_interface__"):
+        import numpy as np
+        return memoryview(np.ascontiguousarray(tensor).reshape(-1).view(np.uint8))
+    import torch
+    t = tensor.detach().cpu().contiguous().reshape(-1)
+    return memoryview(t.view(torch.uint8).numpy())
+
+
+class StreamingWriter:
+    """
+    Writes a .safetensors file tensor by tensor.
+    `entries` is the ordered list of (name, dtype, shape) that will be written;
+    `write()` must then be called once per entry, in the same order.
+    """
+
+    def __init__(self, path: str, entries, metadata: dict | None = None):
+        self.path = path
+        self._expected = []
+        header = {}
+        if metadata:
+            header["__metadata__"] = {str(k): str(v) for k, v in metadata.items()}
+        offset = 0
+        for name, dtype, shape in entries:
+            size = tensor_nbytes(name, dtype, shape)
+            header[name] = {"dtype": dtype, "shape": [int(d) for d in shape], "data_offsets": [offset, offset + size]}
+            self._expected.append((name, size))
+            offset += size
+        self.data_size = offset
+
+        # The header is padded with spaces so the data section starts 8-byte aligned
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        raw += b" " * (-len(raw) % 8)
+        self._index = 0
+        self._fh = open(path, "wb", buffering=WRITE_BUFFER)
+        _preallocate(self._fh, 8 + len(raw) + self.data_size)
+        self._fh.write(struct.pack("<Q", len(raw)))
+        self._fh.write(raw)
+
+    def write(self, name: str, tensor) -> None:
+        if self._index >= len(self._expected):
+            raise ValueError(f"Unexpected tensor '{name}': all tensors were already written")
+        exp_name, exp_size = self._expected[self._index]
+        if name != exp_name:
+            raise ValueError(f"Out of order write: expected '{exp_name}', got '{name}'")
+        buf = tensor_bytes(tensor)
+        if buf.nbytes != exp_size:
+            raise ValueError(f"Size mismatch for '{name}': header says {exp_size} bytes, got {buf.nbytes}")
+        self._fh.write(buf)
+        self._index += 1
+
+    def close(self) -> None:
+        if self._fh is None: return
+        self._fh.close(); self._fh = None
+        if self._index != len(self._expected):
+            missing = self._expected[self._index][0]
+            self._remove()
+            raise ValueError(f"Incomplete file: tensor '{missing}' was never written")
+
+    def abort(self) -> None:
+        """Closes and deletes the partially written file."""
+        if self._fh is not None:
+            self._fh.close(); self._fh = None
+        self._remove()
+
+    def _remove(self):
+        try: os.remove(self.path)
+        except OSError: pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None: self.abort()
+        else: self.close()
+        return False
+
+
+def _preallocate(fh, size: int) -> None:
+    """Reserves the final file size up front so the data lands in few, contiguous extents."""
+    try:
+        if hasattr(os, "posix_fallocate"): os.posix_fallocate(fh.fileno(), 0, size)
+        else: fh.truncate(size)
+    except OSError:
+        pass  # Not supported by this filesystem; the file simply grows as we write
+
+def save_file(tensors: dict, path: str, metadata: dict | None = None) -> None:
+    """Drop-in for safetensors.torch.save_file that streams each tensor instead of serializing the whole dict."""
+    entries = [(name, dtype_name(t.dtype), list(t.shape)) for name, t in tensors.items()]
+    with StreamingWriter(path, entries, metadata=metadata) as writer:
+        for name, t in tensors.items():
+            writer.write(name, t)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""sha256_cache.py — Cached SHA-256 of large artifacts
+* Files are hashed through mmap in large chunks (no copies; hashlib releases the GIL while hashing)
+* Several files hash in parallel, one thread per file (a single SHA-256 stream cannot be split)
+* Digests are kept in a per-folder sidecar (.sha256_cache.json) keyed by file name, size and mtime
+* A rerun on unchanged files costs one stat() per file
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --------- helpers & constants ---------
+SIDECAR_NAME = ".sha256_cache.json"
+CHUNK_BYTES = 64 << 20
+
+_sidecar_lock = threading.Lock()
+
+
+def sha256_file(path: str, chunk: int = CHUNK_BYTES) -> str:
+    """Hex SHA-256 of a file, read through a read-only memory map."""
+    h = hashlib.sha256()
+    size = os.path.getsize(path)
+    if size == 0: return h.hexdigest()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise"): mm.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mm)
+        try:
+            for off in range(0, size, chunk): h.update(view[off:off + chunk])
+        finally:
+            view.release()
+    return h.hexdigest()
+
+
+def _sidecar_path(path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SIDECAR_NAME)
+
+
+def load_json(path: str) -> dict:
+    """Contents of a JSON index file; {} if it is missing, unreadable or not a JSON object."""
+    try:
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json(path: str, data, fsync: bool = False) -> None:
+    """Writes `data` to a temp file renamed over `path`, so readers (and a crash) never see half a file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+        if fsync: f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def cached_sha256(path: str) -> str:
+    """SHA-256 of `path`, from the sidecar when name, size and mtime still match; hashed (and recorded) otherwise."""
+    st, name, sidecar = os.stat(path), os.path.basename(path), _sidecar_path(path)
+    with _sidecar_lock:
+        entry = load_json(sidecar).get(name)
+    if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = sha256_file(path)
+    with _sidecar_lock:
+        data = load_json(sidecar)
+        data[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        try: save_json(sidecar, data)
+        except OSError: pass  # read-only folder: the digest is still good, just not remembered
+    return digest
+
+
+def hash_files(paths, workers: int = 4) -> dict:
+    """{path: hex sha256} for every path, `workers` files at a time."""
+    paths = list(dict.fromkeys(paths))
+    if not paths: return {}
+    with ThreadPoolExecutor(max(1, min(workers, len(paths)))) as ex:
+        return dict(zip(paths, ex.map(cached_sha256, paths)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python sha256_cache.py <file> [...]")
+        sys.exit(1)
+    for path, digest in hash_files(sys.argv[1:], workers=os.cpu_count() or 1).items():
+        print(f"{digest}  {path}")
@@ -0,0 +1,133 @@
+"""Minimal in-process stand-in for the Hub API (just what upload_to_hf uses), with scripted failures."""
+
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeHub:
+    """
+    `fail(kind, *statuses)` makes the next requests of that kind ("preupload", "put", "commit", "paths-info")
+    answer with those HTTP statuses, in order, before behaving normally again.
+    `calls[kind]` counts every request of a kind; `puts[oid]` counts successful LFS payload uploads per object.
+    """
+
+    def __init__(self):
+        self.files = {}     # path in repo -> (lfs oid or None, size)
+        self.blobs = {}     # lfs oid -> size
+        self.commits = []
+        self.calls, self.puts = Counter(), Counter()
+        self._faults = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def fail(self, kind: str, *statuses: int) -> None:
+        with self._lock: self._faults.setdefault(kind, []).extend(statuses)
+
+    def _next_fault(self, kind: str) -> int | None:
+        with self._lock:
+            self.calls[kind] += 1
+            pending = self._faults.get(kind)
+            return pending.pop(0) if pending else None
+
+    def _handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args): pass
+
+            def _body(self) -> bytes:
+                n = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(n) if n else b""
+
+            def _json(self, obj, code=200, headers=None):
+                data = json.dumps(obj).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items(): self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _faulted(self, kind: str) -> bool:
+                status = hub._next_fault(kind)
+                if status is None: return False
+                self._json({"error": f"injected {status}"}, status, {"Retry-After": "0"} if status == 429 else None)
+                return True
+
+            def do_GET(self):
+                if self.path.startswith("/api/whoami"): return self._json({"name": "me", "type": "user", "auth": {}})
+                if re.match(r"/api/models/[^/]+/[^/?]+", self.path):
+                    return self._json({"id": "me/repo", "sha": "0" * 40, "siblings": [{"rfilename": p} for p in hub.files]})
+                self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = self._body()
+                if "/paths-info/" in self.path:
+                    if self._faulted("paths-info"): return
+                    query = json.loads(body) if self.headers.get("Content-Type", "").startswith("application/json") else parse_qs(body.decode())
+                    out = []
+                    for p in query.get("paths", []):
+                        if p not in hub.files: continue
+                        oid, size = hub.files[p]
+                        entry = {"type": "file", "path": p, "size": size, "oid": "b" * 40}
+                        if oid: entry["lfs"] = {"oid": oid, "size": size, "pointerSize": 130}
+                        out.append(entry)
+                    return self._json(out)
+                if self.path == "/api/validate-yaml": return self._json({"errors": [], "warnings": []})  # model card check
+                if "/preupload/" in self.path:
+                    if self._faulted("preupload"): return
+                    files = json.loads(body)["files"]
+                    return self._json({"files": [{"path": f["path"], "uploadMode": "regular" if f["path"].endswith(".md") else "lfs",
+                                                  "shouldIgnore": False} for f in files]})
+                if self.path.endswith("/info/lfs/objects/batch"):
+                    objects = []
+                    for o in json.loads(body)["objects"]:
+                        obj = {"oid": o["oid"], "size": o["size"]}
+                        if o["oid"] not in hub.blobs: obj["actions"] = {"upload": {"href": f"{hub.url}/lfs/{o['oid']}"}}
+                        objects.append(obj)
+                    return self._json({"transfer": "basic", "objects": objects})
+                if "/commit/" in self.path:
+                    if self._faulted("commit"): return
+                    lines = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+                    for line in lines:
+                        if line["key"] == "lfsFile":
+                            if line["value"]["oid"] not in hub.blobs: return self._json({"error": "missing LFS object"}, 422)
+                            hub.files[line["value"]["path"]] = (line["value"]["oid"], line["value"]["size"])
+                        elif line["key"] == "file": hub.files[line["value"]["path"]] = (None, 0)
+                    hub.commits.append(lines)
+                    n = len(hub.commits)
+                    return self._json({"commitUrl": f"{hub.url}/me/repo/commit/{n:040d}", "commitOid": f"{n:040d}", "pullRequestUrl": None})
+                self._json({"error": "not found"}, 404)
+
+            def do_PUT(self):
+                body = self._body()
+                if self._faulted("put"): return
+                oid = self.path.rsplit("/", 1)[1]
+                if hashlib.sha256(body).hexdigest() != oid: return self._json({"error": "bad payload"}, 400)
+                with hub._lock:
+                    hub.blobs[oid] = len(body)
+                    hub.puts[oid] += 1
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
@@ -0,0 +1,68 @@
+import struct
+
+import pytest
+
+torch = pytest.importorskip("torch")
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+from dequantize_fp8v2 import DTYPE_MAP, OUT_NAMES, numpy_convert, stream_convert
+
+
+def _fp8(shape, dtype, g):
+    """Every bit pattern is fair game: the raw bytes are random, NaN codes included."""
+    return torch.randint(0, 256, shape, dtype=torch.uint8, generator=g).view(dtype)
+
+
+def _checkpoint(path):
+    g = torch.Generator().manual_seed(0)
+    e4, e5 = torch.float8_e4m3fn, torch.float8_e5m2
+    sd = {
+        # scalar scales: multiplier (.weight_scale), divisor (.scale), zero divisor
+        "scalar.weight": _fp8((32, 64), e4, g), "scalar.weight_scale": torch.tensor(0.0173),
+        "inverted.weight": _fp8((32, 64), e5, g), "inverted.scale": torch.tensor(57.5),
+        "zero.weight": _fp8((8, 8), e4, g), "zero.scale": torch.tensor(0.0),
+        # per-output-channel, as (out,) and (out, 1); small (widened) and large (one table per channel)
+        "chan.weight": _fp8((64, 48), e4, g), "chan.weight_scale": torch.rand(64, generator=g) + 0.01,
+        "chan_col.weight": _fp8((16, 4096), e5, g), "chan_col.scale_inv": torch.rand(16, 1, generator=g) + 0.01,
+        # block-wise: exact 128x128 tiling and a ragged one
+        "block.weight": _fp8((256, 384), e4, g), "block.weight_scale": torch.rand(2, 3, generator=g) + 0.01,
+        "ragged.weight": _fp8((200, 300), e4, g), "ragged.scale": torch.rand(2, 3, generator=g) + 0.5,
+        "noscale.weight": _fp8((4, 4), e5, g),
+        "empty.weight": _fp8((0, 8), e4, g), "empty.weight_scale": torch.tensor(2.0),
+        "empty.bias": torch.zeros(0),
+        # non-FP8 tensors and the junk keys the dequantizer knows
+        "norm.weight": torch.randn(64, generator=g),
+        "bf.weight": torch.randn(33, generator=g).to(torch.bfloat16),
+        "half.weight": torch.randn(17, generator=g).to(torch.float16),
+        "double.bias": torch.randn(5, generator=g, dtype=torch.float64),
+        "index": torch.arange(7, dtype=torch.int64),
+        "scalar.scale_input": torch.tensor(1.5),
+        "scalar.comfy_quant": torch.tensor([1, 2, 3], dtype=torch.uint8),
+    }
+    save_file(sd, str(path))
+
+
+@pytest.mark.parametrize("strip_fp8", [False, True])
+@pytest.mark.parametrize("dtype", ["fp16", "bf16"])
+def test_numpy_engine_matches_torch_stream(tmp_path, dtype, strip_fp8):
+    src, ref, out = tmp_path / "src.safetensors", tmp_path / "torch.safetensors", tmp_path / "numpy.safetensors"
+    _checkpoint(src)
+    stream_convert(str(src), str(ref), out_dtype=DTYPE_MAP[dtype], strip_fp8=strip_fp8)
+    numpy_convert(str(src), str(out), out_name=OUT_NAMES[dtype], strip_fp8=strip_fp8)
+    if dtype == "fp16":
+        assert out.read_bytes() == ref.read_bytes()
+        return
+    # torch's vectorized bfloat16 rounding makes NaN 0xFFFF, its scalar loop 0x7FC0 (see test_fp8_quantize):
+    # the layout and every other bit must match, NaNs only have to be NaN in both
+    a, b = out.read_bytes(), ref.read_bytes()
+    n = 8 + struct.unpack("<Q", a[:8])[0]
+    assert len(a) == len(b) and a[:n] == b[:n]
+    with safe_open(str(out), "pt") as fo, safe_open(str(ref), "pt") as fr:
+        for name in fr.keys():
+            x, y = fo.get_tensor(name), fr.get_tensor(name)
+            if x.dtype == torch.bfloat16:
+                nan = y.isnan()
+                assert torch.equal(x.isnan(), nan), name
+                x, y = x[~nan], y[~nan]
+            assert torch.equal(x.view(torch.uint8), y.view(torch.uint8)), name
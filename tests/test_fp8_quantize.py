@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Utils"))
+from bench_fp8_quantize import DTYPES, get_impl
+
+QUANTS = ["float8_e5m2", "float8_e4m3fn"]
+
+
+def _fp8_nan(b, quant):
+    mag = b & 0x7F
+    return mag == 0x7F if quant == "float8_e4m3fn" else mag > 0x7C
+
+
+def _weight(case, dtype):
+    g = torch.Generator().manual_seed(0)
+    w = torch.randn(300, 300, generator=g)  # 90000 elements: more than one NumPy engine block
+    if case == "zeros": w.zero_()
+    elif case == "subnormals":
+        tiny = torch.finfo(dtype).smallest_normal
+        w = w * tiny  # mostly subnormal in the weight dtype, with a few normals around them
+    elif case == "large":
+        w = w * (torch.finfo(dtype).max / 8)
+    w = w.to(dtype)
+    if case == "specials":
+        flat = w.view(-1)
+        flat[:6] = torch.tensor([0.0, -0.0, float("inf"), float("-inf"), float("nan"), -float("nan")]).to(dtype)
+        flat[70000] = float("nan")
+    if case == "neg_zero_only": w = torch.full((64,), -0.0, dtype=dtype)
+    return w
+
+
+@pytest.mark.parametrize("case", ["normal", "zeros", "subnormals", "large", "specials", "neg_zero_only"])
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("quant", QUANTS)
+def test_engines_are_bit_identical(quant, dtype, case):
+    w = _weight(case, DTYPES[dtype])
+    ref = get_impl("legacy", quant)(w).cpu().view(torch.uint8)
+    for name in ("fused", "numpy"):
+        out = get_impl(name, quant)(w).cpu().view(torch.uint8)
+        assert out.shape == ref.shape
+        if name == "numpy" and dtype == "bf16":
+            # torch's vectorized bfloat16 rounding makes NaN 0xFFFF, its scalar loop 0x7FC0: which one an element
+            # gets depends on size, CPU and threads, so only the NaN sign is not reproducible. Everything else is.
+            nan = _fp8_nan(ref, quant)
+            assert torch.equal(_fp8_nan(out, quant), nan)
+            out, ref_cmp = out[~nan], ref[~nan]
+        else: ref_cmp = ref
+        assert torch.equal(out, ref_cmp), f"{name}: {(out != ref_cmp).sum().item()} bytes differ"
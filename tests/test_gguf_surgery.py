@@ -0,0 +1,65 @@
+import gguf
+import numpy as np
+import pytest
+from safetensors.numpy import save_file
+
+from gguf_surgery import is_scalar, load_fix, patch_tensors, read_layout, rewrite_gguf
+
+
+def _write_gguf(path, tensors, pad=0):
+    """`pad` grows the KV section so the tensor-info section ends at every position within an alignment unit."""
+    w = gguf.GGUFWriter(str(path), "llama")
+    w.add_string("test.pad", "x" * pad)
+    for name, arr in tensors.items(): w.add_tensor(name, arr)
+    w.write_header_to_file()
+    w.write_kv_data_to_file()
+    w.write_tensors_to_file()
+    w.close()
+
+
+def _read(path):
+    reader = gguf.GGUFReader(str(path))
+    out = {t.name: (tuple(int(d) for d in reversed(t.shape)), np.array(t.data).ravel()) for t in reader.tensors}
+    del reader
+    return out
+
+
+@pytest.mark.parametrize("pad", range(32))
+@pytest.mark.parametrize("model_shape, fix_shape", [((2, 2, 2, 2), (16,)), ((2, 2, 2, 6), (2, 2, 2, 2, 3))],
+                         ids=["shrink", "grow"])
+def test_patch_tensors_changes_shape(tmp_path, pad, model_shape, fix_shape):
+    a = np.arange(np.prod(model_shape), dtype=np.float32).reshape(model_shape)
+    b = np.arange(4, dtype=np.float32) * 10 + 80
+    model, fix = tmp_path / "model.gguf", tmp_path / "fix.safetensors"
+    _write_gguf(model, {"a": a, "b": b}, pad)
+    save_file({"a": (a.ravel() + 1000).reshape(fix_shape)}, str(fix))
+
+    how = patch_tensors(str(model), load_fix(str(fix)))
+
+    assert how in ("in place", "rewritten")
+    got = _read(model)
+    assert got["a"][0] == fix_shape
+    np.testing.assert_array_equal(got["a"][1], a.ravel() + 1000)
+    np.testing.assert_array_equal(got["b"][1], b)
+
+
+def test_patch_tensors_unchanged(tmp_path):
+    model, fix = tmp_path / "model.gguf", tmp_path / "fix.safetensors"
+    _write_gguf(model, {"a": np.ones(4, dtype=np.float32)})
+    save_file({"other": np.zeros(4, dtype=np.float32)}, str(fix))
+    before = model.read_bytes()
+    assert patch_tensors(str(model), load_fix(str(fix))) == "unchanged"
+    assert model.read_bytes() == before
+
+
+def test_rewrite_gguf_drops_scalars_and_keeps_metadata(tmp_path):
+    src, dst = tmp_path / "src.gguf", tmp_path / "dst.gguf"
+    _write_gguf(src, {"w": np.arange(8, dtype=np.float32), "s": np.array(3.0, dtype=np.float32)}, pad=5)
+    assert [t.name for t in read_layout(str(src))[3] if is_scalar(t)] == ["s"]
+
+    assert rewrite_gguf(str(src), str(dst), keep=lambda t: not is_scalar(t)) == (1, 1)
+    got = _read(dst)
+    assert list(got) == ["w"]
+    np.testing.assert_array_equal(got["w"][1], np.arange(8, dtype=np.float32))
+    reader = gguf.GGUFReader(str(dst))
+    assert bytes(reader.fields["test.pad"].parts[-1]) == b"xxxxx"
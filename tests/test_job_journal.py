@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+import sha256_cache
+from job_journal import JobJournal
+
+
+def _out(path, data=b"gguf"):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_done_until_an_output_changes(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.json"))
+    journal.start({"sources": ["m.safetensors"], "quants": ["Q4_K_M"]})
+    q4, q8 = _out(tmp_path / "m-Q4_K_M.gguf"), _out(tmp_path / "m-Q8_0.gguf")
+    journal.record("m", "Q4_K_M", [q4])
+    journal.record("m", "Q8_0", [q8])
+    journal.record("m", "UPLOAD")
+
+    assert journal.done("m", "Q4_K_M") and journal.done("m", "UPLOAD")
+    assert not journal.done("m", "Q5_K_M") and not journal.done("other", "Q4_K_M")
+    assert journal.steps("m") == ["Q4_K_M", "Q8_0", "UPLOAD"]
+    assert journal.outputs("m", "Q4_K_M") == [os.path.abspath(q4)]
+
+    _out(tmp_path / "m-Q4_K_M.gguf", b"rebuilt, longer")
+    os.remove(q8)
+    assert not journal.done("m", "Q4_K_M") and not journal.done("m", "Q8_0")
+    assert journal.done("m", "UPLOAD")
+
+    # Same size, new mtime: still stale
+    journal.record("m", "Q4_K_M", [q4])
+    st = os.stat(q4)
+    os.utime(q4, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert not journal.done("m", "Q4_K_M")
+
+    journal.start({"sources": []})
+    assert journal.steps("m") == [] and journal.spec["sources"] == []
+
+
+def test_reload_after_a_crash(tmp_path, monkeypatch):
+    path = tmp_path / "journal.json"
+    journal = JobJournal(str(path))
+    journal.start({"sources": ["m.safetensors"]})
+    q4 = _out(tmp_path / "m-Q4_K_M.gguf")
+    journal.record("m", "Q4_K_M", [q4])
+
+    # Killed while writing the next update: the rename never happens, the temp file is left behind
+    def killed(*args): raise OSError("killed")
+    monkeypatch.setattr(sha256_cache.os, "replace", killed)
+    with pytest.raises(OSError): journal.record("m", "Q8_0", [_out(tmp_path / "m-Q8_0.gguf")])
+    monkeypatch.undo()
+    assert (tmp_path / "journal.json.tmp").exists()
+
+    resumed = JobJournal(str(path))
+    assert resumed.spec["sources"] == ["m.safetensors"]
+    assert resumed.done("m", "Q4_K_M") and not resumed.done("m", "Q8_0")
+
+    (tmp_path / "journal.json.tmp").write_text('{"cells": {"m": {"Q8_0"')  # half-written leftover
+    resumed.record("m", "Q8_0", [str(tmp_path / "m-Q8_0.gguf")])
+    assert JobJournal(str(path)).done("m", "Q8_0")
+    assert not (tmp_path / "journal.json.tmp").exists()
+
+
+@pytest.mark.parametrize("junk", ['{"spec": {"sources"', "[]", '{"spec": null}', '{"cells": []}', ""])
+def test_corrupt_journal_starts_empty(tmp_path, junk):
+    path = tmp_path / "journal.json"
+    path.write_text(junk)
+    journal = JobJournal(str(path))
+    assert journal.spec is None and journal.steps("m") == [] and not journal.done("m", "Q4_K_M")
+
+    journal.start({"sources": ["m.safetensors"]})
+    journal.record("m", "Q4_K_M", [_out(tmp_path / "m-Q4_K_M.gguf")])
+    assert json.loads(path.read_text())["cells"]["m"]["Q4_K_M"]["outputs"][0]["size"] == 4
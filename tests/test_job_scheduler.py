@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+
+from job_scheduler import JobScheduler, ResourcePool
+
+
+class Usage:
+    """Tracks what the running jobs hold, failing on the first moment the budget is exceeded."""
+
+    def __init__(self, cores, mem_bytes):
+        self.cores, self.mem_bytes = cores, mem_bytes
+        self.running, self.peak_jobs, self.errors = {}, 0, []
+        self._lock = threading.Lock()
+
+    def job(self, name, threads, mem, seconds):
+        with self._lock:
+            self.running[name] = (threads, mem)
+            held_cores = sum(t for t, _ in self.running.values())
+            held_mem = sum(m for _, m in self.running.values())
+            if len(self.running) > 1 and (held_cores > self.cores or held_mem > self.mem_bytes):
+                self.errors.append(f"{sorted(self.running)}: {held_cores} cores, {held_mem} bytes")
+            self.peak_jobs = max(self.peak_jobs, len(self.running))
+        time.sleep(seconds)
+        with self._lock: del self.running[name]
+        return name
+
+
+def _map_with_timeout(scheduler, *args, timeout=20, **kw):
+    out = []
+    t = threading.Thread(target=lambda: out.append(scheduler.map(*args, **kw)), daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "scheduler deadlocked"
+    return out[0]
+
+
+def test_budgets_are_never_exceeded():
+    rng = random.Random(0)
+    mems = {f"job{i}": rng.randrange(5, 60) for i in range(40)}
+    usage = Usage(cores=8, mem_bytes=100)
+    scheduler = JobScheduler(max_jobs=4, cores=8, mem_bytes=100)
+    result = _map_with_timeout(scheduler, lambda job, threads: usage.job(job, threads, mems[job], rng.random() / 100),
+                               list(mems), mem_for=mems.get)
+    assert result == list(mems)
+    assert not usage.errors, usage.errors[:3]
+    assert usage.peak_jobs > 1  # the budget was shared, not serialized
+
+
+def test_threads_split_the_core_budget():
+    scheduler = JobScheduler(max_jobs=3, cores=12)
+    assert _map_with_timeout(scheduler, lambda job, threads: threads, range(5)) == [4] * 5
+    assert _map_with_timeout(scheduler, lambda job, threads: threads, ["only"]) == [12]  # one job gets every core
+
+
+def test_oversized_job_runs_alone_without_deadlock():
+    mems = {"a": 40, "huge": 500, "b": 40, "c": 30, "d": 60}
+    usage = Usage(cores=8, mem_bytes=100)
+    alone = []
+
+    def fn(job, threads):
+        if job == "huge":
+            with usage._lock: alone.append(not usage.running)
+        return usage.job(job, threads, mems[job], 0.05)
+
+    scheduler = JobScheduler(max_jobs=3, cores=8, mem_bytes=100)
+    assert _map_with_timeout(scheduler, fn, list(mems), mem_for=mems.get) == list(mems)
+    assert alone == [True]
+    assert not usage.errors, usage.errors  # nothing started next to it either
+
+
+def test_results_come_back_in_input_order():
+    scheduler = JobScheduler(max_jobs=4, cores=4)
+    jobs = list(range(12))
+    # Later jobs finish first
+    result = _map_with_timeout(scheduler, lambda job, threads: time.sleep((12 - job) / 200) or job * job, jobs)
+    assert result == [job * job for job in jobs]
+
+
+def test_cancel_skips_jobs_that_have_not_started():
+    stop = threading.Event()
+    started = []
+
+    def fn(job, threads):
+        started.append(job)
+        if job == 0: stop.set()
+        time.sleep(0.05)
+        return job
+
+    scheduler = JobScheduler(max_jobs=2, cores=2, mem_bytes=10)
+    result = _map_with_timeout(scheduler, fn, range(6), mem_for=lambda job: 10, cancelled=stop.is_set)
+    assert result[0] == 0 and result[2:] == [None] * 4 and len(started) <= 2
+
+
+def test_pool_admits_one_job_when_idle():
+    pool = ResourcePool(cores=2, mem_bytes=100)
+    assert pool.acquire(8, 1000)  # bigger than everything, but nothing else is running
+    assert not pool.acquire(1, 1, cancelled=lambda: True)
+    pool.release(8, 1000)
+    assert pool.acquire(1, 60) and pool.acquire(1, 40)
+    assert not pool.acquire(1, 1, cancelled=lambda: True)  # full: a cancelled wait gives up instead of blocking
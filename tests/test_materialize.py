@@ -0,0 +1,81 @@
+import errno
+import os
+import shutil
+
+import pytest
+
+import materialize as mat
+from materialize import materialize
+
+DATA = os.urandom(3 * 4096 + 17)
+
+
+def _raise(*args):
+    raise OSError(errno.EXDEV, "forced failure")
+
+
+def _failed_reflink(src, dst):
+    open(dst, "wb").close()  # a refused FICLONE leaves the freshly opened destination behind
+    raise OSError(errno.EOPNOTSUPP, "reflink not supported")
+
+
+def _force(monkeypatch, strategy, src):
+    """Makes every cheaper strategy than `strategy` fail, the way it does on a filesystem that lacks it."""
+    if strategy == "rename": return
+    real_replace = os.replace
+    monkeypatch.setattr(mat.os, "replace", lambda a, b: _raise() if a == src else real_replace(a, b))  # other device
+    if strategy == "reflink":
+        monkeypatch.setattr(mat, "_reflink", shutil.copyfile)  # stands in for a filesystem with clones
+        return
+    monkeypatch.setattr(mat, "_reflink", _failed_reflink)
+    if strategy == "copy": monkeypatch.setattr(mat.os, "link", _raise)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    src, dst = tmp_path / "src.gguf", tmp_path / "out" / "dst.gguf"
+    src.write_bytes(DATA)
+    dst.parent.mkdir()
+    dst.write_bytes(b"stale output")  # always replaced
+    return str(src), str(dst)
+
+
+@pytest.mark.parametrize("strategy, keep_src", [("rename", False), ("reflink", True), ("reflink", False),
+                                                ("hardlink", True), ("hardlink", False), ("copy", True), ("copy", False)])
+def test_each_fallback(monkeypatch, paths, strategy, keep_src):
+    src, dst = paths
+    _force(monkeypatch, strategy, src)
+    assert materialize(src, dst, keep_src=keep_src) == strategy
+    assert open(dst, "rb").read() == DATA
+    assert os.path.exists(src) == keep_src
+    if keep_src:
+        assert open(src, "rb").read() == DATA
+        assert os.path.samefile(src, dst) == (strategy == "hardlink")
+    assert os.listdir(os.path.dirname(dst)) == ["dst.gguf"]
+
+
+def test_no_hardlink_when_link_is_off(monkeypatch, paths):
+    src, dst = paths
+    monkeypatch.setattr(mat, "_reflink", _failed_reflink)
+    assert materialize(src, dst, link=False) == "copy"
+    assert open(dst, "rb").read() == DATA and not os.path.samefile(src, dst)
+
+
+def test_same_path_is_left_alone(paths):
+    src, _ = paths
+    assert materialize(src, src, keep_src=False) == "rename"
+    assert open(src, "rb").read() == DATA
+
+
+def test_failed_copy_leaves_no_partial_file(monkeypatch, paths):
+    src, dst = paths
+    _force(monkeypatch, "copy", src)
+
+    def broken_copy(a, b):
+        with open(b, "wb") as f: f.write(DATA[:100])
+        raise OSError(errno.ENOSPC, "disk full")
+    monkeypatch.setattr(mat.shutil, "copyfile", broken_copy)
+    with pytest.raises(OSError):
+        materialize(src, dst, keep_src=False)
+    assert open(src, "rb").read() == DATA  # the source is only removed once the copy is in place
+    assert not os.listdir(os.path.dirname(dst))
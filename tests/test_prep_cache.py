@@ -0,0 +1,123 @@
+import hashlib
+import itertools
+import json
+import os
+
+import pytest
+
+import prep_cache
+from prep_cache import META_NAME, SOURCES_NAME, PrepCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time(), so last-used order never depends on the timer's resolution."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(prep_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _file(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = PrepCache(str(tmp_path / "cache"), budget_bytes=1 << 20)
+    src = _file(tmp_path / "m.safetensors", b"weights")
+    convert = _file(tmp_path / "m-CONVERT.gguf", b"gguf data")
+    key = cache.key(src, {"dequant": True})
+
+    assert cache.get(key) is None
+    stored = cache.put(key, {"CONVERT.gguf": convert}, source=src)
+    assert os.path.exists(convert)  # the caller's file stays where it was
+    got = cache.get(key, required=("CONVERT.gguf",))
+    assert got == stored and open(got["CONVERT.gguf"], "rb").read() == b"gguf data"
+    assert cache.get(key, required=("CONVERT.gguf", "FIX5D.gguf")) is None
+
+    # Files added later are merged into the same entry
+    cache.put(key, {"FIX5D.gguf": _file(tmp_path / "fix.gguf", b"fixed")})
+    assert sorted(cache.get(key)) == ["CONVERT.gguf", "FIX5D.gguf"]
+    assert cache._meta(cache._entry(key))["source"] == src
+
+
+def test_key_follows_source_tools_and_options(tmp_path, monkeypatch):
+    monkeypatch.setattr(prep_cache, "__file__", str(tmp_path / "prep_cache.py"))  # tools are looked up next to it
+    tool = tmp_path / "convert.py"
+    tool.write_text("print('v1')\n")
+    cache = PrepCache(str(tmp_path / "cache"), budget_bytes=1 << 20)
+    src = tmp_path / "m.safetensors"
+    src.write_bytes(b"a" * 100)
+
+    key = cache.key(str(src), {"dequant": True}, tools=("convert.py",))
+    assert cache.key(str(src), {"dequant": True}, tools=("convert.py",)) == key
+    assert cache.key(str(src), {"dequant": False}, tools=("convert.py",)) != key
+
+    tool.write_text("print('v2')\n")
+    assert cache.key(str(src), {"dequant": True}, tools=("convert.py",)) != key
+    tool.write_text("print('v1')\n")
+    assert cache.key(str(src), {"dequant": True}, tools=("convert.py",)) == key
+
+    # Same size, new content and mtime: the source is hashed again
+    src.write_bytes(b"b" * 100)
+    os.utime(src, ns=(1, 1))
+    assert cache.key(str(src), {"dequant": True}, tools=("convert.py",)) != key
+
+
+def test_lru_eviction_under_budget(tmp_path, clock, capsys):
+    cache = PrepCache(str(tmp_path / "cache"), budget_bytes=250)
+    keys = [hashlib.sha256(bytes([i])).hexdigest() for i in range(4)]
+    for i, key in enumerate(keys[:2]): cache.put(key, {"CONVERT.gguf": _file(tmp_path / f"{i}.gguf", bytes(100))})
+    cache.get(keys[0])  # the oldest entry becomes the most recently used one
+
+    cache.put(keys[2], {"CONVERT.gguf": _file(tmp_path / "2.gguf", bytes(100))})
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) and cache.get(keys[2])
+    assert sum(size for _, size, _ in cache.entries()) <= 250
+    assert "Evicted" in capsys.readouterr().out
+
+    # An entry bigger than the whole budget is refused instead of emptying the cache
+    assert cache.put(keys[3], {"CONVERT.gguf": _file(tmp_path / "3.gguf", bytes(300))}) is None
+    assert cache.get(keys[0]) and cache.get(keys[2])
+
+
+@pytest.mark.parametrize("junk", [b"{\"truncated", b"[1, 2]", b""])
+def test_corrupt_indexes_are_rebuilt(tmp_path, junk):
+    root = tmp_path / "cache"
+    cache = PrepCache(str(root), budget_bytes=1 << 20)
+    src = tmp_path / "m.safetensors"
+    src.write_bytes(b"weights")
+
+    (root / SOURCES_NAME).write_bytes(junk)
+    assert cache.source_digest(str(src)) == _sha(b"weights")
+    assert json.loads((root / SOURCES_NAME).read_bytes())[str(src)]["sha256"] == _sha(b"weights")
+
+    key = cache.key(str(src), {})
+    cache.put(key, {"CONVERT.gguf": _file(tmp_path / "c.gguf", b"gguf")})
+    (root / key[:2] / key / META_NAME).write_bytes(junk)
+    assert cache.get(key) is None  # an entry without a readable meta.json is a miss, not a crash
+    assert cache.entries() == [(0.0, 0, str(root / key[:2] / key))]
+    cache.put(key, {"CONVERT.gguf": _file(tmp_path / "c.gguf", b"gguf")})
+    assert open(cache.get(key)["CONVERT.gguf"], "rb").read() == b"gguf"
+
+
+def test_stale_source_index_is_not_trusted(tmp_path):
+    root = tmp_path / "cache"
+    cache = PrepCache(str(root), budget_bytes=1 << 20)
+    src = tmp_path / "m.safetensors"
+    src.write_bytes(b"old")
+    assert cache.source_digest(str(src)) == _sha(b"old")
+
+    src.write_bytes(b"new content")
+    assert cache.source_digest(str(src)) == _sha(b"new content")
+    # Sources that no longer exist are dropped from the index when it is rewritten
+    gone = tmp_path / "gone.safetensors"
+    gone.write_bytes(b"x")
+    cache.source_digest(str(gone))
+    gone.unlink()
+    src.write_bytes(b"newer")
+    cache.source_digest(str(src))
+    assert list(json.loads((root / SOURCES_NAME).read_bytes())) == [str(src)]
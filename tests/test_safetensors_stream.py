@@ -0,0 +1,124 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+from safetensors import safe_open
+from safetensors.torch import load_file
+
+from safetensors_stream import DTYPE_BITS, StreamingWriter, read_header, save_file, tensor_nbytes
+
+
+def _tensors():
+    g = torch.Generator().manual_seed(0)
+    return {
+        "f32": torch.randn(3, 5, generator=g),
+        "bf16": torch.randn(7, generator=g).to(torch.bfloat16),
+        "f16": torch.randn(2, 3, 4, generator=g).to(torch.float16),
+        "e4m3": torch.randn(9, generator=g).to(torch.float8_e4m3fn),
+        "e5m2": torch.randn(4, 4, generator=g).to(torch.float8_e5m2),
+        "i64": torch.arange(5, dtype=torch.int64),
+        "u8": torch.arange(3, dtype=torch.uint8),
+        "flag": torch.tensor([True, False, True]),
+        "c64": torch.randn(3, generator=g, dtype=torch.complex64),
+        "scalar": torch.tensor(1.5),
+        "empty": torch.zeros(0),
+        "empty_2d": torch.zeros(3, 0, dtype=torch.float16),
+    }
+
+
+def _bits(t):
+    return t.reshape(-1).view(torch.uint8)
+
+
+def _raw_header(path):
+    with open(path, "rb") as f:
+        (n,) = struct.unpack("<Q", f.read(8))
+        return n, f.read(n)
+
+
+def test_round_trip_through_safe_open(tmp_path):
+    tensors, path = _tensors(), str(tmp_path / "out.safetensors")
+    save_file(tensors, path, metadata={"format": "pt", "steps": 3})
+
+    with safe_open(path, framework="pt") as f:
+        assert f.metadata() == {"format": "pt", "steps": "3"}
+        assert sorted(f.keys()) == sorted(tensors)
+        for name, t in tensors.items():
+            got = f.get_tensor(name)
+            assert got.dtype == t.dtype and got.shape == t.shape, name
+            assert torch.equal(_bits(got), _bits(t)), name
+    assert list(json.loads(_raw_header(path)[1])) == ["__metadata__"] + list(tensors)  # written in entry order
+
+    n, _ = _raw_header(path)
+    data = sum(t.numel() * t.element_size() for t in tensors.values())
+    assert os.path.getsize(path) == 8 + n + data  # preallocation does not leave a tail behind
+
+
+def test_numpy_arrays_and_new_dtypes(tmp_path):
+    """Raw bytes of dtypes NumPy has no type for (F8_E8M0, packed F4 / F6) are written as uint8 arrays."""
+    path = str(tmp_path / "raw.safetensors")
+    arrays = {"scale": ("F8_E8M0", [4], np.array([127, 128, 0, 255], np.uint8)),
+              "fp4": ("F4", [2, 4], np.array([0x12, 0x34, 0x56, 0x78], np.uint8)),
+              "fp6": ("F6_E2M3", [4], np.array([1, 2, 3], np.uint8)),
+              "half": ("F16", [2], np.array([1.0, -2.0], np.float16))}
+    with StreamingWriter(path, [(name, dtype, shape) for name, (dtype, shape, _) in arrays.items()]) as w:
+        for name, (_, _, a) in arrays.items(): w.write(name, a)
+
+    header, data_start = read_header(path)
+    assert [(name, dtype, shape) for name, dtype, shape, _ in header] == [(k, d, s) for k, (d, s, _) in arrays.items()]
+    with open(path, "rb") as f:
+        f.seek(data_start)
+        assert f.read() == b"".join(a.tobytes() for _, _, a in arrays.values())
+    with safe_open(path, framework="np") as f:  # safetensors itself accepts the layout
+        assert f.get_slice("fp4").get_dtype() == "F4" and f.get_slice("scale").get_shape() == [4]
+        assert f.get_tensor("half").tolist() == [1.0, -2.0]
+
+
+@pytest.mark.parametrize("name_len", range(1, 9))
+def test_header_padding_aligns_the_data(tmp_path, name_len):
+    path = str(tmp_path / "pad.safetensors")
+    t = torch.arange(3, dtype=torch.float64)
+    save_file({"x" * name_len: t, "y": torch.tensor([7], dtype=torch.int16)}, path)
+
+    n, raw = _raw_header(path)
+    assert n % 8 == 0
+    assert raw.rstrip(b" ") == raw.rstrip() and len(raw) - len(raw.rstrip(b" ")) < 8  # padded with spaces only
+    assert list(json.loads(raw)) == ["x" * name_len, "y"]
+    header, data_start = read_header(path)
+    assert data_start == 8 + n and [span for *_, span in header] == [(0, 24), (24, 26)]
+    assert torch.equal(load_file(path)["x" * name_len], t)
+
+
+def test_unsupported_dtypes_are_named(tmp_path):
+    with pytest.raises(ValueError, match=r"Tensor 'w' has unsupported dtype 'F8_E3M4'"):
+        StreamingWriter(str(tmp_path / "a.safetensors"), [("ok", "F32", [1]), ("w", "F8_E3M4", [2])])
+    with pytest.raises(ValueError, match="does not fill a whole number of bytes"):
+        tensor_nbytes("packed", "F4", [3])
+    assert tensor_nbytes("packed", "F4", [2, 3]) == 3 and tensor_nbytes("six", "F6_E3M2", [4]) == 3
+    assert {"C64", "F8_E8M0", "F4", "F6_E2M3", "F6_E3M2", "U64", "U32", "U16"} <= set(DTYPE_BITS)
+
+    path = tmp_path / "future.safetensors"
+    raw = json.dumps({"layer.weight": {"dtype": "I4", "shape": [4], "data_offsets": [0, 2]}}).encode()
+    path.write_bytes(struct.pack("<Q", len(raw)) + raw + bytes(2))
+    with pytest.raises(ValueError, match=r"Tensor 'layer.weight' has unsupported dtype 'I4'"):
+        read_header(str(path))
+
+
+def test_writer_rejects_bad_writes_and_cleans_up(tmp_path):
+    path = str(tmp_path / "bad.safetensors")
+    with pytest.raises(ValueError, match="Out of order write"):
+        with StreamingWriter(path, [("a", "F32", [2]), ("b", "F32", [2])]) as w: w.write("b", np.zeros(2, np.float32))
+    assert not os.path.exists(path)
+
+    with pytest.raises(ValueError, match="Size mismatch"):
+        with StreamingWriter(path, [("a", "F32", [2])]) as w: w.write("a", np.zeros(3, np.float32))
+    assert not os.path.exists(path)
+
+    w = StreamingWriter(path, [("a", "F32", [2]), ("b", "U8", [0])])
+    w.write("a", np.zeros(2, np.float32))
+    with pytest.raises(ValueError, match="tensor 'b' was never written"): w.close()
+    assert not os.path.exists(path)
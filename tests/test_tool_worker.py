@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from tool_worker import MARKER, ToolPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ToolPool(sys.executable, max_workers=1)
+    yield pool
+    pool.close()
+
+
+def _script(tmp_path, body, name="tool.py"):
+    path = tmp_path / name
+    path.write_text("import os, sys, time\n" + body + "\n")
+    return str(path)
+
+
+def _run(pool, script, args=(), **kw):
+    out, procs = [], []
+    code = pool.run(script, args, out.append, on_proc=lambda proc, running: running and procs.append(proc), **kw)
+    text = "".join(out)
+    assert MARKER not in text
+    return code, text, procs[0].pid
+
+
+@pytest.mark.parametrize("body, code", [("pass", 0), ("sys.exit()", 0), ("sys.exit(0)", 0), ("sys.exit(3)", 3),
+                                        ("sys.exit(int(sys.argv[1]))", 7)])
+def test_exit_codes(pool, tmp_path, body, code):
+    assert _run(pool, _script(tmp_path, body), ["7"])[0] == code
+
+
+def test_exit_message_and_exception(pool, tmp_path):
+    code, text, pid = _run(pool, _script(tmp_path, "sys.exit('bad input')"))
+    assert code == 1 and text == "bad input\n"
+
+    code, text, same = _run(pool, _script(tmp_path, "print('working')\nraise ValueError('boom')"))
+    assert code == 1 and text.startswith("working\nTraceback") and text.endswith("ValueError: boom\n")
+    assert same == pid  # a failing script does not cost the worker
+
+
+def test_output_without_trailing_newline(pool, tmp_path):
+    assert _run(pool, _script(tmp_path, "sys.stdout.write('partial')"))[1] == "partial\n"
+    assert _run(pool, _script(tmp_path, "sys.stderr.write('warn')\nsys.exit(2)"))[:2] == (2, "warn\n")
+    # Progress bars: \r and \r\n come out as line breaks, like a text-mode pipe
+    assert _run(pool, _script(tmp_path, "sys.stdout.write('10%\\r50%\\r\\n100%')"))[1] == "10%\n50%\n100%\n"
+    assert _run(pool, _script(tmp_path, "print('done')"))[1] == "done\n"
+
+
+def test_args_and_cwd(pool, tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    script = _script(tmp_path, "print(os.getcwd(), sys.argv[1:])")
+    assert _run(pool, script, ["a b", 2], cwd=str(work))[1] == f"{work} ['a b', '2']\n"
+    assert _run(pool, script, [])[1] == f"{os.getcwd()} []\n"  # the worker's own cwd is put back
+
+
+def test_dead_worker_returns_none(pool, tmp_path):
+    _, _, pid = _run(pool, _script(tmp_path, "pass"))
+    code, text, dead = _run(pool, _script(tmp_path, "print('bye', flush=True)\nos._exit(0)"))
+    assert code is None and text == "bye\n" and dead == pid
+
+    # Killed mid-job (what a cancel does)
+    def on_proc(proc, running):
+        if running: threading.Timer(0.5, proc.kill).start()
+    assert pool.run(_script(tmp_path, "time.sleep(60)"), [], lambda text: None, on_proc=on_proc) is None
+
+    code, text, fresh = _run(pool, _script(tmp_path, "print('again')"))
+    assert code == 0 and text == "again\n" and fresh != pid
@@ -0,0 +1,73 @@
+import hashlib
+import os
+
+import pytest
+
+os.environ["HF_HUB_DISABLE_XET"] = "1"  # plain LFS uploads: the fake Hub does not speak Xet
+os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
+pytest.importorskip("huggingface_hub")
+pytest.importorskip("prompt_toolkit")
+
+import upload_to_hf
+from fake_hub import FakeHub
+
+
+@pytest.fixture
+def hub():
+    with FakeHub() as hub: yield hub
+
+
+def _files(tmp_path, *names, size=200_000):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def _oid(path):
+    with open(path, "rb") as f: return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_batch_is_one_commit(hub, tmp_path):
+    paths = _files(tmp_path, "m-Q4_K_M.gguf", "m-Q8_0.gguf", "m-F16.gguf")
+    upload_to_hf.main(token="hf_test", repo_id="me/repo", local_paths_args=paths, dest_folder="m", non_interactive=True,
+                      endpoint=hub.url, batch=True, workers=3, card="# m\n")
+
+    assert len(hub.commits) == 1
+    assert sorted(hub.files) == sorted(["README.md"] + [f"m/{os.path.basename(p)}" for p in paths])
+    assert all(hub.puts[_oid(p)] == 1 for p in paths)
+
+
+def test_preuploaded_model_is_committed_once(hub, tmp_path):
+    """The GUI's path: each artifact's payload goes up when it is finished, the model is committed at the end."""
+    api = upload_to_hf.HfApi(endpoint=hub.url, token="hf_test")
+    paths = _files(tmp_path, "m-Q4_K_M.gguf", "m-Q5_K_M.gguf")
+    ops = []
+    for p in paths:
+        ops += upload_to_hf.preupload(api, upload_to_hf.build_operations([p], "m"), "me/repo")
+        assert not hub.commits  # payload sent, nothing visible in the repo yet
+
+    info = upload_to_hf.commit_batch(api, "me/repo", ops)
+    assert len(hub.commits) == 1 and info.commit_url.endswith(f"{1:040d}")
+    assert sorted(hub.files) == ["m/m-Q4_K_M.gguf", "m/m-Q5_K_M.gguf"]
+    assert all(hub.puts[_oid(p)] == 1 for p in paths)  # the commit did not send the payloads again
+
+
+def test_rerun_sends_nothing(hub, tmp_path, capsys):
+    paths = _files(tmp_path, "m-Q4_K_M.gguf", "m-Q8_0.gguf")
+    kwargs = dict(token="hf_test", repo_id="me/repo", local_paths_args=paths, non_interactive=True, endpoint=hub.url, batch=True)
+    upload_to_hf.main(**kwargs)
+    puts, commits = sum(hub.puts.values()), len(hub.commits)
+    capsys.readouterr()
+
+    upload_to_hf.main(**kwargs)
+    assert sum(hub.puts.values()) == puts and hub.calls["put"] == puts and len(hub.commits) == commits
+    assert "every file is already up to date" in capsys.readouterr().out
+
+    # One changed file: only that one goes up, in a single new commit
+    with open(paths[0], "r+b") as f: f.write(b"changed")
+    upload_to_hf.main(**kwargs)
+    assert sum(hub.puts.values()) == puts + 1 and len(hub.commits) == commits + 1
+    assert [line["value"]["path"] for line in hub.commits[-1] if line["key"] == "lfsFile"] == ["m-Q4_K_M.gguf"]
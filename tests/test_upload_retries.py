@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+
+import pytest
+
+os.environ["HF_HUB_DISABLE_XET"] = "1"  # plain LFS uploads: the fake Hub does not speak Xet
+os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
+pytest.importorskip("huggingface_hub")
+pytest.importorskip("prompt_toolkit")
+
+import upload_to_hf
+from fake_hub import FakeHub
+from upload_queue import UploadQueue
+
+
+@pytest.fixture
+def hub():
+    with FakeHub() as hub: yield hub
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    """Same retry policy, millisecond waits. huggingface_hub's own retries (preupload, LFS batch and PUT) are
+    switched off, so every injected failure reaches the code under test and is counted there."""
+    defaults = dict(upload_to_hf.call_with_retries.__kwdefaults__, base_delay=0.01, max_delay=0.05)
+    monkeypatch.setattr(upload_to_hf.call_with_retries, "__kwdefaults__", defaults)
+    from huggingface_hub.utils import http_backoff
+    monkeypatch.setattr(http_backoff, "__kwdefaults__", dict(http_backoff.__kwdefaults__, max_retries=0))
+
+
+def _threads():
+    """Live threads, minus the fake Hub's own connection handlers."""
+    return {t for t in threading.enumerate() if "process_request" not in t.name}
+
+
+def _files(tmp_path, *names, size=200_000):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    return paths
+
+
+def _oid(path):
+    import hashlib
+    with open(path, "rb") as f: return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_is_transient(hub):
+    from huggingface_hub.errors import HfHubHTTPError
+    api = upload_to_hf.HfApi(endpoint=hub.url, token="hf_test")
+    for status, transient in ((500, True), (503, True), (429, True), (401, False), (404, False), (422, False)):
+        hub.fail("paths-info", status)
+        with pytest.raises(HfHubHTTPError) as err: api.get_paths_info("me/repo", ["x"])
+        assert upload_to_hf.is_transient(err.value) is transient, status
+        wrapped = RuntimeError("Error while uploading 'x' to the Hub.")
+        wrapped.__cause__ = err.value
+        assert upload_to_hf.is_transient(wrapped) is transient, status
+    assert upload_to_hf.is_transient(ConnectionError("reset"))
+    assert not upload_to_hf.is_transient(ValueError("bad input"))
+    unrelated = ValueError("bad input")
+    unrelated.__context__ = ConnectionError("reset")  # raised while handling it, not caused by it
+    assert not upload_to_hf.is_transient(unrelated)
+
+
+def test_call_with_retries_counts_attempts(hub):
+    api = upload_to_hf.HfApi(endpoint=hub.url, token="hf_test")
+    retries = []
+    hub.fail("paths-info", 503, 429, 502)
+    upload_to_hf.call_with_retries(lambda: api.get_paths_info("me/repo", ["x"]), attempts=4, on_retry=lambda *a: retries.append(a[0]))
+    assert retries == [1, 2, 3] and hub.calls["paths-info"] == 4
+
+    hub.fail("paths-info", 503, 503)
+    with pytest.raises(Exception): upload_to_hf.call_with_retries(lambda: api.get_paths_info("me/repo", ["x"]), attempts=2)
+    assert hub.calls["paths-info"] == 6
+
+    hub.fail("paths-info", 401)  # not transient: no retry
+    with pytest.raises(Exception): upload_to_hf.call_with_retries(lambda: api.get_paths_info("me/repo", ["x"]), attempts=5)
+    assert hub.calls["paths-info"] == 7
+
+
+def test_batch_upload_retries_without_resending(hub, tmp_path, capsys):
+    paths = _files(tmp_path, "m-Q4_K_M.gguf", "m-Q8_0.gguf", "m-Q2_K.gguf")
+    hub.fail("put", 503, 429)        # the first two LFS payloads that arrive are refused
+    hub.fail("preupload", 500)
+    hub.fail("commit", 503, 503)     # the commit only goes through on its third try
+
+    upload_to_hf.main(token="hf_test", repo_id="me/repo", local_paths_args=paths, non_interactive=True,
+                      endpoint=hub.url, batch=True, workers=3, retries=3)
+
+    out = capsys.readouterr().out
+    assert out.count("retry ") == 5, out
+    assert hub.calls["put"] == 3 + 2 and hub.calls["commit"] == 3
+    # A failed file does not make the others go up again, and the commit retries send no payload at all
+    assert all(hub.puts[_oid(p)] == 1 for p in paths)
+    assert len(hub.commits) == 1 and sorted(hub.files) == sorted(os.path.basename(p) for p in paths)
+
+
+def test_batch_upload_gives_up_after_retries(hub, tmp_path, capsys):
+    paths = _files(tmp_path, "m-F16.gguf")
+    hub.fail("put", 503, 503, 503)
+    upload_to_hf.main(token="hf_test", repo_id="me/repo", local_paths_args=paths, non_interactive=True,
+                      endpoint=hub.url, batch=True, retries=2)
+    assert hub.calls["put"] == 3 and not hub.commits
+    assert "FAILED to commit the batch" in capsys.readouterr().out
+
+
+def _queue(hub, workers=2, cancelled=lambda: False, **retry_kw):
+    """An UploadQueue wired like the GUI's: skip unchanged, then pre-upload, each job with its own retries."""
+    api = upload_to_hf.HfApi(endpoint=hub.url, token="hf_test")
+    states = []
+    def upload(path, repo, dest):
+        ops, _ = upload_to_hf.skip_unchanged(api, repo, upload_to_hf.build_operations([path], dest))
+        return upload_to_hf.preupload(api, ops, repo) if ops else []
+    retry = lambda fn, job, on_retry: upload_to_hf.call_with_retries(fn, on_retry=on_retry, cancelled=cancelled, **retry_kw)
+    q = UploadQueue(upload, workers, lambda job, state: states.append((os.path.basename(job.path), state)), retry)
+    return q, states
+
+
+def test_upload_queue_retries_and_closes(hub, tmp_path):
+    paths = _files(tmp_path, "m-Q4_K_M.gguf", "m-Q5_K_M.gguf")
+    before = _threads()
+    hub.fail("preupload", 503, 429)
+    q, states = _queue(hub, attempts=4)
+    for p in paths: q.submit("m", p, "me/repo", None)
+    assert q.wait("m") == []
+    q.close()
+
+    jobs = q.jobs("m")
+    assert sum(j.attempts for j in jobs) == 2 and all(j.ok for j in jobs)
+    assert [s for _, s in states].count("RETRY") == 2
+    assert all(hub.puts[_oid(p)] == 1 for p in paths)
+    assert not any(t.is_alive() for t in q._threads)
+    assert _threads() <= before
+
+
+def test_upload_queue_cancel_leaves_no_threads(hub, tmp_path):
+    paths = _files(tmp_path, "a.gguf", "b.gguf", "c.gguf")
+    before = _threads()
+    stop = threading.Event()
+    hub.fail("preupload", *[503] * 50)  # keeps failing: the running job sits in a (long) backoff wait
+    q, states = _queue(hub, workers=1, cancelled=stop.is_set, attempts=50, base_delay=30.0, max_delay=30.0)
+    for p in paths: q.submit("m", p, "me/repo", None)
+    while ("a.gguf", "RETRY") not in states: time.sleep(0.01)
+
+    t0 = time.monotonic()
+    stop.set(); q.cancel()
+    assert q.submit("m", str(tmp_path / "late.gguf"), "me/repo", None) is None
+    q.close()
+    assert time.monotonic() - t0 < 5  # the backoff wait was cut short, not slept through
+
+    by_name = {os.path.basename(j.path): j for j in q.jobs("m")}
+    assert not by_name["a.gguf"].ok and ("a.gguf", "UPLOAD_ERROR") in states
+    assert ("b.gguf", "CANCEL") in states and ("c.gguf", "CANCEL") in states
+    assert not hub.puts
+    assert not any(t.is_alive() for t in q._threads)
+    assert _threads() <= before
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""tool_worker.py — Long-lived Python workers for the converter's helper scripts
+* `python -u tool_worker.py --serve` imports the heavy modules (torch, gguf, numpy, ...) once,
+  then runs one script per job line read from stdin, as if launched with `python -u script args...`
+* The script's stdout/stderr go to the worker's stdout unchanged; a marker line with the exit code ends each job
+* ToolPool keeps up to N such workers and hands each job to an idle one, spawning more on demand
+* A worker that is killed (cancel) or dies mid-job is dropped; the next job gets a fresh one
+"""
+
+import codecs
+import gc
+import json
+import os
+import runpy
+import subprocess
+import sys
+import threading
+import traceback
+
+# --------- helpers & constants ---------
+MARKER = "\x1e\x1eTOOL-WORKER-EXIT "
+PRELOAD = ("numpy", "torch", "safetensors", "gguf", "tqdm")
+CHUNK = 4096
+
+
+class _Tracking:
+    """Stream wrapper remembering whether the last thing written ended a line (shared by stdout and stderr)."""
+    at_line_start = True
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, s):
+        if s: _Tracking.at_line_start = s.endswith(("\n", "\r"))
+        return self._stream.write(s)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _trim_memory() -> None:
+    """Gives freed tensor memory back to the OS between jobs (glibc keeps it otherwise)."""
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except Exception: pass
+
+
+def _run_job(job: dict) -> int:
+    script = job["script"]
+    old_argv, old_cwd, old_path = sys.argv, os.getcwd(), list(sys.path)
+    sys.argv = [script] + list(job.get("args", []))
+    sys.path.insert(0, os.path.dirname(script))
+    try:
+        os.chdir(job.get("cwd") or old_cwd)
+        runpy.run_path(script, run_name="__main__")
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int): return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv, sys.path[:] = old_argv, old_path
+        os.chdir(old_cwd)
+
+
+def serve(preload=PRELOAD) -> None:
+    # Jobs arrive on stdin; the tools themselves get an empty stdin, like a launch without a console
+    jobs, sys.stdin = sys.stdin, open(os.devnull)
+    sys.stdout, sys.stderr = _Tracking(sys.stdout), _Tracking(sys.stderr)
+    for mod in preload:
+        try: __import__(mod)
+        except Exception: pass
+    for line in jobs:
+        if not line.strip(): continue
+        code = _run_job(json.loads(line))
+        sys.stderr.flush()
+        sys.stdout.write(("" if _Tracking.at_line_start else "\n") + f"{MARKER}{code}\n")
+        sys.stdout.flush()
+        _Tracking.at_line_start = True
+        _trim_memory()
+
+
+def _split_marker(text: str) -> tuple[str, str]:
+    """(text safe to pass on, text held back because it is or may become the marker)."""
+    i = text.find(MARKER)
+    if i >= 0: return text[:i], text[i:]
+    for k in range(min(len(MARKER) - 1, len(text)), 0, -1):
+        if text.endswith(MARKER[:k]): return text[:-k], text[-k:]
+    return text, ""
+
+
+class ToolPool:
+    """
+    Up to `max_workers` worker interpreters, each running one job at a time.
+    `env` is the environment of the workers (same as a process-per-call launch would get).
+    """
+
+    def __init__(self, python: str = sys.executable, max_workers: int = 2, env: dict | None = None):
+        self.python, self.max_workers, self.env = python, max(1, max_workers), env
+        self._idle, self._busy = [], set()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen([self.python, "-u", os.path.abspath(__file__), "--serve"],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=self.env)
+
+    def warm(self, n: int = 1) -> None:
+        """Starts workers ahead of the first job, so their imports overlap other work."""
+        with self._cond:
+            while len(self._idle) + len(self._busy) < min(n, self.max_workers): self._idle.append(self._spawn())
+
+    def _acquire(self) -> subprocess.Popen:
+        with self._cond:
+            while True:
+                if self._closed: raise RuntimeError("tool pool is closed")
+                self._idle = [p for p in self._idle if p.poll() is None]
+                if self._idle: proc = self._idle.pop()
+                elif len(self._busy) < self.max_workers: proc = self._spawn()
+                else:
+                    self._cond.wait()
+                    continue
+                self._busy.add(proc)
+                return proc
+
+    def _release(self, proc: subprocess.Popen, healthy: bool) -> None:
+        with self._cond:
+            self._busy.discard(proc)
+            if healthy and not self._closed and proc.poll() is None: self._idle.append(proc)
+            else:
+                try: proc.kill()
+                except OSError: pass
+            self._cond.notify()
+
+    def run(self, script: str, args, write, cwd: str | None = None, on_proc=None) -> int | None:
+        """Runs `script args...` on a worker, passing its output to `write(text)` as it arrives
+        (decoded like a text-mode pipe: \\r and \\r\\n become \\n). `on_proc(proc, running)` brackets the job,
+        e.g. to let a cancel kill the worker. Returns the exit code, or None if the worker died or was killed."""
+        proc, code = self._acquire(), None
+        try:
+            if on_proc: on_proc(proc, True)
+            job = {"script": os.path.abspath(script), "args": [str(a) for a in args], "cwd": cwd or os.getcwd()}
+            proc.stdin.write(json.dumps(job).encode() + b"\n")
+            proc.stdin.flush()
+            code = self._stream(proc, write)
+            return code
+        except OSError:
+            return None
+        finally:
+            if on_proc: on_proc(proc, False)
+            self._release(proc, code is not None)
+
+    def _stream(self, proc: subprocess.Popen, write) -> int | None:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        pending, carry = "", ""
+        while True:
+            data = proc.stdout.read1(CHUNK)
+            text = carry + decoder.decode(data, final=not data)
+            carry = "\r" if data and text.endswith("\r") else ""
+            if carry: text = text[:-1]
+            pending += text.replace("\r\n", "\n").replace("\r", "\n")
+            out, pending = _split_marker(pending) if data else (pending, "")
+            if out: write(out)
+            if not data: return None  # the worker exited mid-job: killed, crashed or os._exit()
+            if pending.startswith(MARKER) and "\n" in pending:
+                return int(pending[len(MARKER):].split("\n", 1)[0])
+
+    def close(self) -> None:
+        """Lets idle workers exit (end of their job stream); busy ones are killed."""
+        with self._cond:
+            self._closed = True
+            idle, busy, self._idle = self._idle, list(self._busy), []
+            self._cond.notify_all()
+        for proc in idle:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+        for proc in busy:
+            try: proc.kill()
+            except OSError: pass
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+    elif len(sys.argv) >= 2:
+        # Smoke test: run one script through a worker, e.g. python tool_worker.py convert.py --help
+        pool = ToolPool()
+        code = pool.run(sys.argv[1], sys.argv[2:], lambda text: sys.stdout.write(text))
+        pool.close()
+        sys.exit(1 if code is None else code)
+    else:
+        print("Usage: python tool_worker.py --serve | <script.py> [args...]")
+        sys.exit(1)
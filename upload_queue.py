@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""upload_queue.py — Background uploads that start the moment an artifact is finished
+* A fixed number of worker threads drain a FIFO of upload jobs
+* Jobs are grouped by key (one model), so a caller can wait for just that model's uploads
+* Every state change goes to a callback: QUEUED, UPLOADING, RETRY, UPLOADED, UPLOAD_ERROR, CANCEL
+* An optional retry wrapper re-runs a failed upload in place (the worker keeps its slot meanwhile)
+* stats() gives files, bytes and wall time for throughput reporting
+* cancel() drops jobs that have not started; uploads already running finish on their own
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class UploadJob:
+    key: str
+    path: str
+    args: tuple = ()
+    tag: object = None  # caller data handed back with every state change
+    ok: bool | None = None
+    error: Exception | None = None
+    attempts: int = 0
+    nbytes: int = 0
+    started: float = 0.0
+    seconds: float = 0.0
+    result: object = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class UploadQueue:
+    """
+    Runs `upload_fn(path, *args)` for each submitted file on `workers` background threads.
+    `on_state(job, state)` is called from the worker threads.
+    `retry_call(fn, job, on_retry)`, when given, runs fn() with its own retry policy and calls
+    `on_retry(attempt, delay, exc)` before each new attempt.
+    """
+
+    def __init__(self, upload_fn, workers: int = 2, on_state=None, retry_call=None):
+        self.upload_fn = upload_fn
+        self.on_state = on_state or (lambda job, state: None)
+        self.retry_call = retry_call
+        self._jobs = queue.Queue()
+        self._by_key = {}  # key -> [UploadJob]
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for t in self._threads: t.start()
+
+    def submit(self, key: str, path: str, *args, tag=None) -> UploadJob | None:
+        """Queues one file; a path already submitted under `key` is not queued twice."""
+        with self._lock:
+            if self._cancelled: return None
+            jobs = self._by_key.setdefault(key, [])
+            if any(j.path == path for j in jobs): return None
+            job = UploadJob(key, path, args, tag)
+            jobs.append(job)
+        self.on_state(job, "QUEUED")
+        self._jobs.put(job)
+        return job
+
+    def submitted(self, key: str) -> set:
+        with self._lock:
+            return {j.path for j in self._by_key.get(key, [])}
+
+    def jobs(self, key: str) -> list[UploadJob]:
+        with self._lock:
+            return list(self._by_key.get(key, []))
+
+    def wait(self, key: str, cancelled=None) -> list[UploadJob]:
+        """Blocks until every upload under `key` has finished; returns the jobs that did not succeed."""
+        jobs = self.jobs(key)
+        for job in jobs:
+            while not job.done.wait(timeout=0.5):
+                if cancelled and cancelled(): return [j for j in jobs if not j.ok]
+        return [j for j in jobs if not j.ok]
+
+    def stats(self, key: str | None = None) -> tuple[int, int, float]:
+        """(files, bytes, seconds) of the successful uploads that returned something (i.e. sent data),
+        for one key or all of them; seconds is the wall time from the first start to the last finish."""
+        with self._lock:
+            jobs = [j for k, js in self._by_key.items() if key is None or k == key for j in js if j.ok and j.result]
+        if not jobs: return 0, 0, 0.0
+        span = max(j.started + j.seconds for j in jobs) - min(j.started for j in jobs)
+        return len(jobs), sum(j.nbytes for j in jobs), span
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+
+    def close(self, wait: bool = True) -> None:
+        for _ in self._threads: self._jobs.put(None)
+        if wait:
+            for t in self._threads: t.join()
+
+    def _worker(self) -> None:
+        while (job := self._jobs.get()) is not None:
+            if self._cancelled:
+                job.ok = False
+                self.on_state(job, "CANCEL"); job.done.set()
+                continue
+            self.on_state(job, "UPLOADING")
+            job.started = time.monotonic()
+            try: job.nbytes = os.path.getsize(job.path)
+            except OSError: pass
+            try:
+                call = lambda: self.upload_fn(job.path, *job.args)
+                job.result = self.retry_call(call, job, lambda attempt, delay, exc: self._retrying(job, attempt)) if self.retry_call else call()
+                job.ok = True
+            except Exception as e:
+                job.ok, job.error = False, e
+                logging.error(f"Upload of {os.path.basename(job.path)} failed: {e}")
+            job.seconds = time.monotonic() - job.started
+            self.on_state(job, "UPLOADED" if job.ok else "UPLOAD_ERROR")
+            job.done.set()
+
+    def _retrying(self, job: UploadJob, attempt: int) -> None:
+        job.attempts = attempt
+        self.on_state(job, "RETRY")
@@ -4,6 +4,9 @@ import sys
 import argparse
 import glob
 import importlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Dependency Checker
 REQUIRED_PACKAGES = {'huggingface-hub': 'huggingface_hub', 'prompt-toolkit': 'prompt_toolkit'}
@@ -17,11 +20,61 @@ if missing_packages:
     print(f"❌ Missing packages: {', '.join(missing_packages)}. Please run: pip install {' '.join(missing_packages)}")
     sys.exit(1)
 
-from huggingface_hub import HfApi, login, whoami, create_repo, repo_exists
+from huggingface_hub import HfApi, CommitOperationAdd, login
 from huggingface_hub.errors import HfHubHTTPError
 from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import PathCompleter
 
+try:
+    from sha256_cache import hash_files, SIDECAR_NAME
+except ImportError:  # standalone copy of this script: every file is uploaded
+    hash_files, SIDECAR_NAME = None, None
+try:
+    from artifact_manifest import MANIFEST_NAME
+except ImportError:
+    MANIFEST_NAME = None
+# Local bookkeeping files that never go to the Hub
+LOCAL_ONLY = {n for n in (SIDECAR_NAME, MANIFEST_NAME) if n}
+
+# Transient failures worth retrying: throttling / server-side HTTP statuses and transport-level errors
+# (matched by class name so it works with whichever HTTP client huggingface_hub is built on)
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = {"TransportError", "ConnectionError", "Timeout", "TimeoutError", "ChunkedEncodingError"}
+
+def is_transient(exc):
+    """True for errors a retry can fix (5xx, 429, timeouts, dropped connections); False for auth, 404, bad input.
+    Wrapped errors are judged by their cause (huggingface_hub re-raises LFS upload failures as RuntimeError ... from e)."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+        if status is not None: return status in TRANSIENT_STATUS
+        if any(c.__name__ in TRANSIENT_ERRORS for c in type(exc).__mro__): return True
+        exc = exc.__cause__
+    return False
+
+def call_with_retries(fn, *, attempts=5, base_delay=2.0, max_delay=60.0, label="", on_retry=None, cancelled=None):
+    """Calls fn() until it succeeds, retrying transient errors with exponential backoff and jitter
+    (honouring Retry-After). `on_retry(attempt, delay, exc)` is told before each wait; `cancelled()` aborts the wait."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts or not is_transient(e): raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            retry_after = getattr(getattr(e, "response", None), "headers", {}).get("Retry-After", "")
+            if retry_after.isdigit(): delay = max(delay, min(max_delay, float(retry_after)))
+            reason = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"  ⚠️ {label or 'Request'} failed ({reason}); retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            if on_retry: on_retry(attempt, delay, e)
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                if cancelled and cancelled(): raise
+                time.sleep(min(0.5, deadline - time.monotonic()))
+
+def throughput(nbytes, seconds):
+    return f"{nbytes / 1024**2:.0f} MB in {seconds:.1f}s, {nbytes / 1024**2 / max(seconds, 1e-3):.1f} MB/s"
+
 def expand_paths(path_patterns):
     """Takes a list of path patterns and returns a flat list of existing files/folders."""
     expanded_paths = []
@@ -34,6 +87,105 @@ def expand_paths(path_patterns):
             expanded_paths.append(expanded_part)
     return expanded_paths
 
+def upload_path(api, path, repo_id, dest_folder=None):
+    """Uploads one local file or folder into `dest_folder` of the repo. Raises on failure; returns the path in the repo."""
+    item_name = os.path.basename(path.rstrip('/\\'))
+    path_in_repo = f"{dest_folder.strip('/')}/{item_name}" if dest_folder else item_name
+    if os.path.isfile(path):
+        print(f"\nUploading FILE '{path}' to '{path_in_repo}'...")
+        api.upload_file(path_or_fileobj=path, path_in_repo=path_in_repo, repo_id=repo_id)
+    elif os.path.isdir(path):
+        print(f"\nUploading FOLDER '{path}' to '{path_in_repo}'...")
+        api.upload_folder(folder_path=path, path_in_repo=path_in_repo, repo_id=repo_id,
+                          ignore_patterns=[p for n in LOCAL_ONLY for p in (f"**/{n}", n)] or None)
+    else:
+        raise FileNotFoundError(path)
+    return path_in_repo
+
+def build_operations(local_paths, dest_folder=None):
+    """One CommitOperationAdd per file under `local_paths` (folders are walked), placed under `dest_folder`."""
+    prefix = f"{dest_folder.strip('/')}/" if dest_folder else ""
+    ops = []
+    for path in local_paths:
+        item_name = os.path.basename(path.rstrip('/\\'))
+        if os.path.isfile(path):
+            ops.append(CommitOperationAdd(path_in_repo=prefix + item_name, path_or_fileobj=path))
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for fname in sorted(files):
+                    if fname in LOCAL_ONLY: continue
+                    full = os.path.join(root, fname)
+                    rel = os.path.relpath(full, path).replace(os.sep, '/')
+                    ops.append(CommitOperationAdd(path_in_repo=f"{prefix}{item_name}/{rel}", path_or_fileobj=full))
+        else:
+            raise FileNotFoundError(path)
+    return ops
+
+def card_operation(card):
+    """README.md operation for an optional model card, given as a file path or as markdown text."""
+    if not card: return None
+    return CommitOperationAdd(path_in_repo="README.md", path_or_fileobj=card if os.path.isfile(card) else card.encode("utf-8"))
+
+def skip_unchanged(api, repo_id, operations, workers=4, repo_type='model', retries=0):
+    """Splits operations into (to_upload, unchanged). A local file is unchanged when the repo already holds an
+    LFS object of the same size and SHA-256 at its path. Local digests come from the sidecar cache and are
+    handed to the operations that still go up, so they are not hashed a second time."""
+    operations = list(operations)
+    on_disk = [op for op in operations if isinstance(op.path_or_fileobj, str)]
+    if hash_files is None or not on_disk: return operations, []
+    try:
+        infos = call_with_retries(lambda: api.get_paths_info(repo_id, [op.path_in_repo for op in on_disk], repo_type=repo_type),
+                                  attempts=retries + 1, label="Remote file info")
+        remote = {f.path: f.lfs for f in infos if getattr(f, "lfs", None)}
+    except Exception as e:
+        print(f"⚠️ Could not read remote file info ({e}); uploading everything.")
+        return operations, []
+    # Only a same-size remote LFS object can match: nothing else needs hashing
+    candidates = [op for op in on_disk if op.path_in_repo in remote and remote[op.path_in_repo].size == op.upload_info.size]
+    digests = hash_files([op.path_or_fileobj for op in candidates], workers=workers)
+    hashed = {id(op) for op in candidates}
+    to_upload, unchanged = [], []
+    for op in operations:
+        digest = digests.get(op.path_or_fileobj) if id(op) in hashed else None
+        if digest and digest == remote[op.path_in_repo].sha256:
+            unchanged.append(op)
+        else:
+            if digest: op.upload_info.sha256 = bytes.fromhex(digest)
+            to_upload.append(op)
+    return to_upload, unchanged
+
+def preupload(api, operations, repo_id, num_threads=5, repo_type='model'):
+    """Sends the LFS payloads of `operations` now; a later commit_batch() with them only has to commit."""
+    api.preupload_lfs_files(repo_id=repo_id, additions=operations, num_threads=num_threads, repo_type=repo_type)
+    return operations
+
+def upload_operations(api, repo_id, operations, workers=5, retries=4, repo_type='model'):
+    """Pre-uploads the payload of every on-disk operation, `workers` files at a time, each file with its own
+    retry budget: a failure resends only that file (and the Hub's LFS batch skips objects it already holds).
+    Prints MB/s per file and in aggregate; returns the bytes sent."""
+    ops = [op for op in operations if isinstance(op.path_or_fileobj, str)]
+    if not ops: return 0
+    start = time.monotonic()
+    def one(op):
+        t0 = time.monotonic()
+        call_with_retries(lambda: preupload(api, [op], repo_id, repo_type=repo_type), attempts=retries + 1, label=op.path_in_repo)
+        print(f"  ⬆️ {op.path_in_repo} ({throughput(op.upload_info.size, time.monotonic() - t0)})")
+        return op.upload_info.size
+    with ThreadPoolExecutor(max(1, min(workers, len(ops)))) as ex:
+        total = sum(ex.map(one, ops))
+    print(f"  📊 {len(ops)} file(s): {throughput(total, time.monotonic() - start)} aggregate")
+    return total
+
+def commit_batch(api, repo_id, operations, card=None, commit_message=None, num_threads=5, repo_type='model'):
+    """Pushes every operation (plus the optional model card) as a single commit.
+    LFS files that were not pre-uploaded go up first, `num_threads` at a time."""
+    ops = list(operations)
+    card_op = card_operation(card)
+    if card_op: ops.append(card_op)
+    message = commit_message or f"Upload {len(ops)} file{'s' if len(ops) != 1 else ''}"
+    return api.create_commit(repo_id=repo_id, operations=ops, commit_message=message, num_threads=num_threads, repo_type=repo_type)
+
 def get_upload_paths_interactive():
     """Interactively prompts for local paths using advanced completion."""
     completer = PathCompleter()
@@ -49,26 +201,32 @@ def get_upload_paths_interactive():
             print("\nOperation cancelled."); return []
 
 def main(token: str = None, repo_id: str = None, local_paths_args: list = None, dest_folder: str = None, 
-         non_interactive: bool = False, create_if_needed: bool = False, is_private: bool = False, repo_type: str = 'model'):
-    """Main function to handle authentication, repo selection/creation, and upload."""
+         non_interactive: bool = False, create_if_needed: bool = False, is_private: bool = False, repo_type: str = 'model',
+         batch: bool = False, card: str = None, workers: int = 5, endpoint: str = None, skip_existing: bool = True,
+         retries: int = 4):
+    """Main function to handle authentication, repo selection/creation, and upload.
+    With `batch`, everything (plus the optional model `card`) goes up as one commit.
+    `endpoint` points the client at another Hub-compatible server (e.g. a local stand-in).
+    With `skip_existing`, files whose content is already in the repo at the same path are not sent again.
+    Transient errors (5xx, 429, dropped connections) are retried up to `retries` times per file, with backoff."""
+    api = HfApi(endpoint=endpoint, token=token)
     try:
-        login(token=token, add_to_git_credential=False)
-        username = whoami(token=token)['name']
+        if endpoint is None: login(token=token, add_to_git_credential=False)
+        username = api.whoami()['name']
         print(f"✅ Logged in as: {username}")
     except Exception as e:
         print(f"❌ Authentication failed: {e}"); return
 
-    api = HfApi(token=token)
     selected_repo = repo_id
 
     # --- REPO SELECTION / CREATION ---
     # Non-interactive mode (used by the conversion script)
     if selected_repo and non_interactive:
         try:
-            if not repo_exists(repo_id=selected_repo, repo_type=repo_type, token=token):
+            if not api.repo_exists(repo_id=selected_repo, repo_type=repo_type):
                 if create_if_needed:
                     print(f" Repository '{selected_repo}' not found. Creating it now...")
-                    create_repo(repo_id=selected_repo, private=is_private, repo_type=repo_type, token=token)
+                    api.create_repo(repo_id=selected_repo, private=is_private, repo_type=repo_type)
                     print(f"✅ Successfully created repository.")
                 else:
                     print(f"❌ Repository '{selected_repo}' not found and creation was not requested."); return
@@ -94,7 +252,7 @@ def main(token: str = None, repo_id: str = None, local_paths_args: list = None,
                     private = input("Make this repo private? [y/n] (default: n): ").strip().lower() == 'y'
                     try:
                         print(f"Creating {'private' if private else 'public'} repo: '{new_repo}'...")
-                        selected_repo = create_repo(repo_id=new_repo, private=private, repo_type='model').repo_id
+                        selected_repo = api.create_repo(repo_id=new_repo, private=private, repo_type='model').repo_id
                         print(f"✅ Successfully created '{selected_repo}'")
                     except HfHubHTTPError as e: print(f"❌ Error creating repository: {e}")
                 else:
@@ -118,24 +276,54 @@ def main(token: str = None, repo_id: str = None, local_paths_args: list = None,
     print(f"  - Target repository:   '{selected_repo}'")
     print(f"  - Destination folder:  '{dest_folder or 'root'}'")
     for path in local_paths: print(f"    - {path}")
+    if card: print(f"  - Model card:          {card if os.path.isfile(card) else '(text)'}")
+    print(f"  - Mode:                {'single commit' if batch else 'one commit per item'}")
     print("----------------------")
 
     if not non_interactive and input("\nProceed with upload? (y/n): ").strip().lower() != 'y':
         print("\nUpload cancelled."); return
 
-    for path in local_paths:
-        item_name = os.path.basename(path.rstrip('/\\'))
-        path_in_repo = f"{dest_folder.strip('/')}/{item_name}" if dest_folder else item_name
+    unchanged, pending = set(), None
+    if skip_existing:
+        try:
+            pending, same = skip_unchanged(api, selected_repo, build_operations(local_paths, dest_folder), workers, repo_type, retries)
+            for op in same: print(f"  ⏭️ Unchanged on the Hub, skipping {op.path_in_repo}")
+            unchanged = {op.path_or_fileobj for op in same}
+        except Exception as e:
+            print(f"⚠️ Unchanged-file check failed ({e}); uploading everything.")
+
+    if batch:
         try:
-            if os.path.isfile(path):
-                print(f"\nUploading FILE '{path}' to '{path_in_repo}'...")
-                api.upload_file(path_or_fileobj=path, path_in_repo=path_in_repo, repo_id=selected_repo)
-            elif os.path.isdir(path):
-                print(f"\nUploading FOLDER '{path}' to '{path_in_repo}'...")
-                api.upload_folder(folder_path=path, path_in_repo=path_in_repo, repo_id=selected_repo)
-            print(f"  ✅ Successfully uploaded {item_name}")
+            ops = pending if pending is not None else build_operations(local_paths, dest_folder)
+            if not ops and not card:
+                print("\nNothing to commit: every file is already up to date.")
+            else:
+                print(f"\nUploading {len(ops)} file(s) to '{selected_repo}', {workers} at a time...")
+                upload_operations(api, selected_repo, ops, workers, retries, repo_type)
+                # Payloads are already on the Hub: a retried commit does not send them again
+                info = call_with_retries(lambda: commit_batch(api, selected_repo, ops, card=card, num_threads=workers, repo_type=repo_type),
+                                         attempts=retries + 1, label="Commit")
+                for op in ops: print(f"  ✅ {op.path_in_repo}")
+                print(f"  ✅ Commit: {info.commit_url}")
         except Exception as e:
-            print(f"  ❌ FAILED to upload {item_name}. Error: {e}")
+            print(f"  ❌ FAILED to commit the batch. Error: {e}")
+    else:
+        for path in local_paths:
+            item_name = os.path.basename(path.rstrip('/\\'))
+            if unchanged and all(op.path_or_fileobj in unchanged for op in build_operations([path])): continue
+            try:
+                t0 = time.monotonic()
+                call_with_retries(lambda: upload_path(api, path, selected_repo, dest_folder), attempts=retries + 1, label=item_name)
+                rate = f" ({throughput(os.path.getsize(path), time.monotonic() - t0)})" if os.path.isfile(path) else ""
+                print(f"  ✅ Successfully uploaded {item_name}{rate}")
+            except Exception as e:
+                print(f"  ❌ FAILED to upload {item_name}. Error: {e}")
+        if card:
+            try:
+                api.create_commit(repo_id=selected_repo, operations=[card_operation(card)], commit_message="Update model card")
+                print("  ✅ Successfully uploaded README.md")
+            except Exception as e:
+                print(f"  ❌ FAILED to upload README.md. Error: {e}")
 
     print(f"\n🚀 All operations complete! View your repository at: https://huggingface.co/{selected_repo}/tree/main")
 
@@ -149,8 +337,16 @@ if __name__ == "__main__":
     parser.add_argument("--create", action='store_true', help="Create the repository if it does not exist.")
     parser.add_argument("--private", action='store_true', help="When creating a repo, make it private.")
     parser.add_argument("--repo-type", choices=['model', 'dataset', 'space'], default='model', help="Type of repo to create.")
+    parser.add_argument("--batch", action='store_true', help="Push all paths as a single commit (parallel LFS transfers).")
+    parser.add_argument("--card", help="Model card to commit as README.md (file path or markdown text).")
+    parser.add_argument("--workers", type=int, default=5, help="Parallel LFS transfers in batch mode.")
+    parser.add_argument("--endpoint", help="Hub API endpoint (default: huggingface.co / HF_ENDPOINT).")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per file on transient errors (exponential backoff).")
+    parser.add_argument("--no-skip", action='store_true', help="Upload every file, even ones already on the Hub with the same content.")
     args = parser.parse_args()
     
     main(token=(args.token or os.getenv("HUGGING_FACE_HUB_TOKEN")), repo_id=args.repo, local_paths_args=args.path, 
          dest_folder=args.dest, non_interactive=args.yes, create_if_needed=args.create, 
-         is_private=args.private, repo_type=args.repo_type)
+         is_private=args.private, repo_type=args.repo_type, batch=args.batch, card=args.card,
+         workers=args.workers, endpoint=args.endpoint, skip_existing=not args.no_skip,
+         retries=args.retries)